@@ -1,8 +1,11 @@
 from datetime import datetime, timedelta
 from jose import jwt
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 from app.models import User, PasswordReset
 from app.email_service import generate_otp, send_otp_email
+from app.dependencies import invalidate_user
+from app.services import passwords
 import uuid
 
 def verify_password(plain_password, hashed_password):
@@ -16,10 +19,21 @@ def create_access_token(data: dict, expires_minutes: int = 60):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def authenticate_user(username: str, password: str, db):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not user.verify_password(password):
+async def authenticate_user(username: str, password: str, db):
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == username).first()
+    )
+    if not user:
         return None
+
+    valid, new_hash = await passwords.averify_password(password, user.password_hash)
+    if not valid:
+        return None
+
+    # Argon2 parameters changed since this hash was made: upgrade it now
+    if new_hash:
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
     return user
 
 
@@ -45,13 +59,18 @@ def initiate_password_reset(email: str, db) -> tuple[bool, str]:
         is_used=False
     )
     
+    # Store the OTP first: with EMAIL_ASYNC the mail may go out right away
+    db.add(reset_record)
+    db.commit()
+
     # Send OTP via email
     if send_otp_email(email, otp, user.username):
-        db.add(reset_record)
-        db.commit()
         return True, "OTP sent to your email"
-    else:
-        return False, "Failed to send OTP"
+
+    # The mail never left: don't keep an OTP nobody can receive
+    db.delete(reset_record)
+    db.commit()
+    return False, "Failed to send OTP"
 
 
 def verify_otp(email: str, otp: str, db) -> tuple[bool, str, str]:
@@ -114,6 +133,7 @@ def reset_password(reset_token: str, new_password: str, db) -> tuple[bool, str]:
         db.add(user)
         db.commit()
         db.refresh(user)
+        invalidate_user(user.id)
         
         return True, "Password reset successfully"
     except jwt.ExpiredSignatureError:
@@ -0,0 +1,95 @@
+"""
+Conditional GET for polled feeds.
+
+A feed's validator is its newest (created_at, id) plus something that
+changes when a post is deleted, since deletions do not move the newest row.
+Feeds scoped to one user use their row count, an index range scan over
+that user's rows; the public timeline, too large to count on every poll,
+uses its FeedWatermark version instead, bumped by every new, deleted and
+edited post (services/timeline.py), since created_at is not commit order. Home timeline validators are weak: an edited remote
+post (Update) keeps its created_at, so a poll may see the old text until
+the feed changes otherwise.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import FeedWatermark
+
+# Bump when a response format changes so clients drop what they cached
+ETAG_VERSION = 1
+
+
+@dataclass
+class FeedState:
+    latest_at: Optional[datetime]
+    latest_id: Optional[str]
+    count: int
+    extra: tuple = ()  # anything else the payload shows, e.g. counters
+
+
+async def feed_state(db: AsyncSession, created_col, id_col, *criteria, watermark: str | None = None) -> FeedState:
+    """
+    Validator state of the feed of rows matching `criteria`; with a
+    `watermark` scope its version stands in for the row count.
+    """
+    latest = (await db.execute(
+        select(created_col, id_col).where(*criteria)
+        .order_by(created_col.desc(), id_col.desc()).limit(1)
+    )).first()
+    if watermark is None:
+        count = await db.scalar(select(func.count()).select_from(created_col.table).where(*criteria))
+    else:
+        count = await db.scalar(
+            select(FeedWatermark.version).where(FeedWatermark.scope == watermark)
+        ) or 0
+    if latest is None:
+        return FeedState(None, None, count)
+    return FeedState(latest[0], latest[1], count)
+
+
+def _etag(state: FeedState, key: tuple) -> str:
+    raw = repr((ETAG_VERSION, key, state.latest_at, state.latest_id, state.count, state.extra))
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def validators(state: FeedState, key: tuple, private: bool = False) -> dict:
+    """
+    ETag, Last-Modified and Cache-Control headers for a feed response.
+    `key` identifies the request (route, viewer, page parameters) within
+    the validator.
+    """
+    headers = {
+        "ETag": _etag(state, key),
+        "Cache-Control": "private, no-cache" if private else "no-cache",
+    }
+    if private:
+        headers["Vary"] = "Authorization"
+    if state.latest_at:
+        headers["Last-Modified"] = format_datetime(
+            _as_utc(state.latest_at).replace(microsecond=0), usegmt=True
+        )
+    return headers
+
+
+def is_fresh(request: Request, headers: dict) -> bool:
+    """True when the client's copy matches `headers` and a 304 will do"""
+    # If-Modified-Since is ignored: at one-second resolution it misses
+    # deletions and posts created in the same second, and created_at is not
+    # commit order. Last-Modified is informational; only the ETag gives 304s
+    if_none_match = request.headers.get("if-none-match")
+    return if_none_match is not None and _etag_matches(if_none_match, headers["ETag"])
@@ -1,4 +1,5 @@
 from typing import Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,11 +11,84 @@ class Settings(BaseSettings):
     BASE_URL : str
     REMOTE_INBOX_URL: Optional[str] = None
     DELIVERY_ENABLED: bool = SEND_TO_OTHER_INSTANCE
+
+    # Connection pool of each engine (sync and async). A request holds a
+    # connection from one pool only (authentication borrows an async one
+    # briefly on a user cache miss), but both pools can fill up at once:
+    # max_connections must cover 2 * (size + overflow) per worker process
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_TIMEOUT: float = 30.0
+
+    # Shared federation HTTP client
+    FEDERATION_TIMEOUT: float = 5.0
+    FEDERATION_CONNECT_TIMEOUT: float = 3.0
+    FEDERATION_MAX_CONNECTIONS: int = 100
+    FEDERATION_MAX_KEEPALIVE: int = 20
+    FEDERATION_KEEPALIVE_EXPIRY: float = 30.0
+    FEDERATION_MAX_CONNECTIONS_PER_HOST: int = 8
+
+    # Outbox delivery worker
+    DELIVERY_WORKER_IN_APP: bool = True
+    DELIVERY_BATCH_SIZE: int = 50
+    DELIVERY_POLL_INTERVAL: float = 2.0
+    DELIVERY_MAX_ATTEMPTS: int = 8
+    DELIVERY_BACKOFF_BASE: float = 30.0
+    DELIVERY_BACKOFF_MAX: float = 3600.0
+    DELIVERY_LEASE_SECONDS: int = 300
+
+    # Serve the old full-table lists when a client sends no limit/cursor.
+    # Off by default, which changes the response of clients written for the
+    # lists (see "Pagination" in readme.md); turn on while they migrate
+    LEGACY_UNPAGINATED_FEEDS: bool = False
     
+    # Password hashing (PASSWORD_HASH_WORKERS=0 hashes inline). Only the
+    # workers run argon2, so at most PASSWORD_HASH_WORKERS * ARGON2_MEMORY_COST
+    # is in use; queued requests hold no hashing memory.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    # Unset keeps the argon2 library defaults, which existing hashes were made
+    # with; changing one rehashes every user at their next login
+    ARGON2_TIME_COST: Optional[int] = None
+    ARGON2_MEMORY_COST: Optional[int] = None  # KiB
+    ARGON2_PARALLELISM: Optional[int] = None
+
+    # Caching (CACHE_REDIS_URL switches to a shared Redis-compatible backend).
+    # The in-process backend only sees this process's invalidations: set
+    # CACHE_REDIS_URL whenever more than one process serves or writes feeds
+    CACHE_REDIS_URL: Optional[str] = None
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: float = 60.0
+    FEED_CACHE_SIZE: int = 5000
+    FEED_CACHE_TTL: float = 30.0
+
+    # Server push of feed changes ("postgres" fans out across workers with LISTEN/NOTIFY)
+    PUSH_BACKEND: str = "local"  # "local", "postgres"
+    PUSH_CHANNEL: str = "fsn_push"
+    PUSH_QUEUE_SIZE: int = 100
+    PUSH_KEEPALIVE: float = 15.0
+
+    # Inbox queue (INBOX_WORKERS=0 processes activities inline in the request)
+    INBOX_WORKERS: int = 2
+    INBOX_WORKER_IN_APP: bool = True
+    INBOX_BATCH_SIZE: int = 100
+    INBOX_POLL_INTERVAL: float = 1.0
+    INBOX_MAX_ATTEMPTS: int = 5
+    INBOX_SEEN_CACHE_SIZE: int = 100000
+    INBOX_SEEN_CACHE_TTL: float = 86400.0
+
+    # Development/CI: record each request's SQL, flag N+1 and slow statements
+    QUERY_INSPECTOR: bool = False
+    QUERY_REPEAT_THRESHOLD: int = 5
+    QUERY_SLOW_MS: float = 100.0
+
     # Email settings
-    EMAIL_PROVIDER: str = "gmail_oauth"  # "gmail_oauth", "smtp"
+    EMAIL_PROVIDER: str = "gmail_oauth"  # "gmail_oauth", "smtp", "memory", "file"
     FROM_EMAIL: str = ""
     OTP_EXPIRY_MINUTES: int = 10
+    EMAIL_ASYNC: bool = True  # send from a background queue
+    EMAIL_QUEUE_SIZE: int = 1000
+    EMAIL_FILE_DIR: str = "mail_outbox"  # for EMAIL_PROVIDER="file"
     
     # Gmail OAuth2 settings
     GMAIL_CLIENT_ID: str = ""
@@ -26,8 +100,17 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
+    SMTP_POOL_SIZE: int = 4
+    SMTP_IDLE_CHECK_SECONDS: int = 30
 
     class Config:
         env_file = ".env"
 
+    @model_validator(mode="after")
+    def _delivery_defaults_to_send_flag(self):
+        # DELIVERY_ENABLED was always meant to default to SEND_TO_OTHER_INSTANCE
+        if "DELIVERY_ENABLED" not in self.model_fields_set:
+            self.DELIVERY_ENABLED = self.SEND_TO_OTHER_INSTANCE
+        return self
+
 settings = Settings()
@@ -1,22 +1,86 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker,declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.sql.functions import now
 from app.config import settings
+from app import metrics
 
+_url = make_url(settings.DATABASE_URL)
+IS_SQLITE = _url.get_backend_name() == "sqlite"
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={
-        "sslmode": "require",
-        "options": "-c statement_timeout=5000"
-    },
-    pool_size=20,
-    max_overflow=40,
-    pool_timeout=30,
+
+class _TimedCheckout:
+    """Pool mixin recording how long each checkout took (waiting included)"""
+    engine_name = ""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.POOL_TIMEOUTS.labels(self.engine_name).inc()
+            raise
+        finally:
+            metrics.POOL_CHECKOUT_SECONDS.labels(self.engine_name).observe(time.perf_counter() - started)
+
+
+class _SyncPool(_TimedCheckout, QueuePool):
+    engine_name = "sync"
+
+
+class _AsyncPool(_TimedCheckout, AsyncAdaptedQueuePool):
+    engine_name = "async"
+
+
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_recycle=1800,
     pool_pre_ping=True
 )
 
 
+def _sync_engine():
+    if IS_SQLITE:
+        # Local development, tests and benchmarks
+        return create_engine(_url, connect_args={"check_same_thread": False, "timeout": 30})
+    return create_engine(
+        _url,
+        connect_args={
+            "sslmode": _url.query.get("sslmode", "require"),
+            "options": "-c statement_timeout=5000"
+        },
+        poolclass=_SyncPool,
+        **POOL_OPTIONS
+    )
+
+
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # CURRENT_TIMESTAMP has whole seconds and a different text format from
+    # bound datetimes, which breaks (created_at, id) keyset comparisons
+    return "(STRFTIME('%Y-%m-%d %H:%M:%f000', 'NOW'))"
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+engine = _sync_engine()
+if IS_SQLITE:
+    event.listen(engine, "connect", _sqlite_pragmas)
+metrics.instrument_engine(engine, "sync")
+
+
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
@@ -25,4 +89,32 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Async engine for `async def` routes: they await the database on the event
+# loop instead of holding one of the threadpool's workers per request
+def _async_engine():
+    if IS_SQLITE:
+        return create_async_engine(_url.set(drivername="sqlite+aiosqlite"), connect_args={"timeout": 30})
+
+    return create_async_engine(
+        _url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"]),
+        connect_args={
+            "ssl": _url.query.get("sslmode", "require"),
+            "server_settings": {"statement_timeout": "5000"}
+        },
+        poolclass=_AsyncPool,
+        **POOL_OPTIONS
+    )
+
+
+async_engine = _async_engine()
+if IS_SQLITE:
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+metrics.instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,9 +1,34 @@
-from fastapi import Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from fastapi import HTTPException, Header
+from sqlalchemy import select
 from jose import jwt, JWTError
-from app.database import get_db
+from app.database import AsyncSessionLocal
 from app.config import settings
 from app.models import User
+from app.services.cache import make_cache, MISSING
+from app import stats
+
+# Resolved users by id, so authenticated requests skip the users table
+user_cache = make_cache("users", settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+stats.register("user_cache", user_cache.stats)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    The authenticated account as get_current_user resolves it: only the
+    fields kept in the user cache. Not an ORM object, so it can't be added
+    to a session or lazily load counters; query the users table for those.
+    """
+    id: str
+    username: str
+    email: str | None = None
+
+
+def invalidate_user(user_id: str):
+    """Drop a cached user; call after any change to the account"""
+    user_cache.delete(user_id)
+
 
 def verify_token(token: str):
     try:
@@ -12,15 +37,28 @@ def verify_token(token: str):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-def get_current_user(authorization: str = Header(...), db: Session = Depends(get_db)):
+async def get_current_user(authorization: str = Header(...)):
+    # Async so authentication never takes a threadpool worker, even for sync
+    # routes. A cache miss borrows an async connection only for the lookup,
+    # so sync routes don't hold one from each pool for the whole request
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid auth header")
 
     token = authorization.split(" ")[1]
     payload = verify_token(token)
+    user_id = payload["user_id"]
+
+    cached = user_cache.get(user_id)
+    if cached is not MISSING:
+        return CurrentUser(**cached)
 
-    user = db.query(User).filter(User.id == payload["user_id"]).first()
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(
+            select(User.id, User.username, User.email).where(User.id == user_id)
+        )).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
\ No newline at end of file
+    current = CurrentUser(*user)
+    user_cache.set(user_id, vars(current))
+    return current
@@ -2,11 +2,19 @@ import random
 import string
 import smtplib
 import base64
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
 from app.config import settings
-from datetime import datetime, timedelta
+from app import stats
+
+logger = logging.getLogger(__name__)
 
 
 def generate_otp(length: int = 6) -> str:
@@ -14,106 +22,237 @@ def generate_otp(length: int = 6) -> str:
     return ''.join(random.choices(string.digits, k=length))
 
 
-def _send_with_gmail_oauth(email: str, subject: str, html: str, text: str) -> bool:
-    """Send email using Gmail API with OAuth2 credentials"""
-    try:
+def _build_message(email: str, subject: str, html: str, text: str) -> MIMEMultipart:
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = settings.FROM_EMAIL
+    message["To"] = email
+    message.attach(MIMEText(text, "plain"))
+    message.attach(MIMEText(html, "html"))
+    return message
+
+
+class GmailTransport:
+    """
+    Gmail API sender.
+    The credentials and the discovery-built service are created once; the
+    access token is refreshed by google-auth only when it has expired.
+    """
+
+    def __init__(self):
+        self._service = None
+        self._build_lock = threading.Lock()
+        # httplib2 connections are not thread-safe
+        self._send_lock = threading.Lock()
+
+    def _get_service(self):
         from google.oauth2.credentials import Credentials
-        from google.auth.transport.requests import Request
         from googleapiclient.discovery import build
-        
+
+        with self._build_lock:
+            if self._service is None:
+                credentials = Credentials(
+                    token=None,  # Refreshed on first use
+                    refresh_token=settings.GMAIL_REFRESH_TOKEN,
+                    token_uri='https://oauth2.googleapis.com/token',
+                    client_id=settings.GMAIL_CLIENT_ID,
+                    client_secret=settings.GMAIL_CLIENT_SECRET,
+                    scopes=['https://www.googleapis.com/auth/gmail.send']
+                )
+                self._service = build('gmail', 'v1', credentials=credentials, cache_discovery=False)
+            return self._service
+
+    def send(self, email: str, message: MIMEMultipart) -> bool:
+        """Send email using Gmail API with OAuth2 credentials"""
         if not settings.GMAIL_CLIENT_ID or not settings.GMAIL_CLIENT_SECRET or not settings.GMAIL_REFRESH_TOKEN:
-            print("Gmail OAuth2 credentials not configured")
+            logger.error("Gmail OAuth2 credentials not configured")
+            return False
+        try:
+            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            service = self._get_service()
+            with self._send_lock:
+                result = service.users().messages().send(
+                    userId='me',
+                    body={'raw': raw_message}
+                ).execute()
+            logger.info("Email sent successfully. Message ID: %s", result.get('id'))
+            return True
+        except Exception:
+            logger.exception("Error sending email with Gmail API")
             return False
-        
-        # Create credentials from OAuth2 tokens
-        credentials = Credentials(
-            token=None,  # Will be refreshed
-            refresh_token=settings.GMAIL_REFRESH_TOKEN,
-            token_uri='https://oauth2.googleapis.com/token',
-            client_id=settings.GMAIL_CLIENT_ID,
-            client_secret=settings.GMAIL_CLIENT_SECRET,
-            scopes=['https://www.googleapis.com/auth/gmail.send']
-        )
-        
-        # Refresh token to get valid access token
-        request = Request()
-        credentials.refresh(request)
-        
-        # Build Gmail service
-        service = build('gmail', 'v1', credentials=credentials)
-        
-        # Create message
-        message = MIMEMultipart('alternative')
-        message['to'] = email
-        message['from'] = settings.FROM_EMAIL
-        message['subject'] = subject
-        
-        part1 = MIMEText(text, 'plain')
-        part2 = MIMEText(html, 'html')
-        message.attach(part1)
-        message.attach(part2)
-        
-        # Encode message for Gmail API
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        
-        # Send message
-        result = service.users().messages().send(
-            userId='me',
-            body={'raw': raw_message}
-        ).execute()
-        
-        print(f"Email sent successfully. Message ID: {result.get('id')}")
-        return True
-    except Exception as e:
-        print(f"Error sending email with Gmail API: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return False
 
 
-def _send_with_smtp(email: str, subject: str, html: str, text: str) -> bool:
-    """Send email using SMTP (legacy)"""
-    try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        
+class SMTPTransport:
+    """SMTP sender keeping up to SMTP_POOL_SIZE logged-in connections open"""
+
+    def __init__(self):
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=settings.SMTP_POOL_SIZE)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT)
+        server.starttls()
+        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return server
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < settings.SMTP_IDLE_CHECK_SECONDS:
+                return server
+            try:
+                # Servers drop idle sessions; make sure this one is still alive
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            self._close(server)
+
+    def _release(self, server: smtplib.SMTP):
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._close(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def send(self, email: str, message: MIMEMultipart) -> bool:
         if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
-            print("Email credentials not configured")
+            logger.error("Email credentials not configured")
             return False
-        
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = settings.FROM_EMAIL
-        message["To"] = email
-        
-        part1 = MIMEText(text, "plain")
-        part2 = MIMEText(html, "html")
-        message.attach(part1)
-        message.attach(part2)
-        
-        with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        server = None
+        try:
+            server = self._acquire()
             server.sendmail(settings.FROM_EMAIL, email, message.as_string())
-        
+            self._release(server)
+            return True
+        except Exception:
+            logger.exception("Error sending email with SMTP")
+            if server is not None:
+                self._close(server)
+            return False
+
+
+class MemoryTransport:
+    """Keeps sent messages in memory; for tests and load tests"""
+
+    def __init__(self):
+        self.outbox: list[tuple[str, MIMEMultipart]] = []
+
+    def send(self, email: str, message: MIMEMultipart) -> bool:
+        self.outbox.append((email, message))
         return True
-    except Exception as e:
-        print(f"Error sending email with SMTP: {str(e)}")
-        return False
+
+
+class FileTransport:
+    """Writes each message as an .eml file under EMAIL_FILE_DIR"""
+
+    def send(self, email: str, message: MIMEMultipart) -> bool:
+        os.makedirs(settings.EMAIL_FILE_DIR, exist_ok=True)
+        path = os.path.join(settings.EMAIL_FILE_DIR, f"{uuid.uuid4()}.eml")
+        with open(path, "wb") as f:
+            f.write(message.as_bytes())
+        return True
+
+
+_transports = {
+    "gmail_oauth": GmailTransport,
+    "smtp": SMTPTransport,
+    "memory": MemoryTransport,
+    "file": FileTransport,
+}
+_transport = None
+
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        provider = settings.EMAIL_PROVIDER.lower()
+        if provider not in _transports:
+            raise ValueError(f"Unknown email provider: {provider}")
+        _transport = _transports[provider]()
+    return _transport
+
+
+class MailQueue:
+    """Background thread sending queued messages so requests never wait on mail"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.EMAIL_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            email, message = item
+            try:
+                if get_transport().send(email, message):
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            except Exception:
+                logger.exception("Mail queue failed to send to %s", email)
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, email: str, message: MIMEMultipart) -> bool:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((email, message))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout: float = 10.0):
+        """Send what is queued, then stop the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
+
+
+mail_queue = MailQueue()
+stats.register("mail_queue", mail_queue.stats)
 
 
 def send_otp_email(email: str, otp: str, username: str) -> bool:
     """
-    Send OTP to user's email
-    Uses configured email provider (Resend by default, SMTP as fallback)
-    Returns True if successful, False otherwise
+    Send OTP to user's email through the configured provider.
+    With EMAIL_ASYNC the message is only queued and True means "accepted
+    for sending"; otherwise it is sent inline.
     """
     subject = "Password Reset OTP"
-    
+
     # Plain text version
     text = f"Hello {username},\n\nYour OTP for password reset is: {otp}\n\nThis OTP will expire in {settings.OTP_EXPIRY_MINUTES} minutes.\n\nIf you didn't request this, please ignore this email."
-    
+
     # HTML version
     html = f"""\
     <html>
@@ -127,13 +266,13 @@ def send_otp_email(email: str, otp: str, username: str) -> bool:
         </body>
     </html>
     """
-    
-    provider = settings.EMAIL_PROVIDER.lower()
-    
-    if provider == "gmail_oauth":
-        return _send_with_gmail_oauth(email, subject, html, text)
-    elif provider == "smtp":
-        return _send_with_smtp(email, subject, html, text)
-    else:
-        print(f"Unknown email provider: {provider}")
+
+    message = _build_message(email, subject, html, text)
+
+    if settings.EMAIL_ASYNC:
+        return mail_queue.enqueue(email, message)
+    try:
+        return get_transport().send(email, message)
+    except ValueError as e:
+        logger.error(str(e))
         return False
@@ -1,12 +1,44 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
-from app.routers import auth, posts, users, federation
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.config import settings
+from app.database import async_engine, engine
+from app.routers import auth, posts, users, federation, stream
+from app.services import delivery, inbox, passwords, push, query_inspector
+from app.services.federation import start_client, stop_client
+from app import stats
+from app.metrics import MetricsMiddleware
+from app.email_service import mail_queue
 
-# Create Tables
-Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic: run `python manage.py migrate` before starting
 
-app = FastAPI(title="Federated Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_client()
+    stop = asyncio.Event()
+    push.broker.bind(asyncio.get_running_loop())
+    workers = [asyncio.create_task(push.broker.backend.run(stop))]
+    if settings.DELIVERY_ENABLED and settings.DELIVERY_WORKER_IN_APP:
+        workers.append(asyncio.create_task(delivery.run_worker(stop)))
+    if settings.INBOX_WORKER_IN_APP:
+        workers.extend(
+            asyncio.create_task(inbox.run_worker(stop)) for _ in range(settings.INBOX_WORKERS)
+        )
+
+    yield
+
+    stop.set()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await stop_client()
+    await async_engine.dispose()
+    passwords.pool.shutdown()
+    await asyncio.to_thread(mail_queue.stop)
+
+
+app = FastAPI(title="Federated Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,13 +47,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.QUERY_INSPECTOR:
+    query_inspector.install(engine, async_engine.sync_engine)
+    app.add_middleware(query_inspector.QueryInspectorMiddleware)
+# Added last so it is outermost and times the whole request
+app.add_middleware(MetricsMiddleware)
 
 # Include Routers
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(posts.router, tags=["Posts"])
 app.include_router(users.router, tags=["Users"])
 app.include_router(federation.router, tags=["Federation"])
+app.include_router(stream.router, tags=["Stream"])
 
 @app.get("/")
 def homePage():
-    return {"message": "server is running..."}
\ No newline at end of file
+    return {"message": "server is running..."}
+
+@app.get("/stats")
+def runtime_stats():
+    return stats.snapshot()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
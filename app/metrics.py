@@ -0,0 +1,193 @@
+"""
+Prometheus metrics, served on GET /metrics.
+
+- Requests: latency histogram per route template, method and status.
+- SQL: statements and database time per request, plus totals per engine,
+  from cursor events on both engines (instrument_engine).
+- Connection pools: size, checked out, overflow and the time spent
+  waiting for a connection (TimedCheckout in app/database.py).
+- Federation: delivery, per-host and inbox counters, read at scrape time
+  from the subsystems' entries in the stats registry (app/stats.py).
+
+Counters are per process; with several uvicorn workers every worker has
+to be scraped on its own.
+"""
+import time
+from contextvars import ContextVar
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from app import stats
+
+REQUEST_SECONDS = Histogram(
+    "fsn_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"]
+)
+REQUEST_STATEMENTS = Histogram(
+    "fsn_http_request_db_statements", "SQL statements executed per request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+REQUEST_DB_SECONDS = Histogram(
+    "fsn_http_request_db_seconds", "Time spent in SQL statements per request",
+    ["route"], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+DB_STATEMENTS = Counter("fsn_db_statements", "SQL statements executed", ["engine"])
+DB_SECONDS = Counter("fsn_db_statement_seconds", "Time spent in SQL statements", ["engine"])
+POOL_CHECKOUT_SECONDS = Histogram(
+    "fsn_db_pool_checkout_seconds", "Time to obtain a pooled connection, including waiting and connecting",
+    ["engine"], buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+POOL_TIMEOUTS = Counter("fsn_db_pool_timeouts", "Checkouts that gave up waiting for a connection", ["engine"])
+
+
+class RequestStats:
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set per request by MetricsMiddleware; the threadpool copies the context
+# into sync routes, so their statements are attributed too
+_request: ContextVar[RequestStats | None] = ContextVar("metrics_request", default=None)
+
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+
+_engines: dict[str, object] = {}
+
+
+def instrument_engine(engine, name: str):
+    """Count the statements of a (sync) Engine and report its pool"""
+    _engines[name] = engine
+    statements, seconds = DB_STATEMENTS.labels(name), DB_SECONDS.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        statements.inc()
+        seconds.inc(elapsed)
+        current = _request.get()
+        if current is not None:
+            current.statements += 1
+            current.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("metrics_started") if context.connection else None
+        if started:
+            started.pop()
+
+
+# ---------------------------------------------------------------------------
+# Requests
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        current = RequestStats()
+        token = _request.set(current)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request.reset(token)
+            # The router stores the matched route in the scope; label by its
+            # template so /get_user/{username} is one series, not one per user
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, status).observe(time.perf_counter() - started)
+            REQUEST_STATEMENTS.labels(route).observe(current.statements)
+            REQUEST_DB_SECONDS.labels(route).observe(current.seconds)
+
+
+# ---------------------------------------------------------------------------
+# Scrape-time collectors
+# ---------------------------------------------------------------------------
+
+class PoolCollector:
+    def collect(self):
+        gauges = {
+            name: GaugeMetricFamily(f"fsn_db_pool_{name}", help_text, labels=["engine"])
+            for name, help_text in (
+                ("size", "Configured pool size"),
+                ("max_overflow", "Connections allowed beyond the pool size"),
+                ("checked_out", "Connections in use"),
+                ("overflow", "Connections open beyond the pool size"),
+            )
+        }
+        for name, engine in _engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue  # not a QueuePool
+            gauges["size"].add_metric([name], pool.size())
+            gauges["max_overflow"].add_metric([name], pool._max_overflow)
+            gauges["checked_out"].add_metric([name], pool.checkedout())
+            gauges["overflow"].add_metric([name], max(pool.overflow(), 0))
+        yield from gauges.values()
+
+
+class FederationCollector:
+    def collect(self):
+        delivery = stats.source("delivery")
+        yield _counter("fsn_delivery_batches", "Outbox batches claimed", delivery.get("batches", 0))
+        yield _counter("fsn_delivery_activities", "Activities delivered to every inbox", delivery.get("delivered", 0))
+        posts = CounterMetricFamily("fsn_delivery_posts", "Activity POSTs to remote inboxes", labels=["outcome"])
+        posts.add_metric(["ok"], delivery.get("posts", 0) - delivery.get("errors", 0))
+        posts.add_metric(["error"], delivery.get("errors", 0))
+        yield posts
+        yield _gauge("fsn_delivery_backlog", "Activities waiting for delivery", delivery.get("backlog", 0))
+
+        hosts = stats.source("federation_hosts")
+        host_requests = CounterMetricFamily("fsn_federation_requests", "Requests to remote hosts", labels=["host"])
+        host_errors = CounterMetricFamily("fsn_federation_errors", "Failed requests to remote hosts", labels=["host"])
+        host_seconds = CounterMetricFamily("fsn_federation_request_seconds", "Time spent on requests to remote hosts", labels=["host"])
+        in_flight = GaugeMetricFamily("fsn_federation_in_flight", "Requests in flight per remote host", labels=["host"])
+        for host, counters in hosts.items():
+            host_requests.add_metric([host], counters["requests"])
+            host_errors.add_metric([host], counters["errors"])
+            host_seconds.add_metric([host], counters["total_seconds"])
+            in_flight.add_metric([host], counters["in_flight"])
+        yield from (host_requests, host_errors, host_seconds, in_flight)
+
+        inbox = stats.source("inbox")
+        activities = CounterMetricFamily("fsn_inbox_activities", "Incoming activities by outcome", labels=["outcome"])
+        for outcome in ("queued", "accepted", "failed", "duplicates_cache", "duplicates_db"):
+            activities.add_metric([outcome], inbox.get(outcome, 0))
+        yield activities
+        yield _gauge("fsn_inbox_queue_depth", "Activities waiting in the inbox queue", inbox.get("depth", 0))
+        yield _gauge("fsn_inbox_queue_dead", "Activities the inbox workers gave up on", inbox.get("dead", 0))
+        yield _gauge("fsn_inbox_oldest_seconds", "Age of the oldest queued activity", inbox.get("oldest_seconds", 0.0))
+        yield _gauge("fsn_inbox_lag_seconds", "Queue time of the last processed activity", inbox.get("last_lag_seconds", 0.0))
+
+
+def _counter(name: str, help_text: str, value) -> CounterMetricFamily:
+    return CounterMetricFamily(name, help_text, value=value)
+
+
+def _gauge(name: str, help_text: str, value) -> GaugeMetricFamily:
+    return GaugeMetricFamily(name, help_text, value=value)
+
+
+REGISTRY.register(PoolCollector())
+REGISTRY.register(FederationCollector())
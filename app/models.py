@@ -1,15 +1,14 @@
-from sqlalchemy import Column, String, Boolean, Text, ForeignKey, JSON, Integer
+from sqlalchemy import Column, String, Boolean, Text, ForeignKey, JSON, Integer, Index, Float
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.config import settings
-from passlib.context import CryptContext
+from app.services import passwords
 from sqlalchemy.sql import func
 from sqlalchemy import DateTime
 from datetime import datetime
+import random
 import uuid
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 class Post(Base):
     __tablename__ = "posts"
 
@@ -19,48 +18,128 @@ class Post(Base):
     user_id = Column(String, ForeignKey("users.id"), nullable=True)
     origin_instance = Column(String, nullable=False)
     is_remote = Column(Boolean, default=False)
+    remote_uri = Column(String, nullable=True)  # ActivityPub object id of a remote post
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
         nullable=False
     )
 
+    __table_args__ = (
+        Index("ix_posts_created_id", "created_at", "id"),
+        Index("ux_posts_remote_uri", "remote_uri", unique=True),
+        Index(
+            "ix_posts_user_created", "user_id", "created_at", "id",
+            postgresql_where=(is_remote == False),
+            sqlite_where=(is_remote == False)
+        ),
+        Index("ix_posts_author_created", "author", "created_at"),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(String,primary_key=True)
     username = Column(String,unique=True,nullable=False)
     password_hash = Column(String,nullable=False)
-    email = Column(String,nullable=True)
+    email = Column(String,nullable=True,index=True)
     #profile_photo_url = Column(String,nullable=True)
+    # Uniform in [0, 1); /random_users seeks into its index instead of sorting
+    random_key = Column(Float,nullable=False,default=random.random,index=True)
+    # Denormalized counters kept by services/counters.py in the writing transaction
+    post_count = Column(Integer,nullable=False,default=0,server_default="0")
+    follower_count = Column(Integer,nullable=False,default=0,server_default="0")
+    following_count = Column(Integer,nullable=False,default=0,server_default="0")
+    pending_count = Column(Integer,nullable=False,default=0,server_default="0")
 
+    __table_args__ = (
+        # Case-insensitive prefix search: lower(username) LIKE 'q%'
+        Index(
+            "ix_users_username_lower",
+            func.lower(username).label("username_lower"),
+            postgresql_ops={"username_lower": "text_pattern_ops"}
+        ),
+    )
+
+    # Argon2 runs in the process pool in services/passwords.py
     @staticmethod
     def hash_password(password:str) -> str:
-        return pwd_context.hash(password)
+        return passwords.hash_password(password)
     
     def verify_password(self,password:str) -> bool:
-        return pwd_context.verify(password,self.password_hash)
+        return passwords.verify_password(password,self.password_hash)[0]
     
 class Activity(Base):
     __tablename__ = "activities"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    ap_id = Column(String, nullable=True)  # "id" of a remote activity, for deduplication
     type = Column(String, nullable=False)
     actor = Column(String, nullable=False)
     object = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_local = Column(Boolean, default=True)
     is_delivered = Column(Boolean, default=False)
+    # Outbox bookkeeping for the delivery worker (services/delivery.py);
+    # inboxes holds the shared inboxes still to deliver to (NULL = unresolved)
+    inboxes = Column(JSON, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ux_activities_ap_id", "ap_id", unique=True),
+        # Only the outbox backlog is indexed, not the full activity history
+        Index(
+            "ix_activities_undelivered", "created_at",
+            postgresql_where=(is_local == True) & (is_delivered == False),
+            sqlite_where=(is_local == True) & (is_delivered == False)
+        ),
+        # Keyset pages of an actor's outbox collection
+        Index(
+            "ix_activities_local_actor_created", "actor", "created_at", "id",
+            postgresql_where=(is_local == True),
+            sqlite_where=(is_local == True)
+        ),
+    )
+
+class InboxItem(Base):
+    """
+    Remote activity accepted by /inbox and waiting for an inbox worker
+    (services/inbox.py). Rows are deleted once processed; rows that keep
+    failing stay behind with attempts >= INBOX_MAX_ATTEMPTS for inspection
+    until the same activity is delivered again and replaces them.
+    """
+    __tablename__ = "inbox_queue"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    ap_id = Column(String, nullable=True)
+    payload = Column(JSON, nullable=False)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ux_inbox_queue_ap_id", "ap_id", unique=True),
+        Index("ix_inbox_queue_received", "received_at", "id"),
+    )
+
 
 class Connection(Base):
     __tablename__ = "connections"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    requester_id = Column(String, ForeignKey("users.id"), nullable=False)
+    requester_id = Column(String, ForeignKey("users.id"), nullable=True)  # NULL for remote requesters
+    requester_actor = Column(String, nullable=True)  # actor URL of a remote requester
     target_actor = Column(String, nullable=False)  # actor URL
     status = Column(String, default="pending")     # pending | accepted | rejected
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_connections_requester_status_created", "requester_id", "status", "created_at", "id"),
+        Index("ix_connections_target_status_created", "target_actor", "status", "created_at", "id"),
+    )
+
 class PasswordReset(Base):
     __tablename__ = "password_resets"
 
@@ -69,4 +148,47 @@ class PasswordReset(Base):
     otp = Column(String, nullable=False)
     otp_expires_at = Column(DateTime, nullable=False)
     is_used = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_password_resets_user_otp", "user_id", "otp"),
+    )
+
+class HomeTimelineEntry(Base):
+    __tablename__ = "home_timeline"
+
+    # One row per (reader, post); created_at is copied from the post so a
+    # page is a single range scan on (owner_id, created_at, post_id)
+    owner_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(String, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_home_timeline_owner_created", "owner_id", "created_at", "post_id"),
+    )
+
+class RemoteActor(Base):
+    __tablename__ = "remote_actors"
+
+    # Remote actors we have seen in the inbox, so search can find them
+    actor_url = Column(String, primary_key=True)
+    username = Column(String, nullable=False)
+    instance = Column(String, nullable=False)
+    first_seen_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_remote_actors_username_lower",
+            func.lower(username).label("username_lower"),
+            postgresql_ops={"username_lower": "text_pattern_ops"}
+        ),
+    )
+
+class FeedWatermark(Base):
+    __tablename__ = "feed_watermarks"
+
+    # Bumped whenever a post enters, leaves or changes in a feed. With the newest
+    # row it validates feeds too large to count on every poll
+    # (see app/conditional.py)
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+from app.config import settings
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class PageParams:
+    """
+    Query parameters shared by every keyset-paginated endpoint.
+    `limit` and `cursor` are both optional so old clients keep working.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    @property
+    def legacy(self) -> bool:
+        """
+        True when the caller should get the old unpaginated list.
+        Only possible while LEGACY_UNPAGINATED_FEEDS is on and the client
+        did not ask for a page explicitly.
+        """
+        return (
+            settings.LEGACY_UNPAGINATED_FEEDS
+            and self.limit is None
+            and self.cursor is None
+        )
+
+    @property
+    def size(self) -> int:
+        return self.limit or DEFAULT_PAGE_SIZE
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque cursor for the (created_at, id) position of a row"""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after_cursor(page: PageParams, created_col, id_col):
+    created_at, row_id = decode_cursor(page.cursor)
+    return tuple_(created_col, id_col) < tuple_(created_at, row_id)
+
+
+def _trim_page(rows, page: PageParams, created_col, id_col, row_key):
+    next_cursor = None
+    if len(rows) > page.size:
+        rows = rows[:page.size]
+        last = rows[-1]
+        if row_key:
+            next_cursor = encode_cursor(*row_key(last))
+        else:
+            next_cursor = encode_cursor(
+                getattr(last, created_col.key), getattr(last, id_col.key)
+            )
+    return rows, next_cursor
+
+
+def paginate(query, created_col, id_col, page: PageParams, row_key=None):
+    """
+    Apply newest-first keyset pagination on (created_col, id_col).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    `row_key(row)` returns the (created_at, id) of a row when the result
+    rows do not carry attributes named after the two columns.
+    """
+    if page.cursor:
+        query = query.filter(_after_cursor(page, created_col, id_col))
+
+    rows = (
+        query.order_by(created_col.desc(), id_col.desc())
+        .limit(page.size + 1)
+        .all()
+    )
+    return _trim_page(rows, page, created_col, id_col, row_key)
+
+
+async def apaginate(db, stmt, created_col, id_col, page: PageParams, row_key=None):
+    """
+    paginate() for a select() statement on an AsyncSession.
+    A statement selecting one entity yields the entities, otherwise rows.
+    """
+    if page.cursor:
+        stmt = stmt.where(_after_cursor(page, created_col, id_col))
+
+    result = await db.execute(
+        stmt.order_by(created_col.desc(), id_col.desc()).limit(page.size + 1)
+    )
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+    return _trim_page(rows, page, created_col, id_col, row_key)
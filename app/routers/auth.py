@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
 from app.models import User
 from app.auth import (
@@ -13,6 +14,7 @@ from app.auth import (
     reset_password
 )
 from app.config import settings
+from app.services import passwords
 
 
 router = APIRouter()
@@ -32,26 +34,30 @@ class ResetPasswordRequest(BaseModel):
     new_password: str
 
 
-@router.post("/register")
-def register(username: str, password: str, email: str, db: Session = Depends(get_db)):
+def _create_user(db: Session, user: User):
     try:
-        user = User(
-            id=str(uuid.uuid4()),
-            username=username,
-            password_hash=User.hash_password(password),
-            email=email
-        )
         db.add(user)
         db.commit()
         db.refresh(user)
-        return {"message": "user created"}
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail="username already exists")
 
+
+@router.post("/register")
+async def register(username: str, password: str, email: str, db: Session = Depends(get_db)):
+    user = User(
+        id=str(uuid.uuid4()),
+        username=username,
+        password_hash=await passwords.ahash_password(password),
+        email=email
+    )
+    await run_in_threadpool(_create_user, db, user)
+    return {"message": "user created"}
+
 @router.post("/login")
-def login(username: str, password: str, db: Session = Depends(get_db)):
-    user = authenticate_user(username, password, db)
+async def login(username: str, password: str, db: Session = Depends(get_db)):
+    user = await authenticate_user(username, password, db)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid Credentials")
 
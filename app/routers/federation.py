@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Post, Activity, Connection, User
-from app.dependencies import get_current_user
+from app.database import get_db, get_async_db
+from app.models import Post, Activity, User, Connection
+from app.dependencies import CurrentUser, get_current_user
 from app.config import settings
+from app.pagination import PageParams, apaginate
+from app.services import timeline as home_timeline
+from app.services.export import account_lines
+from app.services.federation import activity_payload
+from app.services.inbox import seen_recently, mark_seen, enqueue, process_activity, inbox_stats
 
 router = APIRouter()
 
-@router.post("/inbox")
-def inbox(activity: dict, db: Session = Depends(get_db)):
+@router.post("/inbox", status_code=202)
+def inbox(activity: dict, response: Response, db: Session = Depends(get_db)):
     activity_type = activity.get("type")
     actor = activity.get("actor")
     obj = activity.get("object")
@@ -16,81 +24,37 @@ def inbox(activity: dict, db: Session = Depends(get_db)):
     if not activity_type or not actor or not obj:
         raise HTTPException(status_code=400, detail="Invalid activity")
 
-    # Store activity (remote)
-    new_activity = Activity(
-        type=activity_type,
-        actor=actor,
-        object=obj,
-        is_local=False,
-        is_delivered=True
-    )
-    db.add(new_activity)
-
-    # Handle Create
-    if activity_type == "Create" and obj.get("type") == "Note":
-        post_id = obj.get("id")
-        content = obj.get("content")
-
-        # prevent duplicates
-        existing = db.query(Post).filter(Post.id == post_id).first()
-        if not existing:
-            post = Post(
-                id=post_id,
-                content=content,
-                user_id=None,
-                author=actor,
-                origin_instance=actor.split("/users/")[0],
-                is_remote=True
-            )
-            db.add(post)
-
-    # Handle Delete
-    if activity_type == "Delete":
-        target_id = obj.get("id")
-        post = (
-            db.query(Post)
-            .filter(Post.is_remote == True)
-            .filter(Post.id.endswith(target_id.split("/")[-1]))
-            .first()
-        )   
-        if post:
-            db.delete(post)
-
-    if activity_type == "Follow":
-        connection = Connection(
-            requester_id="REMOTE",  # placeholder
-            target_actor=activity["object"],
-            status="pending"
-        )
-        db.add(connection)
-
-    if activity_type == "Accept":
-        follow = activity["object"]
-        actor = follow["actor"]
-        target = follow["object"]
-
-        conn = db.query(Connection).filter(
-            Connection.target_actor == actor
-        ).first()
-
-        if conn:
-            conn.status = "accepted"
-
-    db.commit()
-    return {"status": "accepted"}
+    # Replays of an activity we already processed are acknowledged and dropped
+    ap_id = activity.get("id")
+    if seen_recently(ap_id):
+        return {"status": "duplicate"}
+
+    if settings.INBOX_WORKERS <= 0:
+        # Inline mode: process in the request, as before the queue existed
+        status = process_activity(db, activity)
+        db.commit()
+        response.status_code = 200
+    else:
+        status = "queued" if enqueue(db, activity) else "duplicate"
+        db.commit()
+    mark_seen(ap_id)
+    if status == "accepted":
+        inbox_stats.accepted += 1
+    return {"status": status}
 
 @router.post("/inbox/delete")
 def delete_remote_post(id:str,db:Session=Depends(get_db)):
-    post = db.query(Post).filter(Post.id==id,Post.is_remote==True).first()
+    post = db.query(Post).filter(Post.remote_uri==id).first()
     if not post:
         return {"status":"ignored"}
 
+    home_timeline.remove_post(db, post.id)
     db.delete(post)
     db.commit()
     return {"status":"deleted"}
 
 @router.post("/users/{username}/outbox")
-def outbox(username: str, activity: dict, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def outbox(username: str, activity: dict, db: Session = Depends(get_db), user: CurrentUser = Depends(get_current_user)):
     if user.username != username:
         raise HTTPException(
             status_code=403,
@@ -118,4 +82,130 @@ def outbox(username: str, activity: dict, db: Session = Depends(get_db), user: U
     return {
         "status": "stored",
         "activity_id": new_activity.id
-    }
\ No newline at end of file
+    }
+
+
+# ---------------------------------------------------------------------------
+# ActivityPub collections: GET .../outbox, .../followers, .../following
+# return an OrderedCollection; ?page=true returns its newest-first pages,
+# linked by keyset cursors
+# ---------------------------------------------------------------------------
+
+AS_CONTEXT = "https://www.w3.org/ns/activitystreams"
+ACTIVITY_JSON = "application/activity+json"
+OUTBOX_TYPES = ("Create", "Update", "Delete")
+
+
+async def _collection_owner(db: AsyncSession, username: str):
+    owner = (await db.execute(
+        select(User.id, User.username, User.follower_count, User.following_count)
+        .where(User.username == username)
+    )).first()
+    if not owner:
+        raise HTTPException(status_code=404, detail="User not found")
+    return owner
+
+
+async def _collection(db, collection_id, total, page, params, stmt, created_col, id_col, item, row_key=None):
+    if not page:
+        body = {
+            "@context": AS_CONTEXT,
+            "id": collection_id,
+            "type": "OrderedCollection",
+            "totalItems": total,
+            "first": f"{collection_id}?page=true"
+        }
+        return JSONResponse(body, media_type=ACTIVITY_JSON)
+
+    rows, next_cursor = await apaginate(db, stmt, created_col, id_col, params, row_key)
+    page_url = f"{collection_id}?page=true" + (f"&limit={params.limit}" if params.limit else "")
+    body = {
+        "@context": AS_CONTEXT,
+        "id": page_url + (f"&cursor={params.cursor}" if params.cursor else ""),
+        "type": "OrderedCollectionPage",
+        "partOf": collection_id,
+        "orderedItems": [item(row) for row in rows]
+    }
+    if next_cursor:
+        body["next"] = f"{page_url}&cursor={next_cursor}"
+    return JSONResponse(body, media_type=ACTIVITY_JSON)
+
+
+@router.get("/users/{username}/outbox")
+async def outbox_collection(
+    username: str,
+    page: bool = False,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    owner = await _collection_owner(db, username)
+    actor = f"{settings.BASE_URL}/users/{owner.username}"
+    criteria = (Activity.actor == actor, Activity.is_local == True, Activity.type.in_(OUTBOX_TYPES))
+    total = None if page else await db.scalar(select(func.count()).select_from(Activity).where(*criteria))
+    return await _collection(
+        db, f"{actor}/outbox", total, page, params,
+        select(Activity).where(*criteria), Activity.created_at, Activity.id, activity_payload
+    )
+
+
+@router.get("/activities/{activity_id}")
+async def get_activity(activity_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Dereferences the ids activity_payload gives our local activities"""
+    activity = (await db.execute(
+        select(Activity).where(Activity.id == activity_id, Activity.is_local == True)
+    )).scalar_one_or_none()
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    return JSONResponse({"@context": AS_CONTEXT, **activity_payload(activity)}, media_type=ACTIVITY_JSON)
+
+
+@router.get("/users/{username}/followers")
+async def followers_collection(
+    username: str,
+    page: bool = False,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    owner = await _collection_owner(db, username)
+    actor = f"{settings.BASE_URL}/users/{owner.username}"
+    # Local followers are stored by user id, remote ones by actor URL
+    stmt = (
+        select(Connection.id, Connection.created_at, Connection.requester_actor, User.username)
+        .outerjoin(User, User.id == Connection.requester_id)
+        .where(Connection.target_actor == actor, Connection.status == "accepted")
+    )
+    return await _collection(
+        db, f"{actor}/followers", owner.follower_count, page, params,
+        stmt, Connection.created_at, Connection.id,
+        lambda row: row.requester_actor or f"{settings.BASE_URL}/users/{row.username}"
+    )
+
+
+@router.get("/users/{username}/following")
+async def following_collection(
+    username: str,
+    page: bool = False,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    owner = await _collection_owner(db, username)
+    actor = f"{settings.BASE_URL}/users/{owner.username}"
+    stmt = select(Connection.id, Connection.created_at, Connection.target_actor).where(
+        Connection.requester_id == owner.id, Connection.status == "accepted"
+    )
+    return await _collection(
+        db, f"{actor}/following", owner.following_count, page, params,
+        stmt, Connection.created_at, Connection.id, lambda row: row.target_actor
+    )
+
+
+@router.get("/users/{username}/export")
+async def export_account(username: str, user: CurrentUser = Depends(get_current_user)):
+    """The whole account as NDJSON, streamed with constant memory"""
+    if user.username != username:
+        raise HTTPException(status_code=403, detail="Cannot export another account")
+    return StreamingResponse(
+        account_lines(user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{username}.ndjson"'}
+    )
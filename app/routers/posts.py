@@ -1,17 +1,24 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.database import get_db
-from app.models import Post, User, Activity, Connection
-from app.dependencies import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
+from app.database import get_db, get_async_db
+from app.models import Post, Activity, HomeTimelineEntry
+from app.dependencies import CurrentUser, get_current_user
 from app.config import settings
-from app.services.federation import build_create_activity, build_delete_activity, deliver_activity
+from app.pagination import PageParams, paginate, apaginate
+from app.conditional import feed_state
+from app.schemas import Page, PostOut, FeedPost, POST_COLUMNS
+from app.services.federation import build_create_activity, build_delete_activity
+from app.services import timeline as home_timeline
+from app.services import feed_cache
+from app.services import counters
 
 router = APIRouter()
 
-@router.post("/posts")
-def create_post(content: str, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.post("/posts", response_model=PostOut)
+def create_post(content: str, user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     post = Post(
         id=str(uuid.uuid4()),
         content=content,
@@ -21,6 +28,7 @@ def create_post(content: str, user: User = Depends(get_current_user), db: Sessio
         is_remote=False
     )
     db.add(post)
+    counters.adjust(db, user.id, post_count=1)
     db.commit()
     db.refresh(post)
 
@@ -33,36 +41,80 @@ def create_post(content: str, user: User = Depends(get_current_user), db: Sessio
         is_delivered=False
     )
     db.add(activity)
+    home_timeline.fan_out_post(db, post.id, activity_payload["actor"])
     db.commit()
-    
-    deliver_activity(activity)
+
+    # Delivered by the outbox worker (services/delivery.py)
     return post
 
-@router.get("/get_posts")
-def get_posts(db: Session = Depends(get_db)):
-    return db.query(Post).order_by(Post.id.desc()).all()
+@router.get("/get_posts", response_model=Page[PostOut] | list[PostOut])
+def get_posts(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    if page.legacy:
+        return db.query(*POST_COLUMNS).order_by(Post.id.desc()).all()
+
+    posts, next_cursor = paginate(db.query(*POST_COLUMNS), Post.created_at, Post.id, page)
+    return {"items": posts, "next_cursor": next_cursor}
+
+TimelineResponse = Page[PostOut] | list[PostOut]
+HomeTimelineResponse = Page[FeedPost] | list[FeedPost]
+
+@router.get("/timeline", response_model=TimelineResponse)
+async def timeline(
+    request: Request,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    async def validate():
+        return await feed_state(db, Post.created_at, Post.id, watermark=feed_cache.TIMELINE)
 
-@router.get("/timeline")
-def timeline(db: Session = Depends(get_db)):
-    posts = db.query(Post).order_by(Post.created_at.desc()).all()
-    # ... logic to format response ...
-    return posts
+    async def render():
+        if page.legacy:
+            return (await db.execute(select(*POST_COLUMNS).order_by(Post.created_at.desc()))).all()
+        posts, next_cursor = await apaginate(db, select(*POST_COLUMNS), Post.created_at, Post.id, page)
+        return {"items": posts, "next_cursor": next_cursor}
 
-@router.get("/timeline_connected_users")
-def timeline_connected_users(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    connections = db.query(Connection).filter(
-        Connection.requester_id == user.id,
-        Connection.status == "accepted"
-    ).all()
+    return await feed_cache.serve(
+        request, feed_cache.TIMELINE, (page.limit, page.cursor, page.legacy),
+        TimelineResponse, validate, render
+    )
+
+@router.get("/timeline_connected_users", response_model=HomeTimelineResponse)
+async def timeline_connected_users(
+    request: Request,
+    page: PageParams = Depends(),
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Served from the materialized home timeline (see services/timeline.py)
+    async def validate():
+        return await feed_state(
+            db, HomeTimelineEntry.created_at, HomeTimelineEntry.post_id, HomeTimelineEntry.owner_id == user.id
+        )
 
-    connected_usernames = [c.target_actor.rstrip("/").split("/")[-1] for c in connections]
-    
-    posts = db.query(Post).filter(Post.author.in_(connected_usernames)).order_by(desc(Post.created_at)).all()
-    
-    return [{"id": p.id, "content": p.content, "author": p.author, "created_at": p.created_at} for p in posts]
+    async def render():
+        stmt = (
+            select(
+                Post.id, Post.content, Post.author, Post.created_at,
+                HomeTimelineEntry.created_at.label("entry_created_at"), HomeTimelineEntry.post_id
+            )
+            .join(HomeTimelineEntry, HomeTimelineEntry.post_id == Post.id)
+            .where(HomeTimelineEntry.owner_id == user.id)
+        )
+        if page.legacy:
+            return (await db.execute(stmt.order_by(desc(HomeTimelineEntry.created_at)))).all()
+        rows, next_cursor = await apaginate(
+            db, stmt, HomeTimelineEntry.created_at, HomeTimelineEntry.post_id, page,
+            row_key=lambda row: (row.entry_created_at, row.post_id)
+        )
+        return {"items": rows, "next_cursor": next_cursor}
+
+    return await feed_cache.serve(
+        request, feed_cache.home(user.id), (page.limit, page.cursor, page.legacy),
+        HomeTimelineResponse, validate, render, private=True
+    )
 
 @router.delete("/delete/{post_id}")
-def delete_post(post_id: str, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_post(post_id: str, user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -77,7 +129,8 @@ def delete_post(post_id: str, user: User = Depends(get_current_user), db: Sessio
         is_local=True, is_delivered=False
     )
     db.add(activity)
+    home_timeline.remove_post(db, post.id)
+    counters.adjust(db, post.user_id, post_count=-1)
     db.delete(post)
     db.commit()
-    deliver_activity(activity)
     return {"status": "deleted"}
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Server-Sent Events streams of feed changes, so clients stop polling.
+
+Events: "post" and "update" carry the post as in the feeds, "delete" its
+id, and "resync" asks the client to refetch the feed because events were
+lost (it fell behind, or a worker missed notifications). Clients fetch
+the feed once, then apply the events; see services/push.py.
+"""
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.dependencies import CurrentUser, get_current_user
+from app.services import push
+
+router = APIRouter()
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(request: Request, *channels: str):
+    async with push.broker.subscribe(*channels) as subscription:
+        # Tells the client the subscription is live before anything happens
+        yield ": subscribed\n\n"
+        while not await request.is_disconnected():
+            event = await subscription.get(timeout=settings.PUSH_KEEPALIVE)
+            # A comment line keeps proxies from closing an idle stream
+            yield _sse(event) if event is not None else ": keepalive\n\n"
+
+
+def _response(stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stream/timeline")
+async def stream_timeline(request: Request):
+    return _response(event_stream(request, push.TIMELINE))
+
+
+@router.get("/stream/timeline_connected_users")
+async def stream_home_timeline(request: Request, user: CurrentUser = Depends(get_current_user)):
+    return _response(event_stream(request, push.home(user.id)))
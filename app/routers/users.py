@@ -1,175 +1,216 @@
-from fastapi import APIRouter, Depends, HTTPException
+import random
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.database import get_db
-from app.models import User, Post, Connection
-from app.dependencies import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select
+from app.database import get_db, get_async_db
+from app.models import User, Post, Connection, Activity, RemoteActor
+from app.dependencies import CurrentUser, get_current_user
 from app.config import settings
-from app.services.federation import build_follow_activity, deliver_raw_activity
+from app.pagination import PageParams, apaginate
+from app.conditional import FeedState
+from app.schemas import (
+    Page, UserOut, UserProfile, SearchResult, ConnectionOut, PendingRequest, SentRequest
+)
+from app.services.federation import build_follow_activity, build_accept_activity
+from app.services import timeline as home_timeline
+from app.services import connections as graph
+from app.services import feed_cache
+from app.services import counters
 
 router = APIRouter()
 
-@router.get("/search_users")
-def search_users(
+SEARCH_LIMIT = 10
+
+
+@router.get("/search_users", response_model=list[SearchResult])
+async def search_users(
     q: str,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Fast prefix-based user search using SQL ILIKE.
-    Returns users whose username starts with the query string (case-insensitive).
+    Fast prefix-based search over local users and known remote actors.
+    Matches lower(username) LIKE 'q%', which the text_pattern_ops indexes
+    on users and remote_actors serve as a range scan.
     Includes connection status and self-detection.
     """
     if not q or not q.strip():
         return []
-    
-    search_pattern = f"{q.strip()}%"
-    
-    # Get matching users using ILIKE for case-insensitive prefix search
-    matching_users = (
-        db.query(User)
-        .filter(User.username.ilike(search_pattern))
-        .limit(10)
-        .all()
+
+    prefix = q.strip().lower()
+    search_pattern = (
+        prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
     )
-    
-    if not matching_users:
+
+    matching_users = (await db.execute(
+        select(User.id, User.username, User.email)
+        .where(func.lower(User.username).like(search_pattern, escape="\\"))
+        .limit(SEARCH_LIMIT)
+    )).all()
+
+    matching_remote = []
+    if len(matching_users) < SEARCH_LIMIT:
+        matching_remote = (await db.execute(
+            select(RemoteActor.actor_url, RemoteActor.username, RemoteActor.instance)
+            .where(func.lower(RemoteActor.username).like(search_pattern, escape="\\"))
+            .limit(SEARCH_LIMIT - len(matching_users))
+        )).all()
+
+    if not matching_users and not matching_remote:
         return []
-    
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
-    
-    # Get all connected actors for current user
-    connected_actors = set()
-    connections = db.query(Connection).filter(
-        Connection.requester_id == user.id,
-        Connection.status == "accepted"
-    ).all()
-    for conn in connections:
-        connected_actors.add(conn.target_actor)
-    
-    # Get pending connection actors
-    pending_actors = set()
-    pending_connections = db.query(Connection).filter(
-        Connection.requester_id == user.id,
-        Connection.status == "pending"
-    ).all()
-    for conn in pending_connections:
-        pending_actors.add(conn.target_actor)
-    
-    results = []
-    for u in matching_users:
-        user_actor = f"{settings.BASE_URL}/users/{u.username}"
-        
-        if u.id == user.id:
-            status = "self"
-        elif user_actor in connected_actors:
-            status = "connected"
-        elif user_actor in pending_actors:
-            status = "pending"
-        else:
-            status = "none"
-        
-        results.append({
+
+    results = [
+        {
             "id": u.id,
             "username": u.username,
             "email": u.email,
-            "status": status
-        })
-    
+            "actor": f"{settings.BASE_URL}/users/{u.username}",
+            "instance": settings.INSTANCE_NAME,
+            "is_remote": False
+        }
+        for u in matching_users
+    ] + [
+        {
+            "id": r.actor_url,
+            "username": r.username,
+            "email": None,
+            "actor": r.actor_url,
+            "instance": r.instance,
+            "is_remote": True
+        }
+        for r in matching_remote
+    ]
+
+    # Connection status for the matched actors only, in one query
+    actors = [r["actor"] for r in results]
+    edge_status = await db.run_sync(lambda session: graph.edge_status(session, user.id, actors))
+
+    for result in results:
+        if result["id"] == user.id:
+            result["status"] = "self"
+        elif edge_status.get(result["actor"]) == "accepted":
+            result["status"] = "connected"
+        elif edge_status.get(result["actor"]) == "pending":
+            result["status"] = "pending"
+        else:
+            result["status"] = "none"
+
     return results
 
-@router.get("/get_current_user")
-def get_current_user_info(user: User = Depends(get_current_user)):
-    return {"id": user.id, "username": user.username, "email": user.email}
+@router.get("/get_current_user", response_model=UserOut)
+def get_current_user_info(user: CurrentUser = Depends(get_current_user)):
+    return user
 
-@router.get("/get_user/{username}")
-def get_user_profile(
+@router.get("/get_user/{username}", response_model=UserProfile)
+async def get_user_profile(
     username: str,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    page: PageParams = Depends(),
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_user = db.query(User).filter(User.username == username).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    profile_columns = (Post.id, Post.content, Post.created_at)
+    loaded = {}
+
+    async def validate():
+        db_user = (await db.execute(
+            select(
+                User.id, User.username, User.email,
+                User.post_count, User.follower_count, User.following_count
+            ).where(User.username == username)
+        )).first()
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        loaded["user"] = db_user
+        loaded["own_posts"] = own_posts = (Post.user_id == db_user.id, Post.is_remote == False)
+
+        # The newest post plus the counters; no COUNT over the user's posts
+        latest = (await db.execute(
+            select(Post.created_at, Post.id).where(*own_posts)
+            .order_by(Post.created_at.desc(), Post.id.desc()).limit(1)
+        )).first()
+        return FeedState(*(latest or (None, None)), count=db_user.post_count, extra=tuple(db_user))
+
+    async def render():
+        db_user, own_posts = loaded["user"], loaded["own_posts"]
+        if page.legacy:
+            posts = (await db.execute(
+                select(*profile_columns).where(*own_posts).order_by(desc(Post.created_at))
+            )).all()
+            next_cursor = None
+        else:
+            posts, next_cursor = await apaginate(
+                db, select(*profile_columns).where(*own_posts), Post.created_at, Post.id, page
+            )
 
-    posts = (
-        db.query(Post)
-        .filter(
-            Post.user_id == db_user.id,
-            Post.is_remote == False
-        )
-        .order_by(desc(Post.created_at))
-        .all()
+        return {
+            "id": db_user.id,
+            "username": db_user.username,
+            "email": db_user.email,
+            "post_count": db_user.post_count,
+            "follower_count": db_user.follower_count,
+            "following_count": db_user.following_count,
+            "posts": posts,
+            "next_cursor": next_cursor
+        }
+
+    return await feed_cache.serve(
+        request, feed_cache.profile(username), (page.limit, page.cursor, page.legacy),
+        UserProfile, validate, render, private=True
     )
 
-    return {
-        "id": db_user.id,
-        "username": db_user.username,
-        "email": db_user.email,
-        "post_count": len(posts),
-        "posts": [
-            {
-                "id": post.id,
-                "content": post.content,
-                "created_at": post.created_at.isoformat()
-            }
-            for post in posts
-        ]
-    }
+RANDOM_USERS = 5
+RANDOM_SAMPLE_ROUNDS = 3
 
-@router.get("/random_users")
+
+@router.get("/random_users", response_model=list[UserOut])
 def random_users(
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
-
-    # All actors I have ANY connection with (pending or accepted)
-    connected_actors = (
-        db.query(Connection.target_actor)
-        .filter(Connection.requester_id == user.id)
-        .union(
-            db.query(
-                func.concat(
-                    settings.BASE_URL,
-                    "/users/",
-                    User.username
-                )
-            )
-            .join(Connection, Connection.requester_id == User.id)
-            .filter(Connection.target_actor == my_actor)
+    """
+    Suggest up to five users the caller has no connection with.
+    Each round seeks to a random point of the random_key index and reads a
+    small window after it (wrapping around), so the cost does not depend
+    on the size of the users table.
+    """
+    my_actor = graph.local_actor(user.username)
+    window = RANDOM_USERS * 4
+    picked = {}
+
+    for _ in range(RANDOM_SAMPLE_ROUNDS):
+        start = random.random()
+        base = db.query(User.id, User.username, User.email).filter(User.id != user.id)
+        candidates = (
+            base.filter(User.random_key >= start)
+            .order_by(User.random_key)
+            .limit(window)
+            .all()
         )
-        .subquery()
-    )
+        if len(candidates) < window:
+            candidates += (
+                base.filter(User.random_key < start)
+                .order_by(User.random_key)
+                .limit(window - len(candidates))
+                .all()
+            )
 
-    users = (
-        db.query(User)
-        .filter(
-            User.id != user.id,  # exclude self
-            ~func.concat(
-                settings.BASE_URL,
-                "/users/",
-                User.username
-            ).in_(connected_actors)
-        )
-        .order_by(func.random())
-        .limit(5)
-        .all()
-    )
+        candidates = [c for c in candidates if c.id not in picked]
+        excluded = graph.connected_user_ids(db, user.id, my_actor, candidates)
+        for c in candidates:
+            if c.id not in excluded:
+                picked[c.id] = c
 
-    return [
-        {
-            "id": u.id,
-            "username": u.username,
-            "email": u.email
-        }
-        for u in users
-    ]
+        if len(picked) >= RANDOM_USERS or len(candidates) < window:
+            break
+
+    return random.sample(list(picked.values()), min(RANDOM_USERS, len(picked)))
 
 @router.post("/connect/{username}")
 def connect_user(
     username: str,
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     target = db.query(User).filter(User.username == username).first()
@@ -178,12 +219,7 @@ def connect_user(
 
     target_actor = f"{settings.BASE_URL}/users/{username}"
 
-    existing = db.query(Connection).filter(
-        Connection.requester_id == user.id,
-        Connection.target_actor == target_actor
-    ).first()
-
-    if existing:
+    if graph.edge_status(db, user.id, [target_actor]):
         raise HTTPException(status_code=400, detail="Request already sent")
 
     connection = Connection(
@@ -192,19 +228,24 @@ def connect_user(
         status="pending"
     )
 
-    db.add(connection)
-    db.commit()
-    db.refresh(connection)
-
     # 🔹 Build Follow activity
     follow_activity = build_follow_activity(
         actor_url=f"{settings.BASE_URL}/users/{user.username}",
         target_actor=target_actor
     )
 
-    # 🔹 Deliver ONLY if enabled
-    if settings.SEND_TO_OTHER_INSTANCE:
-        deliver_raw_activity(follow_activity)
+    # 🔹 Queue it in the outbox; the delivery worker sends it if enabled
+    db.add(connection)
+    counters.edge_added(db, connection)
+    db.add(Activity(
+        type="Follow",
+        actor=follow_activity["actor"],
+        object=follow_activity["object"],
+        is_local=True,
+        is_delivered=False
+    ))
+    db.commit()
+    db.refresh(connection)
 
     return {"status": "request_sent","connection_id":connection.id}
 
@@ -213,18 +254,15 @@ def connect_user(
 @router.post("/connect/accept/{connection_id}")
 def accept_connection(
     connection_id: str,
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.status == "pending"
-    ).first()
+    connection, requester_actor = graph.pending_request(db, connection_id)
 
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
 
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
+    my_actor = graph.local_actor(user.username)
 
     # Ensure the logged-in user is the target
     if connection.target_actor != my_actor:
@@ -232,125 +270,143 @@ def accept_connection(
 
     # 1️⃣ Mark original request as accepted
     connection.status = "accepted"
+    counters.edge_accepted(db, connection)
 
     # 2️⃣ Create mirror connection (THIS IS THE FIX)
     mirror = Connection(
         requester_id = user.id,
-        target_actor = f"{settings.BASE_URL}/users/" + (
-            db.query(User)
-            .filter(User.id == connection.requester_id)
-            .first()
-            .username
-        ),
+        target_actor = requester_actor,
         status = "accepted"
     )
 
     db.add(mirror)
+    counters.edge_added(db, mirror)
+
+    # 3️⃣ Both sides now see each other's existing posts
+    if connection.requester_id:
+        home_timeline.follow_backfill(db, connection.requester_id, my_actor)
+    home_timeline.follow_backfill(db, user.id, mirror.target_actor)
+
+    # 4️⃣ Remote requesters are told through the outbox
+    if connection.requester_actor:
+        accept = build_accept_activity(
+            my_actor, build_follow_activity(connection.requester_actor, my_actor)
+        )
+        db.add(Activity(
+            type="Accept",
+            actor=accept["actor"],
+            object=accept["object"],
+            is_local=True,
+            is_delivered=False
+        ))
     db.commit()
 
     return {"status": "connected"}
 
-@router.get("/connections/pending")
+def _listing(edges, next_cursor, page: PageParams, fields):
+    items = [{name: edge[key] for name, key in fields.items()} for edge in edges]
+    if page.legacy:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/connections/pending", response_model=Page[PendingRequest] | list[PendingRequest])
 def pending_connections(
-    user: User = Depends(get_current_user),
+    page: PageParams = Depends(),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
-
-    pending = db.query(Connection).filter(
-        Connection.target_actor == my_actor,
-        Connection.status == "pending"
-    ).all()
-
-    results = []
-
-    for conn in pending:
-        requester = db.query(User).filter(
-            User.id == conn.requester_id
-        ).first()
-
-        if requester:
-            results.append({
-                "connection_id": conn.id,
-                "from_user_id": requester.id,
-                "from_username": requester.username
-            })
-
-    return results
+    edges, next_cursor = graph.pending_in(
+        db, graph.local_actor(user.username), None if page.legacy else page
+    )
+    return _listing(edges, next_cursor, page, {
+        "connection_id": "connection_id",
+        "from_user_id": "user_id",
+        "from_username": "username",
+        "from_actor": "actor"
+    })
+
+@router.get("/connections/sent", response_model=Page[SentRequest] | list[SentRequest])
+def sent_connections(
+    page: PageParams = Depends(),
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    edges, next_cursor = graph.pending_out(db, user.id, None if page.legacy else page)
+    return _listing(edges, next_cursor, page, {
+        "connection_id": "connection_id",
+        "to_user_id": "user_id",
+        "to_username": "username",
+        "to_actor": "actor"
+    })
 
 @router.get("/count_connections")
 def count_connections(
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
-
-    count = db.query(Connection).filter(
-        Connection.target_actor == my_actor,
-        Connection.status == "accepted"
-    ).count()
+    # Denormalized on the users row (services/counters.py)
+    counts = db.query(User.follower_count, User.following_count, User.pending_count).filter(
+        User.id == user.id
+    ).first()
+    if not counts:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    return {"connection_count": count}
+    return {
+        "connection_count": counts.follower_count,
+        "following_count": counts.following_count,
+        "pending_count": counts.pending_count
+    }
 
-@router.get("/list_connections")
+@router.get("/list_connections", response_model=Page[ConnectionOut] | list[ConnectionOut])
 def list_connections(
-    user: User = Depends(get_current_user),
+    page: PageParams = Depends(),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
-
-    connections = db.query(Connection).filter(
-        Connection.target_actor == my_actor,
-        Connection.status == "accepted"
-    ).all()
-
-    results = []
-
-    for conn in connections:
-        requester = db.query(User).filter(
-            User.id == conn.requester_id
-        ).first()
-
-        if requester:
-            results.append({
-                "user_id": requester.id,
-                "username": requester.username
-            })
-
-    return results
+    edges, next_cursor = graph.followers(
+        db, graph.local_actor(user.username), None if page.legacy else page
+    )
+    return _listing(edges, next_cursor, page, {
+        "user_id": "user_id",
+        "username": "username",
+        "actor": "actor"
+    })
+
+@router.get("/connections/following", response_model=Page[ConnectionOut] | list[ConnectionOut])
+def list_following(
+    page: PageParams = Depends(),
+    user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    edges, next_cursor = graph.following(db, user.id, None if page.legacy else page)
+    return _listing(edges, next_cursor, page, {
+        "user_id": "user_id",
+        "username": "username",
+        "actor": "actor"
+    })
 
 @router.post("/remove_connection/{username}")
 def remove_connection(
     username: str,
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    target_user = db.query(User).filter(User.username == username).first()
+    target_user = db.query(User.id).filter(User.username == username).first()
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    target_actor = f"{settings.BASE_URL}/users/{username}"
-    my_actor = f"{settings.BASE_URL}/users/{user.username}"
-
-    # Remove my request to target
-    conn1 = db.query(Connection).filter(
-        Connection.requester_id == user.id,
-        Connection.target_actor == target_actor,
-        Connection.status == "accepted"
-    ).first()
+    target_actor = graph.local_actor(username)
+    my_actor = graph.local_actor(user.username)
 
-    # Remove target's request to me
-    conn2 = db.query(Connection).filter(
-        Connection.requester_id == target_user.id,
-        Connection.target_actor == my_actor,
-        Connection.status == "accepted"
-    ).first()
-
-    if conn1:
-        db.delete(conn1)
-    if conn2:
-        db.delete(conn2)
+    # Both directions (my request to target, target's request to me) at once
+    for conn in graph.mutual_edges(db, user.id, my_actor, target_user.id, target_actor):
+        counters.edge_removed(db, conn)
+        db.delete(conn)
+        if conn.requester_id == user.id:
+            home_timeline.unfollow_purge(db, user.id, target_actor)
+        else:
+            home_timeline.unfollow_purge(db, target_user.id, my_actor)
 
     db.commit()
 
-    return {"status": "connection_removed"}
\ No newline at end of file
+    return {"status": "connection_removed"}
@@ -0,0 +1,99 @@
+"""
+Response models.
+
+Routes declare these as response models and select only the columns they
+need; FastAPI validates the row tuples against the model (from_attributes)
+and writes JSON bytes through pydantic-core, with no per-object reflection.
+Only the fields listed here ever leave the server.
+"""
+from datetime import datetime
+from typing import Generic, Optional, TypeVar
+from pydantic import BaseModel, ConfigDict
+from app.models import Post
+
+T = TypeVar("T")
+
+
+class Schema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Page(Schema, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+# Posts
+
+class PostOut(Schema):
+    id: str
+    content: str
+    author: str
+    user_id: Optional[str] = None
+    origin_instance: str
+    is_remote: bool
+    created_at: datetime
+
+
+POST_COLUMNS = (
+    Post.id, Post.content, Post.author, Post.user_id,
+    Post.origin_instance, Post.is_remote, Post.created_at
+)
+
+
+class FeedPost(Schema):
+    id: str
+    content: str
+    author: str
+    created_at: datetime
+
+
+class ProfilePost(Schema):
+    id: str
+    content: str
+    created_at: datetime
+
+
+# Users
+
+class UserOut(Schema):
+    id: str
+    username: str
+    email: Optional[str] = None
+
+
+class UserProfile(UserOut):
+    post_count: int
+    follower_count: int
+    following_count: int
+    posts: list[ProfilePost]
+    next_cursor: Optional[str] = None
+
+
+class SearchResult(UserOut):
+    actor: str
+    instance: str
+    is_remote: bool
+    status: str
+
+
+# Connections
+
+class ConnectionOut(Schema):
+    user_id: Optional[str] = None
+    username: str
+    actor: str
+
+
+class PendingRequest(Schema):
+    connection_id: str
+    from_user_id: Optional[str] = None
+    from_username: str
+    from_actor: str
+
+
+class SentRequest(Schema):
+    connection_id: str
+    to_user_id: Optional[str] = None
+    to_username: str
+    to_actor: str
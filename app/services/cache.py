@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """Return the cached value, or MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class RedisCache:
+    """
+    Shared cache on a Redis-compatible server, so every worker process sees
+    the same entries and invalidations. Values must be JSON-serializable.
+    """
+
+    def __init__(self, client, namespace: str, ttl: float):
+        self._client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"fsn:{self.namespace}:{key}"
+
+    def get(self, key: str):
+        try:
+            raw = self._client.get(self._key(key))
+        except Exception:
+            # A flaky cache must never fail the request; fall through to the DB
+            self.errors += 1
+            return MISSING
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        try:
+            self._client.set(self._key(key), json.dumps(value), ex=max(1, int(ttl or self.ttl)))
+        except Exception:
+            self.errors += 1
+
+    def delete(self, key: str):
+        try:
+            self._client.delete(self._key(key))
+        except Exception:
+            self.errors += 1
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(self._key("*")))
+            if keys:
+                self._client.delete(*keys)
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+
+_redis_client = None
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(settings.CACHE_REDIS_URL)
+    return _redis_client
+
+
+def make_cache(namespace: str, maxsize: int, ttl: float):
+    """
+    Cache for one namespace: shared Redis when CACHE_REDIS_URL is set and
+    the redis package is installed, otherwise an in-process TTLCache.
+    """
+    if settings.CACHE_REDIS_URL:
+        try:
+            return RedisCache(_redis(), namespace, ttl)
+        except ImportError:
+            logger.warning("CACHE_REDIS_URL is set but redis is not installed; using in-process cache")
+    return TTLCache(maxsize, ttl)
@@ -0,0 +1,164 @@
+"""
+Connection graph queries.
+
+Every primitive here is a fixed number of queries regardless of how many
+edges it returns: listings join the requesting user in the same query
+instead of loading users row by row.
+
+Edges are Connection rows, requester -> target_actor. The requester is a
+local user (requester_id) or a remote actor (requester_actor).
+"""
+from typing import Optional
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Connection, User
+from app.pagination import PageParams, paginate
+from app.services.federation import actor_username, is_local_actor
+
+
+def local_actor(username: str) -> str:
+    return f"{settings.BASE_URL}/users/{username}"
+
+
+def _page(query, page: Optional[PageParams]):
+    """Keyset page on (created_at, id), or every row when `page` is None"""
+    if page is None:
+        return query.order_by(Connection.created_at.desc(), Connection.id.desc()).all(), None
+    return paginate(query, Connection.created_at, Connection.id, page)
+
+
+def _inbound(db: Session, actor: str, status: str, page: Optional[PageParams]):
+    query = (
+        db.query(
+            Connection.id,
+            Connection.created_at,
+            Connection.requester_id,
+            Connection.requester_actor,
+            User.username
+        )
+        .outerjoin(User, User.id == Connection.requester_id)
+        .filter(Connection.target_actor == actor, Connection.status == status)
+    )
+    rows, next_cursor = _page(query, page)
+    edges = [
+        {
+            "connection_id": row.id,
+            "user_id": row.requester_id,
+            "username": row.username or actor_username(row.requester_actor),
+            "actor": row.requester_actor or local_actor(row.username),
+            "created_at": row.created_at
+        }
+        for row in rows
+        if row.username or row.requester_actor
+    ]
+    return edges, next_cursor
+
+
+def _outbound(db: Session, user_id: str, status: str, page: Optional[PageParams]):
+    query = db.query(Connection.id, Connection.created_at, Connection.target_actor).filter(
+        Connection.requester_id == user_id,
+        Connection.status == status
+    )
+    rows, next_cursor = _page(query, page)
+
+    # Resolve local targets to user ids with one batched lookup
+    local_names = {actor_username(r.target_actor) for r in rows if is_local_actor(r.target_actor)}
+    user_ids = dict(
+        db.query(User.username, User.id).filter(User.username.in_(local_names)).all()
+    ) if local_names else {}
+
+    edges = [
+        {
+            "connection_id": row.id,
+            "user_id": user_ids.get(actor_username(row.target_actor)) if is_local_actor(row.target_actor) else None,
+            "username": actor_username(row.target_actor),
+            "actor": row.target_actor,
+            "created_at": row.created_at
+        }
+        for row in rows
+    ]
+    return edges, next_cursor
+
+
+def followers(db: Session, actor: str, page: Optional[PageParams] = None):
+    """Accepted connections pointing at `actor`"""
+    return _inbound(db, actor, "accepted", page)
+
+
+def pending_in(db: Session, actor: str, page: Optional[PageParams] = None):
+    """Requests waiting for `actor` to accept them"""
+    return _inbound(db, actor, "pending", page)
+
+
+def following(db: Session, user_id: str, page: Optional[PageParams] = None):
+    """Accepted connections made by a local user"""
+    return _outbound(db, user_id, "accepted", page)
+
+
+def pending_out(db: Session, user_id: str, page: Optional[PageParams] = None):
+    """Requests a local user has sent that are not accepted yet"""
+    return _outbound(db, user_id, "pending", page)
+
+
+def edge_status(db: Session, user_id: str, actors: list[str]) -> dict[str, str]:
+    """
+    Status of the edges from `user_id` to each of `actors`, in one query.
+    Actors without an edge are absent; "accepted" wins over "pending".
+    """
+    if not actors:
+        return {}
+    status = {}
+    rows = db.query(Connection.target_actor, Connection.status).filter(
+        Connection.requester_id == user_id,
+        Connection.target_actor.in_(actors)
+    ).all()
+    for target_actor, edge in rows:
+        if status.get(target_actor) != "accepted":
+            status[target_actor] = edge
+    return status
+
+
+def connected_user_ids(db: Session, user_id: str, actor: str, candidates) -> set[str]:
+    """
+    Ids among `candidates` (rows with .id and .username) that have any
+    connection with the user, in either direction and any status.
+    Two index probes bounded by the candidate list, not the user's graph.
+    """
+    if not candidates:
+        return set()
+    by_actor = {local_actor(c.username): c.id for c in candidates}
+    outbound = db.query(Connection.target_actor).filter(
+        Connection.requester_id == user_id,
+        Connection.target_actor.in_(list(by_actor))
+    ).all()
+    inbound = db.query(Connection.requester_id).filter(
+        Connection.target_actor == actor,
+        Connection.requester_id.in_([c.id for c in candidates])
+    ).all()
+    return {by_actor[row.target_actor] for row in outbound} | {row.requester_id for row in inbound}
+
+
+def pending_request(db: Session, connection_id: str):
+    """(connection, requester actor URL) for a pending request, or (None, None)"""
+    row = (
+        db.query(Connection, User.username)
+        .outerjoin(User, User.id == Connection.requester_id)
+        .filter(Connection.id == connection_id, Connection.status == "pending")
+        .first()
+    )
+    if not row:
+        return None, None
+    connection, username = row
+    return connection, connection.requester_actor or local_actor(username)
+
+
+def mutual_edges(db: Session, user_id: str, actor: str, other_id: str, other_actor: str):
+    """Both directions of an accepted connection between two local users"""
+    return db.query(Connection).filter(
+        Connection.status == "accepted",
+        or_(
+            and_(Connection.requester_id == user_id, Connection.target_actor == other_actor),
+            and_(Connection.requester_id == other_id, Connection.target_actor == actor)
+        )
+    ).all()
@@ -0,0 +1,105 @@
+"""
+Per-user post and connection counters.
+
+Counters live on the users row and are adjusted with relative UPDATEs
+(count = count + delta) in the same transaction as the write they count,
+so profiles and /count_connections read them in O(1). reconcile()
+recomputes them from posts and connections to repair any drift.
+
+    post_count       local posts written by the user
+    follower_count   accepted connections to the user's actor
+    following_count  accepted connections made by the user
+    pending_count    requests waiting for the user to accept them
+"""
+from sqlalchemy import select, update, func, literal
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import User, Post, Connection
+from app.services import feed_cache
+from app.services.federation import actor_username, is_local_actor
+
+COUNTERS = ("post_count", "follower_count", "following_count", "pending_count")
+
+
+def _apply(db: Session, criterion, deltas: dict):
+    values = {name: getattr(User, name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return
+    usernames = db.execute(
+        update(User).where(criterion).values(**values).returning(User.username)
+    ).scalars().all()
+    # Profiles show the counters
+    feed_cache.invalidate(db, *map(feed_cache.profile, usernames))
+
+
+def adjust(db: Session, user_id: str | None, **deltas: int):
+    """Add `deltas` (counter name -> change) to a local user's counters"""
+    if user_id:
+        _apply(db, User.id == user_id, deltas)
+
+
+def adjust_actor(db: Session, actor: str | None, **deltas: int):
+    """adjust() by actor URL; a no-op for remote actors"""
+    if actor and is_local_actor(actor):
+        _apply(db, User.username == actor_username(actor), deltas)
+
+
+def edge_added(db: Session, connection):
+    """Count a new connection row (pending or accepted)"""
+    if connection.status == "pending":
+        adjust_actor(db, connection.target_actor, pending_count=1)
+    elif connection.status == "accepted":
+        adjust(db, connection.requester_id, following_count=1)
+        adjust_actor(db, connection.target_actor, follower_count=1)
+
+
+def edge_accepted(db: Session, connection):
+    """Move a connection from pending to accepted"""
+    adjust(db, connection.requester_id, following_count=1)
+    adjust_actor(db, connection.target_actor, pending_count=-1, follower_count=1)
+
+
+def edge_removed(db: Session, connection):
+    """Uncount a connection row that is being deleted"""
+    if connection.status == "pending":
+        adjust_actor(db, connection.target_actor, pending_count=-1)
+    elif connection.status == "accepted":
+        adjust(db, connection.requester_id, following_count=-1)
+        adjust_actor(db, connection.target_actor, follower_count=-1)
+
+
+def actual_counts():
+    """Correlated subqueries computing each counter from the source tables"""
+    actor = literal(f"{settings.BASE_URL}/users/") + User.username
+
+    def count(*criteria):
+        return select(func.count()).where(*criteria).correlate(User).scalar_subquery()
+
+    return {
+        "post_count": count(Post.user_id == User.id, Post.is_remote == False),
+        "follower_count": count(Connection.target_actor == actor, Connection.status == "accepted"),
+        "following_count": count(Connection.requester_id == User.id, Connection.status == "accepted"),
+        "pending_count": count(Connection.target_actor == actor, Connection.status == "pending"),
+    }
+
+
+def reconcile(db: Session, user_ids: list[str]) -> int:
+    """
+    Recompute the counters of `user_ids`; returns how many users had drifted.
+    Repairs are applied as deltas, so writes racing the job are kept.
+    """
+    actual = actual_counts()
+    rows = db.execute(
+        select(User.id, *(getattr(User, name) for name in COUNTERS), *actual.values())
+        .where(User.id.in_(user_ids))
+    ).all()
+
+    drifted = 0
+    for row in rows:
+        stored, computed = row[1:1 + len(COUNTERS)], row[1 + len(COUNTERS):]
+        if tuple(stored) != tuple(computed):
+            drifted += 1
+            _apply(db, User.id == row.id, {
+                name: now - before for name, before, now in zip(COUNTERS, stored, computed)
+            })
+    return drifted
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Activity
+from app.services.federation import activity_payload, get_client, resolve_inboxes
+from app import stats
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryStats:
+    def __init__(self):
+        self.batches = 0
+        self.delivered = 0
+        self.posts = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "delivered": self.delivered,
+            "posts": self.posts,
+            "errors": self.errors,
+            "backlog": backlog()
+        }
+
+
+def backlog() -> int:
+    """Local activities not yet delivered everywhere and not given up on"""
+    db = SessionLocal()
+    try:
+        return db.query(func.count(Activity.id)).filter(
+            Activity.is_local == True,
+            Activity.is_delivered == False,
+            Activity.attempts < settings.DELIVERY_MAX_ATTEMPTS
+        ).scalar()
+    finally:
+        db.close()
+
+
+delivery_stats = DeliveryStats()
+stats.register("delivery", delivery_stats.as_dict)
+
+
+def next_retry_at(attempts: int, now: datetime) -> datetime:
+    """Exponential backoff with jitter, capped at DELIVERY_BACKOFF_MAX"""
+    delay = min(
+        settings.DELIVERY_BACKOFF_BASE * (2 ** (attempts - 1)),
+        settings.DELIVERY_BACKOFF_MAX
+    )
+    return now + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def due_activities(now: datetime, limit: int):
+    """Oldest local activities whose next delivery attempt is due"""
+    return (
+        select(Activity)
+        .where(
+            Activity.is_local == True,
+            Activity.is_delivered == False,
+            Activity.attempts < settings.DELIVERY_MAX_ATTEMPTS,
+            or_(Activity.next_attempt_at == None, Activity.next_attempt_at <= now)
+        )
+        .order_by(Activity.created_at)
+        .limit(limit)
+    )
+
+
+def claim_batch(limit: int) -> list[dict]:
+    """
+    Lease up to `limit` due activities and resolve their target inboxes.
+    Rows are locked with SKIP LOCKED so several workers can drain the
+    outbox side by side; the lease (next_attempt_at pushed forward) is
+    committed before any network I/O so no lock is held while delivering.
+    A worker that dies mid-batch simply lets the lease expire.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        activities = db.scalars(
+            due_activities(now, limit).with_for_update(skip_locked=True)
+        ).all()
+
+        lease_until = now + timedelta(seconds=settings.DELIVERY_LEASE_SECONDS)
+        claimed = []
+        for activity in activities:
+            activity.next_attempt_at = lease_until
+            if activity.inboxes is None:
+                activity.inboxes = resolve_inboxes(db, activity)
+            claimed.append({
+                "id": activity.id,
+                "payload": activity_payload(activity),
+                "inboxes": list(activity.inboxes)
+            })
+
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def record_results(results: dict[str, dict[str, str]]):
+    """
+    Persist delivery outcomes.
+    `results` maps activity id to {inbox: error} for the inboxes that failed;
+    an empty dict means every inbox accepted the activity.
+    """
+    if not results:
+        return
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        activities = db.query(Activity).filter(Activity.id.in_(list(results))).all()
+        for activity in activities:
+            failed = results[activity.id]
+            activity.attempts = (activity.attempts or 0) + 1
+            activity.inboxes = sorted(failed)
+            if not failed:
+                activity.is_delivered = True
+                activity.next_attempt_at = None
+                activity.last_error = None
+            else:
+                activity.next_attempt_at = next_retry_at(activity.attempts, now)
+                activity.last_error = "; ".join(
+                    f"{inbox}: {error}" for inbox, error in sorted(failed.items())
+                )[:500]
+        db.commit()
+    finally:
+        db.close()
+
+
+async def post_activity(inbox: str, payload: dict) -> str | None:
+    """POST one activity to one inbox; returns an error string or None"""
+    try:
+        resp = await get_client().post(inbox, payload)
+        if resp.status_code in (200, 202):
+            return None
+        return f"HTTP {resp.status_code}"
+    except Exception as e:
+        return str(e) or e.__class__.__name__
+
+
+async def deliver_batch() -> int:
+    """
+    Claim, deliver and record one batch; returns the number of activities handled.
+    Every (activity, inbox) pair in a batch is posted concurrently on the
+    shared federation client.
+    """
+    claimed = await asyncio.to_thread(claim_batch, settings.DELIVERY_BATCH_SIZE)
+    jobs = [(item["id"], inbox, item["payload"]) for item in claimed for inbox in item["inboxes"]]
+    errors = await asyncio.gather(*(post_activity(inbox, payload) for _, inbox, payload in jobs))
+
+    results = {item["id"]: {} for item in claimed}
+    for (activity_id, inbox, _), error in zip(jobs, errors):
+        if error:
+            results[activity_id][inbox] = error
+    await asyncio.to_thread(record_results, results)
+
+    failed = sum(1 for error in errors if error)
+    if claimed:
+        delivery_stats.batches += 1
+        delivery_stats.delivered += sum(1 for failures in results.values() if not failures)
+        delivery_stats.posts += len(jobs)
+        delivery_stats.errors += failed
+    if failed:
+        logger.warning("Delivery batch: %d of %d inbox posts failed", failed, len(jobs))
+    return len(claimed)
+
+
+async def run_worker(stop: asyncio.Event):
+    """Drain the outbox until `stop` is set, sleeping while it is empty"""
+    logger.info("Delivery worker started")
+    while not stop.is_set():
+        try:
+            handled = await deliver_batch()
+        except Exception:
+            logger.exception("Delivery batch crashed")
+            handled = 0
+
+        if handled < settings.DELIVERY_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.DELIVERY_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    logger.info("Delivery worker stopped")
@@ -0,0 +1,60 @@
+"""
+Streaming NDJSON export of an account.
+
+One JSON object per line: the account, then its posts, connections (both
+directions) and outbox activities, each as {"type": ..., "data": ...}.
+Rows are read with yield_per, which runs a server-side cursor on
+PostgreSQL, so memory stays flat however large the account is. The
+generator owns its session because it outlives the request handler.
+"""
+import json
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import select, or_
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Activity, Connection, Post, User
+
+EXPORT_BATCH = 1000
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _line(kind: str, data: dict) -> str:
+    return json.dumps({"type": kind, "data": data}, default=_default) + "\n"
+
+
+def account_lines(user_id: str) -> Iterator[str]:
+    db = SessionLocal()
+    try:
+        user = db.execute(
+            select(User.id, User.username, User.email).where(User.id == user_id)
+        ).one()
+        actor = f"{settings.BASE_URL}/users/{user.username}"
+        yield _line("account", {**user._asdict(), "actor": actor})
+
+        sections = (
+            ("post", select(Post.id, Post.content, Post.created_at).where(
+                Post.user_id == user_id, Post.is_remote == False
+            ).order_by(Post.created_at, Post.id)),
+            ("connection", select(
+                Connection.id, Connection.requester_id, Connection.requester_actor,
+                Connection.target_actor, Connection.status, Connection.created_at
+            ).where(
+                or_(Connection.requester_id == user_id, Connection.target_actor == actor)
+            ).order_by(Connection.created_at, Connection.id)),
+            ("activity", select(
+                Activity.id, Activity.type, Activity.actor, Activity.object, Activity.created_at
+            ).where(
+                Activity.actor == actor, Activity.is_local == True
+            ).order_by(Activity.created_at, Activity.id)),
+        )
+        for kind, stmt in sections:
+            for row in db.execute(stmt.execution_options(yield_per=EXPORT_BATCH)):
+                yield _line(kind, row._asdict())
+    finally:
+        db.close()
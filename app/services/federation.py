@@ -1,5 +1,14 @@
+import asyncio
+import importlib.util
+import time
+from urllib.parse import urlsplit
 import httpx
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
 from app.config import settings
+from app.models import Connection, RemoteActor
+from app.stats import register as register_stats
 
 def build_create_activity(post, base_url):
     actor_url = f"{base_url}/users/{post.author}"
@@ -32,26 +41,208 @@ def build_follow_activity(actor_url: str, target_actor: str):
         "object": target_actor
     }
 
-def deliver_activity(activity):
-    if not settings.DELIVERY_ENABLED:
-        return
-    
-    payload = {
+def build_accept_activity(actor_url: str, follow: dict):
+    return {
+        "type": "Accept",
+        "actor": actor_url,
+        "object": follow
+    }
+
+def activity_payload(activity):
+    """Wire format of a stored Activity row"""
+    return {
+        "id": f"{settings.BASE_URL}/activities/{activity.id}",
         "type": activity.type,
         "actor": activity.actor,
         "object": activity.object
     }
-    try:
-        resp = httpx.post(settings.REMOTE_INBOX_URL, json=payload, timeout=5)
-        if resp.status_code in (200, 202):
-            activity.is_delivered = True
-    except Exception:
-        pass
-
-def deliver_raw_activity(activity_json: dict):
-    if not settings.SEND_TO_OTHER_INSTANCE:
+
+
+# ---------------------------------------------------------------------------
+# Recipient resolution
+# ---------------------------------------------------------------------------
+
+def is_local_actor(actor_url: str) -> bool:
+    return actor_url.startswith(f"{settings.BASE_URL}/users/")
+
+
+def shared_inbox(actor_url: str) -> str:
+    """
+    Shared inbox of the instance hosting `actor_url`.
+    Every instance of this backend serves one /inbox for all its actors.
+    """
+    return actor_url.split("/users/")[0] + "/inbox"
+
+
+def actor_username(actor_url: str) -> str:
+    return actor_url.rstrip("/").split("/")[-1]
+
+
+def object_id(obj) -> str | None:
+    """Id of an activity object, which may be inlined or just its URI"""
+    if isinstance(obj, dict):
+        return obj.get("id")
+    return obj
+
+
+def remember_actor(db: Session, actor_url: str):
+    """Record a remote actor for search; a no-op if it is already known"""
+    if not actor_url or is_local_actor(actor_url):
         return
-    try:
-        httpx.post(settings.REMOTE_INBOX_URL, json=activity_json, timeout=5)
-    except Exception:
-        pass
\ No newline at end of file
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    db.execute(
+        dialect_insert(RemoteActor)
+        .values(
+            actor_url=actor_url,
+            username=actor_username(actor_url),
+            instance=urlsplit(actor_url).netloc
+        )
+        .on_conflict_do_nothing(index_elements=["actor_url"])
+    )
+
+
+def remote_followers(db: Session, actor_url: str) -> list[str]:
+    """
+    Remote actors following a local actor: accepted connections to it.
+    Remote users the local actor follows are not recipients unless they
+    follow back.
+    """
+    return db.execute(
+        select(Connection.requester_actor).where(
+            Connection.target_actor == actor_url,
+            Connection.requester_actor.isnot(None),
+            Connection.status == "accepted"
+        ).distinct()
+    ).scalars().all()
+
+
+def resolve_inboxes(db: Session, activity) -> list[str]:
+    """
+    Shared inboxes an outgoing activity must reach, one per remote instance
+    however many recipients live there.
+    """
+    if activity.type in ("Create", "Delete", "Update"):
+        recipients = remote_followers(db, activity.actor)
+    elif activity.type == "Follow":
+        recipients = [activity.object]
+    elif activity.type == "Accept":
+        recipients = [activity.object.get("actor")]
+    else:
+        recipients = []
+
+    inboxes = {
+        shared_inbox(actor) for actor in recipients
+        if actor and not is_local_actor(actor)
+    }
+    # Legacy single-peer setups keep receiving everything
+    if settings.REMOTE_INBOX_URL:
+        inboxes.add(settings.REMOTE_INBOX_URL)
+    return sorted(inboxes)
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client for outgoing federation traffic
+# ---------------------------------------------------------------------------
+
+class HostStats:
+    """Counters for one remote host"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "total_seconds": round(self.total_seconds, 4),
+            "avg_seconds": round(self.total_seconds / self.requests, 4) if self.requests else 0.0,
+            "max_seconds": round(self.max_seconds, 4)
+        }
+
+
+class FederationClient:
+    """
+    One keep-alive httpx.AsyncClient for all federation requests.
+    httpx only limits the pool as a whole, so each remote host also gets a
+    semaphore capping how many requests we run against it at once.
+    """
+
+    def __init__(self):
+        self._client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=settings.FEDERATION_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.FEDERATION_MAX_KEEPALIVE,
+                keepalive_expiry=settings.FEDERATION_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                settings.FEDERATION_TIMEOUT,
+                connect=settings.FEDERATION_CONNECT_TIMEOUT
+            )
+        )
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self.stats: dict[str, HostStats] = {}
+
+    async def post(self, url: str, payload: dict) -> httpx.Response:
+        host = urlsplit(url).netloc
+        slots = self._host_slots.setdefault(
+            host, asyncio.Semaphore(settings.FEDERATION_MAX_CONNECTIONS_PER_HOST)
+        )
+        stats = self.stats.setdefault(host, HostStats())
+
+        async with slots:
+            stats.in_flight += 1
+            started = time.perf_counter()
+            try:
+                resp = await self._client.post(url, json=payload)
+                if resp.status_code >= 400:
+                    stats.errors += 1
+                return resp
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.in_flight -= 1
+                stats.requests += 1
+                stats.total_seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_client: FederationClient | None = None
+
+
+def get_client() -> FederationClient:
+    if _client is None:
+        raise RuntimeError("Federation client not started")
+    return _client
+
+
+async def start_client():
+    global _client
+    if _client is None:
+        _client = FederationClient()
+
+
+async def stop_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def host_stats() -> dict:
+    if _client is None:
+        return {}
+    return {host: stats.as_dict() for host, stats in _client.stats.items()}
+
+
+register_stats("federation_hosts", host_stats)
@@ -0,0 +1,101 @@
+"""
+Read-through cache of rendered feed responses.
+
+Entries hold the JSON body and the conditional GET validators of one page
+of /timeline, a user's home timeline or a profile, so a hit needs no
+database query at all and can still be answered with 304.
+
+Invalidation is by scope: every scope ("timeline", "home:<user id>",
+"profile:<username>") has a generation token that is part of its entry
+keys, and replacing the token orphans all the scope's pages at once.
+Writers name the scopes they touch with invalidate(db, ...); tokens are
+replaced only after that session commits, so a reader can never cache
+pre-commit data under the new generation.
+"""
+import uuid
+from functools import lru_cache
+from typing import Awaitable, Callable
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.conditional import FeedState, validators, is_fresh
+from app.database import SessionLocal
+from app.services.cache import make_cache, MISSING
+from app import stats
+
+pages = make_cache("feeds", settings.FEED_CACHE_SIZE, settings.FEED_CACHE_TTL)
+generations = make_cache("feed_generations", settings.FEED_CACHE_SIZE, settings.FEED_CACHE_TTL)
+stats.register("feed_cache", pages.stats)
+
+TIMELINE = "timeline"
+
+
+def home(user_id: str) -> str:
+    return f"home:{user_id}"
+
+
+def profile(username: str) -> str:
+    return f"profile:{username}"
+
+
+def _generation(scope: str) -> str:
+    token = generations.get(scope)
+    if token is MISSING:
+        # An evicted or expired token just starts a new, empty generation
+        token = uuid.uuid4().hex
+        generations.set(scope, token)
+    return token
+
+
+def invalidate_now(*scopes: str):
+    for scope in scopes:
+        generations.set(scope, uuid.uuid4().hex)
+
+
+def invalidate(db: Session, *scopes: str):
+    """Invalidate `scopes` once the current transaction of `db` commits"""
+    db.info.setdefault("feed_cache_scopes", set()).update(scopes)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_committed(session: Session):
+    scopes = session.info.pop("feed_cache_scopes", None)
+    if scopes:
+        invalidate_now(*scopes)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+async def serve(
+    request: Request,
+    scope: str,
+    key: tuple,
+    model,
+    validate: Callable[[], Awaitable[FeedState]],
+    render: Callable[[], Awaitable[object]],
+    private: bool = False
+) -> Response:
+    """
+    Cached response for page `key` of `scope`. On a miss `validate()` reads
+    the feed state for the validators and, unless the client's copy is
+    current, `render()` loads the payload, which is dumped through `model`.
+    """
+    cache_key = f"{scope}:{_generation(scope)}:{key!r}"
+    entry = pages.get(cache_key)
+    if entry is MISSING:
+        headers = validators(await validate(), (scope, key), private)
+        if is_fresh(request, headers):
+            return Response(status_code=304, headers=headers)
+        adapter = _adapter(model)
+        body = adapter.dump_json(adapter.validate_python(await render())).decode()
+        entry = {"headers": headers, "body": body}
+        pages.set(cache_key, entry)
+
+    if is_fresh(request, entry["headers"]):
+        return Response(status_code=304, headers=entry["headers"])
+    return Response(content=entry["body"], media_type="application/json", headers=entry["headers"])
@@ -0,0 +1,319 @@
+"""
+Incoming activities.
+
+/inbox only validates an activity and appends it to the inbox_queue table;
+a pool of inbox workers drains the queue in batches, one transaction per
+batch, so bursts from busy instances do not hold request workers and
+database connections for the whole processing cycle.
+
+Remote servers retry deliveries freely, so every activity id we have
+accepted is remembered twice: in a front cache that answers most replays
+without touching the database, and in the unique activities.ap_id index
+that catches the rest.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Activity, Connection, InboxItem, Post, User
+from app.services import timeline as home_timeline
+from app.services import counters
+from app.services.cache import make_cache, MISSING
+from app.services.federation import actor_username, is_local_actor, object_id, remember_actor
+from app import stats
+
+logger = logging.getLogger(__name__)
+
+seen_ids = make_cache("inbox_seen", settings.INBOX_SEEN_CACHE_SIZE, settings.INBOX_SEEN_CACHE_TTL)
+
+
+class InboxStats:
+    def __init__(self):
+        self.queued = 0
+        self.accepted = 0
+        self.failed = 0
+        self.duplicates_cache = 0
+        self.duplicates_db = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def processed(self, received_at: datetime):
+        lag = (datetime.utcnow() - received_at).total_seconds()
+        self.accepted += 1
+        self.last_lag_seconds = lag
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+
+    def as_dict(self) -> dict:
+        return {
+            "workers": settings.INBOX_WORKERS,
+            **queue_depth(),
+            "queued": self.queued,
+            "accepted": self.accepted,
+            "failed": self.failed,
+            "duplicates_cache": self.duplicates_cache,
+            "duplicates_db": self.duplicates_db,
+            "last_lag_seconds": round(self.last_lag_seconds, 3),
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+            "seen_cache": seen_ids.stats()
+        }
+
+
+def queue_depth() -> dict:
+    """Items waiting, items given up on, and the age of the oldest waiting item"""
+    if settings.INBOX_WORKERS <= 0:
+        return {}
+    db = SessionLocal()
+    try:
+        waiting, oldest = db.query(func.count(InboxItem.id), func.min(InboxItem.received_at)).filter(
+            InboxItem.attempts < settings.INBOX_MAX_ATTEMPTS
+        ).one()
+        dead = db.query(func.count(InboxItem.id)).filter(
+            InboxItem.attempts >= settings.INBOX_MAX_ATTEMPTS
+        ).scalar()
+    finally:
+        db.close()
+    return {
+        "depth": waiting,
+        "dead": dead,
+        "oldest_seconds": round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0
+    }
+
+
+inbox_stats = InboxStats()
+stats.register("inbox", inbox_stats.as_dict)
+
+
+def seen_recently(activity_id: str | None) -> bool:
+    """True when the front cache already holds this activity id"""
+    if activity_id and seen_ids.get(activity_id) is not MISSING:
+        inbox_stats.duplicates_cache += 1
+        return True
+    return False
+
+
+def mark_seen(activity_id: str | None):
+    if activity_id:
+        seen_ids.set(activity_id, True)
+
+
+def forget_seen(activity_id: str | None):
+    if activity_id:
+        seen_ids.delete(activity_id)
+
+
+# ---------------------------------------------------------------------------
+# Enqueue
+# ---------------------------------------------------------------------------
+
+def enqueue(db: Session, activity: dict) -> bool:
+    """
+    Append an activity to the queue; False if its id was already processed
+    or is already waiting. Both checks are single unique-index probes. A
+    redelivery of an activity the workers gave up on replaces the dead row
+    and gets a fresh set of attempts.
+    """
+    ap_id = activity.get("id")
+    if ap_id and db.query(Activity.id).filter(Activity.ap_id == ap_id).first():
+        inbox_stats.duplicates_db += 1
+        return False
+
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(InboxItem).values(
+        id=str(uuid.uuid4()),
+        ap_id=ap_id,
+        payload=activity,
+        received_at=datetime.utcnow()
+    )
+    if ap_id:
+        statement = statement.on_conflict_do_nothing(index_elements=["ap_id"])
+    if db.execute(statement).rowcount == 0:
+        dead = db.query(InboxItem).filter(
+            InboxItem.ap_id == ap_id,
+            InboxItem.attempts >= settings.INBOX_MAX_ATTEMPTS
+        ).delete(synchronize_session=False)
+        if not dead or db.execute(statement).rowcount == 0:
+            inbox_stats.duplicates_db += 1
+            return False
+    inbox_stats.queued += 1
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Processing
+# ---------------------------------------------------------------------------
+
+def process_activity(db: Session, activity: dict) -> str:
+    """
+    Apply one remote activity in the caller's transaction.
+    Returns "accepted", or "duplicate" if its id was processed before.
+    """
+    activity_type = activity.get("type")
+    actor = activity.get("actor")
+    obj = activity.get("object")
+
+    # The unique ap_id index rejects replays the front cache did not know
+    # about before anything else is written
+    try:
+        with db.begin_nested():
+            db.add(Activity(
+                ap_id=activity.get("id"),
+                type=activity_type,
+                actor=actor,
+                object=obj,
+                is_local=False,
+                is_delivered=True
+            ))
+    except IntegrityError:
+        inbox_stats.duplicates_db += 1
+        return "duplicate"
+    remember_actor(db, actor)
+
+    # Remote posts are resolved by their object URI through ux_posts_remote_uri
+    if activity_type == "Create" and isinstance(obj, dict) and obj.get("type") == "Note":
+        post_id = obj.get("id")
+        content = obj.get("content")
+
+        # prevent duplicates
+        existing = db.query(Post.id).filter(Post.remote_uri == post_id).first()
+        if not existing:
+            post = Post(
+                id=post_id,
+                remote_uri=post_id,
+                content=content,
+                user_id=None,
+                author=actor,
+                origin_instance=actor.split("/users/")[0],
+                is_remote=True
+            )
+            db.add(post)
+            db.flush()
+            home_timeline.fan_out_post(db, post.id, actor)
+
+    if activity_type == "Update" and isinstance(obj, dict) and obj.get("type") == "Note":
+        post = db.query(Post).filter(Post.remote_uri == obj.get("id"), Post.author == actor).first()
+        if post and obj.get("content") is not None:
+            post.content = obj["content"]
+            home_timeline.post_changed(db, post.id)
+
+    # Only the author's instance may delete a post
+    if activity_type == "Delete":
+        post = db.query(Post).filter(Post.remote_uri == object_id(obj), Post.author == actor).first()
+        if post:
+            home_timeline.remove_post(db, post.id)
+            db.delete(post)
+
+    if activity_type == "Follow":
+        existing = db.query(Connection.id).filter(
+            Connection.requester_actor == actor,
+            Connection.target_actor == obj
+        ).first()
+        if not existing:
+            connection = Connection(
+                requester_id=None,
+                requester_actor=actor,
+                target_actor=obj,
+                status="pending"
+            )
+            db.add(connection)
+            counters.edge_added(db, connection)
+
+    if activity_type == "Accept":
+        if not isinstance(obj, dict):
+            raise ValueError("Accept object must be the embedded Follow")
+        follower = obj.get("actor")
+        target = obj.get("object")
+
+        # The Follow we sent: our local user -> the accepting actor. Only the
+        # followed actor may accept it, and only a local follower has a
+        # requester row; a remote URL with the same last path segment must
+        # not match it
+        conn = None
+        if actor == target and isinstance(follower, str) and is_local_actor(follower):
+            conn = (
+                db.query(Connection)
+                .join(User, User.id == Connection.requester_id)
+                .filter(
+                    User.username == actor_username(follower),
+                    Connection.target_actor == target
+                )
+                .first()
+            )
+
+        if conn and conn.status != "accepted":
+            counters.edge_accepted(db, conn)
+            conn.status = "accepted"
+            home_timeline.follow_backfill(db, conn.requester_id, conn.target_actor)
+
+    db.flush()
+    return "accepted"
+
+
+def process_batch(limit: int | None = None) -> int:
+    """
+    Process up to `limit` queued activities in one transaction; returns the
+    number of items claimed. Items are locked with SKIP LOCKED so workers
+    never share one, and each activity runs in a savepoint so a bad one is
+    recorded as failed without rolling back the rest of the batch. A failed
+    item is retried by later batches until it reaches INBOX_MAX_ATTEMPTS;
+    then its id is dropped from the front cache so the sender can redeliver.
+    """
+    db = SessionLocal()
+    try:
+        items = (
+            db.query(InboxItem)
+            .filter(InboxItem.attempts < settings.INBOX_MAX_ATTEMPTS)
+            .order_by(InboxItem.received_at, InboxItem.id)
+            .limit(limit or settings.INBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        done = []
+        given_up = []
+        for item in items:
+            try:
+                with db.begin_nested():
+                    status = process_activity(db, item.payload)
+            except Exception as e:
+                logger.exception("Inbox item %s failed", item.id)
+                item.attempts += 1
+                item.last_error = (str(e) or e.__class__.__name__)[:500]
+                inbox_stats.failed += 1
+                if item.attempts >= settings.INBOX_MAX_ATTEMPTS:
+                    given_up.append(item.ap_id)
+                continue
+            if status == "accepted":
+                done.append(item.received_at)
+            db.delete(item)
+        db.commit()
+    finally:
+        db.close()
+
+    for received_at in done:
+        inbox_stats.processed(received_at)
+    for ap_id in given_up:
+        forget_seen(ap_id)
+    return len(items)
+
+
+async def run_worker(stop: asyncio.Event):
+    """Drain the inbox queue until `stop` is set, sleeping while it is empty"""
+    logger.info("Inbox worker started")
+    while not stop.is_set():
+        try:
+            handled = await asyncio.to_thread(process_batch)
+        except Exception:
+            logger.exception("Inbox batch crashed")
+            handled = 0
+
+        if handled < settings.INBOX_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.INBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    logger.info("Inbox worker stopped")
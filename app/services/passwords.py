@@ -0,0 +1,139 @@
+"""
+Argon2 hashing in a bounded process pool.
+
+Hashing is deliberately slow; running it in worker processes keeps it off
+the event loop and the request threadpool, and the pool size caps how many
+hashes run at once. This module must stay importable without the database
+since pool workers import it.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.config import settings
+from app import stats
+
+_context: CryptContext | None = None
+
+
+def _argon2_params() -> dict:
+    params = {
+        "argon2__time_cost": settings.ARGON2_TIME_COST,
+        "argon2__memory_cost": settings.ARGON2_MEMORY_COST,
+        "argon2__parallelism": settings.ARGON2_PARALLELISM,
+    }
+    return {name: value for name, value in params.items() if value is not None}
+
+
+def _init_context(params: dict):
+    global _context
+    _context = CryptContext(schemes=["argon2"], deprecated="auto", **params)
+
+
+def _hash(password: str) -> str:
+    return _context.hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """(valid, new_hash); new_hash is set when the stored hash uses old parameters"""
+    return _context.verify_and_update(password, password_hash)
+
+
+class HashPool:
+    """Process pool plus queue-depth and latency counters"""
+
+    def __init__(self):
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_context,
+                    initargs=(_argon2_params(),)
+                )
+            return self._executor
+
+    def _finished(self, started: float):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= settings.PASSWORD_HASH_MAX_QUEUE:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Server busy, please retry")
+            self.pending += 1
+        started = time.perf_counter()
+
+        if settings.PASSWORD_HASH_WORKERS <= 0:
+            # Inline mode (tests, single-process tools)
+            future = Future()
+            try:
+                if _context is None:
+                    _init_context(_argon2_params())
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            self._finished(started)
+            return future
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(lambda _: self._finished(started))
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "queue_depth": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.total_seconds / self.completed, 4) if self.completed else 0.0,
+            "max_seconds": round(self.max_seconds, 4)
+        }
+
+
+pool = HashPool()
+stats.register("password_hashing", pool.stats)
+
+
+def hash_password(password: str) -> str:
+    return pool.submit(_hash, password).result()
+
+
+def verify_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    return pool.submit(_verify_and_update, password, password_hash).result()
+
+
+async def ahash_password(password: str) -> str:
+    return await asyncio.wrap_future(pool.submit(_hash, password))
+
+
+async def averify_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    return await asyncio.wrap_future(pool.submit(_verify_and_update, password, password_hash))
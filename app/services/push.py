@@ -0,0 +1,260 @@
+"""
+Server push of feed changes.
+
+Writers publish events ("post", "update", "delete") on feed channels:
+TIMELINE for the public timeline and home(user id) for each home timeline
+the change lands in. Like feed cache invalidation, publishing is tied to
+the writing transaction: events are sent after it commits, and events
+written inside a savepoint that rolls back are dropped.
+
+The broker fans events out to subscribers (GET /stream/...) in this
+process. Between processes it relies on a backend:
+
+- "local": events only reach subscribers of the publishing process;
+  enough for a single worker.
+- "postgres": events go through NOTIFY on PUSH_CHANNEL and every worker
+  LISTENs on a dedicated connection, so a post written by any worker
+  reaches subscribers on all of them.
+
+Each subscriber has a queue of PUSH_QUEUE_SIZE events. A consumer that
+falls that far behind loses its queued events and gets a single "resync"
+event instead, telling it to refetch the feed; one slow client never
+holds memory or delays everyone else.
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, SessionTransaction
+from app.config import settings
+from app.database import SessionLocal, async_engine, engine
+from app import stats
+
+logger = logging.getLogger(__name__)
+
+TIMELINE = "timeline"
+RESYNC = {"type": "resync"}
+# NOTIFY payloads must stay under 8000 bytes
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+def home(user_id: str) -> str:
+    return f"home:{user_id}"
+
+
+class Subscription:
+    def __init__(self, channels: tuple[str, ...], size: int):
+        self.channels = channels
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.resyncs = 0
+
+    def offer(self, event: dict):
+        """Queue an event; on overflow replace the backlog with a resync"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.resyncs += 1
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next event, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Routes events to this process's subscribers; thread-safe to publish"""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.backend = None
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def publish(self, events: list[tuple[tuple[str, ...], dict]]):
+        """Send (channels, event) pairs to every process through the backend"""
+        if events:
+            self.published += len(events)
+            self.backend.publish(events)
+
+    def deliver(self, events: list[tuple[tuple[str, ...], dict]]):
+        """Hand events to local subscribers; callable from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return  # nobody has subscribed in this process yet
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(events)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, events)
+
+    def _fan_out(self, events):
+        for channels, event in events:
+            for channel in channels:
+                for subscription in self._subscribers.get(channel, ()):
+                    subscription.offer(event)
+                    self.delivered += 1
+
+    def resync_all(self):
+        """Tell every subscriber to refetch, e.g. after missing notifications"""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.offer(RESYNC)
+
+    @asynccontextmanager
+    async def subscribe(self, *channels: str):
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(channels, settings.PUSH_QUEUE_SIZE)
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+            self.resyncs += subscription.resyncs
+
+    def stats(self) -> dict:
+        subscriptions = {s for subscribers in self._subscribers.values() for s in subscribers}
+        return {
+            "backend": settings.PUSH_BACKEND,
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs + sum(s.resyncs for s in subscriptions)
+        }
+
+
+class LocalBackend:
+    def __init__(self, broker: Broker):
+        self.broker = broker
+
+    def publish(self, events):
+        self.broker.deliver(events)
+
+    async def run(self, stop: asyncio.Event):
+        await stop.wait()
+
+
+class PostgresBackend:
+    """Cross-worker fan-out through PostgreSQL LISTEN/NOTIFY"""
+
+    def __init__(self, broker: Broker):
+        self.broker = broker
+
+    def publish(self, events):
+        with engine.connect() as connection:
+            for payload in self._payloads(events):
+                connection.execute(select(func.pg_notify(settings.PUSH_CHANNEL, payload)))
+            connection.commit()
+
+    @staticmethod
+    def _payloads(events):
+        """One NOTIFY payload per event and group of channels that fits"""
+        for channels, event in events:
+            body = json.dumps(event)
+            if len(body) > MAX_NOTIFY_PAYLOAD - 512:
+                # Too big to ship: subscribers refetch instead
+                body = json.dumps(RESYNC)
+            budget = MAX_NOTIFY_PAYLOAD - len(body) - 32
+            chunk, size = [], 0
+            for channel in channels:
+                if chunk and size + len(channel) + 4 > budget:
+                    yield f'{{"channels": {json.dumps(chunk)}, "event": {body}}}'
+                    chunk, size = [], 0
+                chunk.append(channel)
+                size += len(channel) + 4
+            if chunk:
+                yield f'{{"channels": {json.dumps(chunk)}, "event": {body}}}'
+
+    def _notified(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        self.broker.deliver([(tuple(message["channels"]), message["event"])])
+
+    async def run(self, stop: asyncio.Event):
+        """LISTEN until `stop` is set, reconnecting after failures"""
+        while not stop.is_set():
+            try:
+                async with async_engine.connect() as connection:
+                    raw = (await connection.get_raw_connection()).driver_connection
+                    lost = asyncio.Event()
+                    raw.add_termination_listener(lambda _: lost.set())
+                    await raw.add_listener(settings.PUSH_CHANNEL, self._notified)
+                    logger.info("Listening for push events on %s", settings.PUSH_CHANNEL)
+                    waiters = [asyncio.create_task(stop.wait()), asyncio.create_task(lost.wait())]
+                    try:
+                        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        for waiter in waiters:
+                            waiter.cancel()
+                    if lost.is_set():
+                        raise ConnectionError("push listener connection closed")
+                    await raw.remove_listener(settings.PUSH_CHANNEL, self._notified)
+            except Exception:
+                logger.exception("Push listener failed; reconnecting")
+                # Notifications sent while we were away are lost
+                self.broker.resync_all()
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+
+
+broker = Broker()
+broker.backend = PostgresBackend(broker) if settings.PUSH_BACKEND == "postgres" else LocalBackend(broker)
+stats.register("push", broker.stats)
+
+
+# ---------------------------------------------------------------------------
+# Transactional publishing
+# ---------------------------------------------------------------------------
+
+def publish(db: Session, channels, event: dict):
+    """Publish `event` on `channels` once the current transaction of `db` commits"""
+    transaction = db.get_nested_transaction() or db.get_transaction()
+    db.info.setdefault("push_events", []).append((transaction, tuple(channels), event))
+
+
+def _within(transaction: SessionTransaction | None, ancestor: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction: SessionTransaction):
+    pending = session.info.get("push_events")
+    if pending:
+        session.info["push_events"] = [
+            entry for entry in pending if not _within(entry[0], previous_transaction)
+        ]
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_committed(session: Session):
+    pending = session.info.pop("push_events", None)
+    if pending:
+        try:
+            broker.publish([(channels, event) for _, channels, event in pending])
+        except Exception:
+            # The write is committed; a lost push only delays clients to their next fetch
+            logger.exception("Publishing %d push events failed", len(pending))
@@ -0,0 +1,194 @@
+"""
+Per-request SQL inspection for development and CI (QUERY_INSPECTOR=true).
+
+Every statement a request executes is recorded with its duration. When the
+request ends, statements sharing a shape (the SQL with literals and IN
+lists collapsed) QUERY_REPEAT_THRESHOLD times or more are reported as a
+likely N+1, and statements slower than QUERY_SLOW_MS as slow, on the
+"app.queries" logger.
+
+Tests declare a route's budget with query_budget():
+
+    with query_budget(statements=4):
+        client.get("/list_connections")
+
+which fails with the offending statements when any request inside the
+block goes over it or repeats a statement shape. Off by default: the
+listeners cost a little on every statement.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from app.config import settings
+
+logger = logging.getLogger("app.queries")
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))+\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def shape(statement: str) -> str:
+    """`statement` with literals and expanded IN lists collapsed"""
+    statement = _IN_LIST.sub("(...)", statement)
+    statement = _LITERAL.sub("?", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+@dataclass
+class Statement:
+    sql: str
+    seconds: float
+
+
+@dataclass
+class QueryLog:
+    """Statements executed on behalf of one request (or `record` block)"""
+    label: str
+    statements: list[Statement] = field(default_factory=list)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        counts = Counter(shape(statement.sql) for statement in self.statements)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+    def slow(self, seconds: float) -> list[Statement]:
+        return [statement for statement in self.statements if statement.seconds >= seconds]
+
+    def problems(self, max_statements: int | None = None, repeat_threshold: int | None = None,
+                 slow_seconds: float | None = None) -> list[str]:
+        found = []
+        if max_statements is not None and len(self.statements) > max_statements:
+            found.append(f"{len(self.statements)} statements, budget {max_statements}")
+        if repeat_threshold:
+            found.extend(
+                f"{count}x (N+1?): {sql}" for sql, count in self.repeated(repeat_threshold)
+            )
+        if slow_seconds is not None:
+            found.extend(
+                f"{statement.seconds * 1000:.1f} ms (slow): {shape(statement.sql)}"
+                for statement in self.slow(slow_seconds)
+            )
+        return found
+
+    def report(self, problems: list[str]) -> str:
+        lines = [f"{self.label}:", *(f"  {problem}" for problem in problems), "  statements:"]
+        lines.extend(f"    {statement.seconds * 1000:7.2f} ms  {shape(statement.sql)}" for statement in self.statements)
+        return "\n".join(lines)
+
+
+_current: ContextVar[QueryLog | None] = ContextVar("query_inspector_log", default=None)
+
+# Open capture() blocks; finished request logs are appended to each of them.
+# Module level rather than a context variable so a test sees the requests
+# its client ran in another thread (TestClient) or task
+_captures: list[list[QueryLog]] = []
+_captures_lock = threading.Lock()
+
+
+def _started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_inspector_started", []).append(time.perf_counter())
+
+
+def _finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_inspector_started"].pop()
+    log = _current.get()
+    if log is not None:
+        log.statements.append(Statement(statement, time.perf_counter() - started))
+
+
+def _failed(context):
+    started = context.connection.info.get("query_inspector_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+def install(*engines):
+    """Record the statements of `engines` (sync Engine objects)"""
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _started):
+            event.listen(engine, "before_cursor_execute", _started)
+            event.listen(engine, "after_cursor_execute", _finished)
+            event.listen(engine, "handle_error", _failed)
+
+
+@contextmanager
+def record(label: str = ""):
+    """Record the statements executed in this context into a new QueryLog"""
+    log = QueryLog(label)
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def capture():
+    """Collect the QueryLog of every request that finishes inside the block"""
+    logs: list[QueryLog] = []
+    with _captures_lock:
+        _captures.append(logs)
+    try:
+        yield logs
+    finally:
+        with _captures_lock:
+            _captures.remove(logs)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(statements: int | None = None, repeats: int | None = None, slow_ms: float | None = None):
+    """
+    Fail if a request inside the block runs more than `statements`
+    statements, repeats a statement shape `repeats` times (default
+    QUERY_REPEAT_THRESHOLD) or runs a statement slower than `slow_ms`.
+    """
+    repeats = settings.QUERY_REPEAT_THRESHOLD if repeats is None else repeats
+    with capture() as logs:
+        yield logs
+    if not logs:
+        raise QueryBudgetExceeded("No request was recorded; is QUERY_INSPECTOR enabled?")
+    reports = []
+    for log in logs:
+        problems = log.problems(statements, repeats, slow_ms / 1000 if slow_ms is not None else None)
+        if problems:
+            reports.append(log.report(problems))
+    if reports:
+        raise QueryBudgetExceeded("\n".join(reports))
+
+
+class QueryInspectorMiddleware:
+    """Records each HTTP request's statements and logs N+1 and slow ones"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with record(f"{scope['method']} {scope['path']}") as log:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    log.label = f"{scope['method']} {route}"
+                problems = log.problems(
+                    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+                    slow_seconds=settings.QUERY_SLOW_MS / 1000
+                )
+                if problems:
+                    logger.warning("%s", log.report(problems))
+                with _captures_lock:
+                    for logs in _captures:
+                        logs.append(log)
@@ -0,0 +1,107 @@
+"""
+EXPLAIN-based check that the hot queries are served by their indexes.
+
+Sequential scans are disabled for the check on PostgreSQL, so the result
+does not depend on table sizes: a query fails only if no index can serve it.
+"""
+from datetime import datetime
+from sqlalchemy import select, func
+from app.models import Post, Connection, Activity, InboxItem, PasswordReset, User, HomeTimelineEntry, RemoteActor
+from app.services import delivery
+
+PAGE = 21
+
+# SQLite only uses an index for LIKE under case_sensitive_like, so these
+# plans are checked on PostgreSQL only
+POSTGRESQL_ONLY = {"ix_users_username_lower", "ix_remote_actors_username_lower"}
+
+
+def hot_queries():
+    """(description, statement, index expected in the plan)"""
+    return [
+        ("timeline page",
+         select(Post).order_by(Post.created_at.desc(), Post.id.desc()).limit(PAGE),
+         "ix_posts_created_id"),
+        ("profile posts",
+         select(Post).where(Post.user_id == "u", Post.is_remote == False)
+         .order_by(Post.created_at.desc(), Post.id.desc()).limit(PAGE),
+         "ix_posts_user_created"),
+        ("posts by actor",
+         select(Post.id).where(Post.author == "alice", Post.is_remote == False),
+         "ix_posts_author_created"),
+        ("home timeline page",
+         select(HomeTimelineEntry).where(HomeTimelineEntry.owner_id == "u")
+         .order_by(HomeTimelineEntry.created_at.desc(), HomeTimelineEntry.post_id.desc()).limit(PAGE),
+         "ix_home_timeline_owner_created"),
+        ("outgoing connections page",
+         select(Connection).where(Connection.requester_id == "u", Connection.status == "accepted")
+         .order_by(Connection.created_at.desc(), Connection.id.desc()).limit(PAGE),
+         "ix_connections_requester_status_created"),
+        ("incoming connections page",
+         select(Connection).where(Connection.target_actor == "a", Connection.status == "pending")
+         .order_by(Connection.created_at.desc(), Connection.id.desc()).limit(PAGE),
+         "ix_connections_target_status_created"),
+        ("outbox claim",
+         delivery.due_activities(datetime.utcnow(), 50),
+         "ix_activities_undelivered"),
+        ("inbox queue claim",
+         select(InboxItem).where(InboxItem.attempts < 5)
+         .order_by(InboxItem.received_at, InboxItem.id).limit(100),
+         "ix_inbox_queue_received"),
+        ("otp lookup",
+         select(PasswordReset).where(PasswordReset.user_id == "u", PasswordReset.otp == "123456"),
+         "ix_password_resets_user_otp"),
+        # Same statements as /search_users (routers/users.py), ESCAPE included
+        ("user search",
+         select(User.id, User.username, User.email)
+         .where(func.lower(User.username).like("ali\\_%", escape="\\")).limit(10),
+         "ix_users_username_lower"),
+        ("remote actor search",
+         select(RemoteActor.actor_url, RemoteActor.username, RemoteActor.instance)
+         .where(func.lower(RemoteActor.username).like("ali\\_%", escape="\\")).limit(10),
+         "ix_remote_actors_username_lower"),
+        ("random users seek",
+         select(User.id).where(User.random_key >= 0.5, User.id != "u")
+         .order_by(User.random_key).limit(20),
+         "ix_users_random_key"),
+        ("remote post by object uri",
+         select(Post).where(Post.remote_uri == "https://remote.example/posts/1"),
+         "ux_posts_remote_uri"),
+        ("remote activity by id",
+         select(Activity.id).where(Activity.ap_id == "https://remote.example/activities/1"),
+         "ux_activities_ap_id"),
+        ("outbox collection page",
+         select(Activity).where(Activity.actor == "a", Activity.is_local == True)
+         .order_by(Activity.created_at.desc(), Activity.id.desc()).limit(PAGE),
+         "ix_activities_local_actor_created"),
+        ("user by email",
+         select(User).where(User.email == "someone@example.com"),
+         "ix_users_email"),
+    ]
+
+
+def explain(connection, statement) -> str:
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    prefix = "EXPLAIN QUERY PLAN" if dialect.name == "sqlite" else "EXPLAIN"
+    rows = connection.exec_driver_sql(f"{prefix} {compiled}", params).fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def check_plans(engine) -> list[tuple[str, str, bool]]:
+    """Return (description, plan, uses_expected_index) for every hot query"""
+    results = []
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        for description, statement, index in hot_queries():
+            if index in POSTGRESQL_ONLY and connection.dialect.name != "postgresql":
+                continue
+            plan = explain(connection, statement)
+            results.append((description, plan, index in plan))
+        connection.rollback()
+    return results
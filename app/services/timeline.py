@@ -0,0 +1,142 @@
+from sqlalchemy import select, insert, update, delete, and_, exists, literal
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Post, Connection, HomeTimelineEntry, FeedWatermark
+from app.schemas import FeedPost
+from app.services import feed_cache, push
+
+
+def actor_posts_filter(actor: str):
+    """
+    Filter matching the posts written by `actor`.
+    Local posts store the bare username, remote posts the full actor URL.
+    """
+    local_prefix = f"{settings.BASE_URL}/users/"
+    if actor.startswith(local_prefix):
+        return and_(
+            Post.author == actor[len(local_prefix):],
+            Post.is_remote == False
+        )
+    return and_(Post.author == actor, Post.is_remote == True)
+
+
+def _not_in_timeline(owner_col, post_col):
+    return ~exists().where(
+        HomeTimelineEntry.owner_id == owner_col,
+        HomeTimelineEntry.post_id == post_col
+    )
+
+
+def fan_out_post(db: Session, post_id: str, actor: str):
+    """
+    Push a post into the home timeline of every local user with an
+    accepted connection to its author. The post must already be flushed.
+    Like every function here, it invalidates the cached feeds it changes;
+    the functions for new, edited and deleted posts also push the change
+    to stream subscribers (services/push.py).
+    """
+    followers = (
+        select(Connection.requester_id, Post.id, Post.created_at)
+        .select_from(Connection)
+        .join(Post, Post.id == post_id)
+        .where(
+            Connection.target_actor == actor,
+            Connection.status == "accepted",
+            Connection.requester_id.isnot(None),
+            _not_in_timeline(Connection.requester_id, Post.id)
+        )
+    )
+    owners = db.execute(
+        insert(HomeTimelineEntry).from_select(
+            ["owner_id", "post_id", "created_at"], followers
+        ).returning(HomeTimelineEntry.owner_id)
+    ).scalars().all()
+    # created_at is the transaction start, not commit order: a post can land
+    # below the newest row, so the newest row alone can't validate the timeline
+    bump_watermark(db, feed_cache.TIMELINE)
+    feed_cache.invalidate(db, feed_cache.TIMELINE, *map(feed_cache.home, owners))
+    push.publish(db, [push.TIMELINE, *map(push.home, owners)], {"type": "post", "post": _feed_post(db, post_id)})
+
+
+def _feed_post(db: Session, post_id: str) -> dict:
+    row = db.execute(
+        select(Post.id, Post.content, Post.author, Post.created_at).where(Post.id == post_id)
+    ).one()
+    return FeedPost.model_validate(row).model_dump(mode="json")
+
+
+def bump_watermark(db: Session, scope: str):
+    """Change the validator of a feed whose posts were added, deleted or edited"""
+    bumped = db.execute(
+        update(FeedWatermark).where(FeedWatermark.scope == scope)
+        .values(version=FeedWatermark.version + 1)
+    ).rowcount
+    if not bumped:
+        # Migration 0012 creates the timeline row; create_all() databases don't have it
+        db.add(FeedWatermark(scope=scope, version=1))
+        db.flush()
+
+
+def remove_post(db: Session, post_id: str):
+    """Drop a post from every home timeline; call before deleting the post"""
+    owners = db.execute(
+        delete(HomeTimelineEntry).where(HomeTimelineEntry.post_id == post_id)
+        .returning(HomeTimelineEntry.owner_id)
+    ).scalars().all()
+    bump_watermark(db, feed_cache.TIMELINE)
+    feed_cache.invalidate(db, feed_cache.TIMELINE, *map(feed_cache.home, owners))
+    push.publish(db, [push.TIMELINE, *map(push.home, owners)], {"type": "delete", "id": post_id})
+
+
+def post_changed(db: Session, post_id: str):
+    """Invalidate the feeds showing a post whose content was edited"""
+    owners = db.execute(
+        select(HomeTimelineEntry.owner_id).where(HomeTimelineEntry.post_id == post_id)
+    ).scalars().all()
+    bump_watermark(db, feed_cache.TIMELINE)
+    feed_cache.invalidate(db, feed_cache.TIMELINE, *map(feed_cache.home, owners))
+    push.publish(db, [push.TIMELINE, *map(push.home, owners)], {"type": "update", "post": _feed_post(db, post_id)})
+
+
+def follow_backfill(db: Session, owner_id: str, actor: str):
+    """Copy the existing posts of `actor` into the timeline of `owner_id`"""
+    posts = select(literal(owner_id), Post.id, Post.created_at).where(
+        actor_posts_filter(actor),
+        _not_in_timeline(owner_id, Post.id)
+    )
+    db.execute(
+        insert(HomeTimelineEntry).from_select(
+            ["owner_id", "post_id", "created_at"], posts
+        )
+    )
+    feed_cache.invalidate(db, feed_cache.home(owner_id))
+
+
+def unfollow_purge(db: Session, owner_id: str, actor: str):
+    """Remove the posts of `actor` from the timeline of `owner_id`"""
+    db.execute(
+        delete(HomeTimelineEntry).where(
+            HomeTimelineEntry.owner_id == owner_id,
+            HomeTimelineEntry.post_id.in_(select(Post.id).where(actor_posts_filter(actor)))
+        )
+    )
+    feed_cache.invalidate(db, feed_cache.home(owner_id))
+
+
+def backfill_user(db: Session, owner_id: str):
+    """Add any missing entries for every accepted connection of a user"""
+    actors = db.execute(
+        select(Connection.target_actor).where(
+            Connection.requester_id == owner_id,
+            Connection.status == "accepted"
+        )
+    ).scalars().all()
+    for actor in actors:
+        follow_backfill(db, owner_id, actor)
+
+
+def rebuild_user(db: Session, owner_id: str):
+    """Throw away a user's home timeline and recompute it from connections"""
+    db.execute(delete(HomeTimelineEntry).where(HomeTimelineEntry.owner_id == owner_id))
+    feed_cache.invalidate(db, feed_cache.home(owner_id))
+    backfill_user(db, owner_id)
@@ -0,0 +1,23 @@
+"""
+Registry of in-process runtime statistics.
+
+Subsystems register a callable returning a JSON-serializable snapshot of
+their counters; GET /stats returns all of them keyed by name.
+"""
+from typing import Callable
+
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]):
+    _sources[name] = source
+
+
+def snapshot() -> dict:
+    return {name: source() for name, source in _sources.items()}
+
+
+def source(name: str) -> dict:
+    """Snapshot of one subsystem, empty if it is not registered"""
+    source = _sources.get(name)
+    return source() if source else {}
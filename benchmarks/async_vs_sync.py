@@ -0,0 +1,108 @@
+"""
+Concurrency headroom of the async database path against the sync one.
+
+/get_posts (sync route, runs in the threadpool on the sync engine) and
+/timeline (async route on the async engine) run the same keyset page query,
+so the difference between them is the execution model. /timeline is
+normally answered from the feed cache; the cache is bypassed here so every
+request reaches the async engine (which adds the timeline's validator
+query to each async request). Requests go through the ASGI app in-process,
+against the database in DATABASE_URL.
+
+    python benchmarks/async_vs_sync.py --seed 1000
+    python benchmarks/async_vs_sync.py --concurrency 10 50 200 --threadpool 40
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from anyio import to_thread
+from app.main import app
+from app.database import SessionLocal
+from app.models import Post
+from app.services import feed_cache
+from app.services.cache import TTLCache
+
+ENDPOINTS = {"sync": "/get_posts?limit=20", "async": "/timeline?limit=20"}
+
+
+def seed(count: int):
+    db = SessionLocal()
+    try:
+        db.add_all(
+            Post(
+                id=str(uuid.uuid4()),
+                content=f"benchmark post {i}",
+                author="benchmark",
+                origin_instance="benchmark",
+                is_remote=False
+            )
+            for i in range(count)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(path: str, concurrency: int, requests: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client_loop(client):
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors
+    }
+
+
+async def main(args):
+    # A cache that keeps nothing: every /timeline request is a miss
+    feed_cache.pages = TTLCache(maxsize=0, ttl=1)
+    # Starlette runs sync routes on anyio's default limiter (40 threads)
+    to_thread.current_default_thread_limiter().total_tokens = args.threadpool
+
+    print(f"{'path':<6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for name, path in ENDPOINTS.items():
+            await run(path, min(concurrency, 10), 50)  # warm up pools
+            result = await run(path, concurrency, args.requests)
+            print(
+                f"{name:<6} {concurrency:>5} {result['rps']:>9.1f} "
+                f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per run")
+    parser.add_argument("--threadpool", type=int, default=40, help="Threadpool size for sync routes")
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many posts first")
+    args = parser.parse_args()
+    if args.seed:
+        seed(args.seed)
+    asyncio.run(main(args))
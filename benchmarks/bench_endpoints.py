@@ -0,0 +1,69 @@
+"""
+Micro-benchmarks of the hot endpoints.
+
+    pytest benchmarks/bench_endpoints.py
+    BENCHMARK_USERS=2000 pytest benchmarks/bench_endpoints.py --benchmark-autosave
+    pytest benchmarks/bench_endpoints.py --benchmark-compare   # against the last saved run
+
+Feeds are measured twice: "cached" serves the rendered page from the feed
+cache, "uncached" clears it before every round so the database path is
+timed. The statements each request executed are in the report's extra_info.
+"""
+import uuid
+import pytest
+from app.services import feed_cache
+from seed import PASSWORD
+
+
+def measure(benchmark, call, method, path, setup=None, rounds=100, **kwargs):
+    def target():
+        response, statements = call(method, path, **kwargs)
+        assert response.status_code < 400, response.text
+        benchmark.extra_info["queries"] = statements
+
+    benchmark.pedantic(target, setup=setup, rounds=rounds, warmup_rounds=1)
+
+
+@pytest.mark.parametrize("cached", [True, False], ids=["cached", "uncached"])
+def test_timeline(benchmark, call, cached):
+    measure(
+        benchmark, call, "GET", "/timeline", params={"limit": 20},
+        setup=None if cached else feed_cache.pages.clear
+    )
+
+
+@pytest.mark.parametrize("cached", [True, False], ids=["cached", "uncached"])
+def test_timeline_connected_users(benchmark, call, auth_headers, cached):
+    measure(
+        benchmark, call, "GET", "/timeline_connected_users", params={"limit": 20},
+        headers=auth_headers, setup=None if cached else feed_cache.pages.clear
+    )
+
+
+def test_search_users(benchmark, call, auth_headers):
+    measure(benchmark, call, "GET", "/search_users", params={"q": "bench1_00"}, headers=auth_headers)
+
+
+def test_inbox(benchmark, call, dataset):
+    actor = dataset.remote_actors[0]
+
+    def target():
+        note_id = f"{actor}/notes/{uuid.uuid4()}"
+        response, statements = call("POST", "/inbox", json={
+            "id": f"{note_id}/activity",
+            "type": "Create",
+            "actor": actor,
+            "object": {"type": "Note", "id": note_id, "content": "benchmark"}
+        })
+        assert response.status_code < 400, response.text
+        benchmark.extra_info["queries"] = statements
+
+    benchmark.pedantic(target, rounds=100, warmup_rounds=1)
+
+
+def test_login(benchmark, call, dataset):
+    # Argon2 dominates, so fewer rounds
+    measure(
+        benchmark, call, "POST", "/auth/login", rounds=20,
+        params={"username": dataset.usernames[0], "password": PASSWORD}
+    )
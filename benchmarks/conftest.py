@@ -0,0 +1,62 @@
+"""
+Fixtures for the endpoint micro-benchmarks in bench_endpoints.py.
+
+The data set is seeded once per session into the test database set up by
+the root conftest.py (SQLite, or TEST_DATABASE_URL). Requests go through
+the ASGI app in-process on one event loop, so the statement count of each
+request can be attached to its benchmark.
+"""
+import asyncio
+import os
+
+# Measure the app as deployed, without the query inspector's bookkeeping
+os.environ["QUERY_INSPECTOR"] = "false"
+
+import httpx
+import pytest
+from app.auth import create_access_token
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+import queries
+import seed as seed_data
+
+SCALE = int(os.environ.get("BENCHMARK_USERS", "200"))
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    data = seed_data.seed(users=SCALE, posts_per_user=20, follows_per_user=max(10, SCALE // 20))
+    db = SessionLocal()
+    try:
+        data.viewer = data.busiest_user(db)
+    finally:
+        db.close()
+    return data
+
+
+@pytest.fixture(scope="session")
+def auth_headers(dataset):
+    token = create_access_token({
+        "user_id": dataset.viewer.id,
+        "username": dataset.viewer.username,
+        "instance": settings.INSTANCE_NAME
+    })
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def call(dataset):
+    """call(method, path, **kwargs) -> (response, statements executed)"""
+    queries.install()
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+    async def request(method, path, **kwargs):
+        with queries.counting() as counter:
+            response = await client.request(method, path, **kwargs)
+        return response, counter.statements
+
+    yield lambda method, path, **kwargs: loop.run_until_complete(request(method, path, **kwargs))
+    loop.run_until_complete(client.aclose())
+    loop.close()
@@ -0,0 +1,164 @@
+"""
+Concurrent load scenario over the hot endpoints.
+
+Virtual users log in once, then loop over a weighted mix of requests
+(mostly feed reads, some search, profile views, inbox deliveries and new
+posts) with a short think time, for a fixed duration. The report gives
+p50/p99 latency per endpoint and, in-process, the SQL statements each
+request executed.
+
+In-process (default): seeds DATABASE_URL with seed.py and drives the ASGI
+app directly. Against a running server: seed it with the same --seed first
+and pass --base-url; statement counts are then not available.
+
+    python benchmarks/load.py --create-tables --users 50 --duration 30
+    python benchmarks/seed.py --seed 7 && python benchmarks/load.py --seed 7 --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import queries
+import seed as seed_data
+
+# name -> (weight, method, path, needs auth)
+SCENARIO = {
+    "timeline": (30, "GET", "/timeline", False),
+    "home": (30, "GET", "/timeline_connected_users", True),
+    "search": (15, "GET", "/search_users", True),
+    "profile": (10, "GET", "/get_user/{username}", True),
+    "inbox": (10, "POST", "/inbox", False),
+    "post": (5, "POST", "/posts", True),
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statements = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, seconds: float, ok: bool, statements: int | None):
+        self.latencies[name].append(seconds)
+        if statements is not None:
+            self.statements[name].append(statements)
+        self.errors[name] += not ok
+
+    def report(self, elapsed: float):
+        print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8}")
+        for name in sorted(self.latencies, key=lambda name: -len(self.latencies[name])):
+            latencies = sorted(self.latencies[name])
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            per_request = (
+                f"{statistics.mean(self.statements[name]):.1f}" if self.statements[name] else "n/a"
+            )
+            print(f"{name:<10} {len(latencies):>9} {self.errors[name]:>7} {p50:>8.1f} {p99:>8.1f} {per_request:>8}")
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.0f} req/s")
+
+
+async def virtual_user(client, data, rng, recorder, deadline, think_time, in_process):
+    username = rng.choice(data.usernames)
+    response = await client.post("/auth/login", params={"username": username, "password": seed_data.PASSWORD})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    names = list(SCENARIO)
+    weights = [SCENARIO[name][0] for name in names]
+
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        _, method, path, needs_auth = SCENARIO[name]
+        kwargs = {"headers": headers} if needs_auth else {}
+        if name in ("timeline", "home"):
+            kwargs["params"] = {"limit": 20}
+        elif name == "search":
+            kwargs["params"] = {"q": rng.choice(data.usernames)[:rng.randint(3, 9)]}
+        elif name == "profile":
+            path = path.format(username=rng.choice(data.usernames))
+        elif name == "inbox":
+            actor = rng.choice(data.remote_actors)
+            note_id = f"{actor}/notes/{uuid.uuid4()}"
+            kwargs["json"] = {
+                "id": f"{note_id}/activity", "type": "Create", "actor": actor,
+                "object": {"type": "Note", "id": note_id, "content": "load test"}
+            }
+        elif name == "post":
+            kwargs["params"] = {"content": "load test"}
+
+        started = time.perf_counter()
+        if in_process:
+            with queries.counting() as counter:
+                response = await client.request(method, path, **kwargs)
+            statements = counter.statements
+        else:
+            response = await client.request(method, path, **kwargs)
+            statements = None
+        recorder.record(name, time.perf_counter() - started, response.status_code < 400, statements)
+        await asyncio.sleep(rng.uniform(0, think_time))
+
+
+async def run(args, data) -> Recorder:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30)
+    else:
+        from app.main import app
+        queries.install()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    async with client:
+        await asyncio.gather(*(
+            virtual_user(
+                client, data, random.Random(args.seed * 10_000 + i), recorder,
+                deadline, args.think_time, not args.base_url
+            )
+            for i in range(args.users)
+        ))
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load scenario over the hot endpoints")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--think-time", type=float, default=0.05, help="max pause between requests, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--accounts", type=int, default=200, help="seeded users")
+    parser.add_argument("--remote-actors", type=int, default=30)
+    parser.add_argument("--base-url", help="load a running server instead of the in-process app")
+    parser.add_argument("--create-tables", action="store_true", help="create_all first (SQLite scratch databases)")
+    args = parser.parse_args()
+
+    if args.base_url:
+        # Same names seed.py generated on the server side
+        data = seed_data.Dataset(
+            usernames=[f"bench{args.seed}_{i:06d}" for i in range(args.accounts)],
+            remote_actors=[
+                f"https://{seed_data.REMOTE_INSTANCES[i % len(seed_data.REMOTE_INSTANCES)]}/users/remote{args.seed}_{i:05d}"
+                for i in range(args.remote_actors)
+            ]
+        )
+    else:
+        if args.create_tables:
+            from app.database import Base, engine
+            Base.metadata.create_all(engine)
+        data = seed_data.seed(users=args.accounts, remote_actors=args.remote_actors, seed=args.seed)
+
+    started = time.perf_counter()
+    recorder = asyncio.run(run(args, data))
+    recorder.report(time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+SQL statement counting for in-process benchmark requests.
+
+The counter lives in a context variable: an ASGI request handled
+in-process runs in the caller's context, and Starlette's threadpool copies
+that context into the worker thread, so statements from sync and async
+routes alike land in the counter of the request that issued them.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.database import engine, async_engine
+
+
+class QueryCount:
+    def __init__(self):
+        self.statements = 0
+
+
+_counter: ContextVar[QueryCount | None] = ContextVar("benchmark_query_counter", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _counter.get()
+    if counter is not None:
+        counter.statements += 1
+
+
+def install():
+    for target in (engine, async_engine.sync_engine):
+        if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+            event.listen(target, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def counting():
+    """Count the statements executed inside the block"""
+    counter = QueryCount()
+    token = _counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _counter.reset(token)
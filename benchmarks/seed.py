@@ -0,0 +1,189 @@
+"""
+Deterministic data set for the benchmarks.
+
+Generates local users with posts, a follow graph between them (accepted
+edges plus pending requests), remote actors that follow local users, and
+remote posts with the activities that delivered them. Rows are bulk
+inserted, then home timelines and counters are derived by the same
+services the app uses, so the data is what the routes would have written.
+
+The same --seed always produces the same rows. Every user's password is
+PASSWORD, so /auth/login can be benchmarked against any account.
+
+    python benchmarks/seed.py --users 1000 --posts 20 --follows 30
+"""
+import argparse
+import random
+import sys
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert, select
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models import Activity, Connection, Post, RemoteActor, User
+from app.services import counters, passwords
+from app.services import timeline as home_timeline
+
+PASSWORD = "benchmark-password"
+REMOTE_INSTANCES = ("remote-a.test", "remote-b.test", "remote-c.test")
+BATCH = 1000
+
+
+@dataclass
+class Dataset:
+    usernames: list[str] = field(default_factory=list)
+    user_ids: list[str] = field(default_factory=list)
+    remote_actors: list[str] = field(default_factory=list)
+    posts: int = 0
+    remote_posts: int = 0
+    connections: int = 0
+    viewer: User | None = None  # set by callers that pick an account to act as
+
+    def busiest_user(self, db) -> User:
+        """The user following the most actors, i.e. with the largest home timeline"""
+        return db.scalars(
+            select(User).where(User.id.in_(self.user_ids))
+            .order_by(User.following_count.desc(), User.id).limit(1)
+        ).one()
+
+
+def _insert(db, model, rows: list[dict]):
+    for start in range(0, len(rows), BATCH):
+        db.execute(insert(model), rows[start:start + BATCH])
+
+
+def seed(
+    users: int = 200,
+    posts_per_user: int = 20,
+    follows_per_user: int = 10,
+    remote_actors: int = 30,
+    remote_posts_per_actor: int = 10,
+    seed: int = 1
+) -> Dataset:
+    """Insert a data set into DATABASE_URL and describe what was inserted"""
+    rng = random.Random(seed)
+    uid = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    now = datetime.utcnow()
+    ago = lambda: now - timedelta(seconds=rng.randrange(30 * 24 * 3600), microseconds=rng.randrange(10**6))
+    local_actor = lambda username: f"{settings.BASE_URL}/users/{username}"
+    data = Dataset()
+
+    # One hash for everyone: argon2 would dominate seeding otherwise
+    password_hash = passwords.hash_password(PASSWORD)
+    user_rows = []
+    for i in range(users):
+        username = f"bench{seed}_{i:06d}"
+        user_rows.append({
+            "id": uid(), "username": username, "password_hash": password_hash,
+            "email": f"{username}@bench.test", "random_key": rng.random()
+        })
+    data.usernames = [row["username"] for row in user_rows]
+    data.user_ids = [row["id"] for row in user_rows]
+
+    post_rows = [
+        {
+            "id": uid(), "content": f"post {n} by {user['username']}", "author": user["username"],
+            "user_id": user["id"], "origin_instance": settings.INSTANCE_NAME,
+            "is_remote": False, "created_at": ago()
+        }
+        for user in user_rows for n in range(posts_per_user)
+    ]
+
+    actor_rows = []
+    for i in range(remote_actors):
+        instance = REMOTE_INSTANCES[i % len(REMOTE_INSTANCES)]
+        username = f"remote{seed}_{i:05d}"
+        actor_rows.append({
+            "actor_url": f"https://{instance}/users/{username}", "username": username,
+            "instance": instance, "first_seen_at": ago()
+        })
+    data.remote_actors = [row["actor_url"] for row in actor_rows]
+
+    remote_post_rows, activity_rows = [], []
+    for actor in actor_rows:
+        for n in range(remote_posts_per_actor):
+            post_id, created_at = uid(), ago()
+            note_id = f"{actor['actor_url']}/notes/{post_id}"
+            remote_post_rows.append({
+                "id": post_id, "content": f"remote post {n}", "author": actor["actor_url"],
+                "origin_instance": actor["instance"], "is_remote": True,
+                "remote_uri": note_id, "created_at": created_at
+            })
+            activity_rows.append({
+                "id": uid(), "ap_id": f"{note_id}/activity", "type": "Create",
+                "actor": actor["actor_url"], "is_local": False, "is_delivered": True,
+                "created_at": created_at,
+                "object": {"type": "Note", "id": note_id, "content": f"remote post {n}"}
+            })
+
+    # Follow graph: each local user follows a sample of local users and
+    # remote actors; about one edge in ten is still a pending request
+    connection_rows = []
+    targets = [local_actor(name) for name in data.usernames] + data.remote_actors
+    for user in user_rows:
+        own = local_actor(user["username"])
+        for target in rng.sample(targets, min(follows_per_user, len(targets))):
+            if target == own:
+                continue
+            connection_rows.append({
+                "id": uid(), "requester_id": user["id"], "target_actor": target,
+                "status": "pending" if rng.random() < 0.1 else "accepted", "created_at": ago()
+            })
+    for actor in data.remote_actors:
+        for username in rng.sample(data.usernames, min(follows_per_user, users)):
+            connection_rows.append({
+                "id": uid(), "requester_actor": actor, "target_actor": local_actor(username),
+                "status": "accepted", "created_at": ago()
+            })
+
+    db = SessionLocal()
+    try:
+        _insert(db, User, user_rows)
+        _insert(db, Post, post_rows + remote_post_rows)
+        _insert(db, RemoteActor, actor_rows)
+        _insert(db, Activity, activity_rows)
+        _insert(db, Connection, connection_rows)
+        db.commit()
+
+        for user_id in data.user_ids:
+            home_timeline.backfill_user(db, user_id)
+        for start in range(0, users, BATCH):
+            counters.reconcile(db, data.user_ids[start:start + BATCH])
+        db.commit()
+    finally:
+        db.close()
+
+    data.posts = len(post_rows)
+    data.remote_posts = len(remote_post_rows)
+    data.connections = len(connection_rows)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed DATABASE_URL with benchmark data")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=20, help="posts per local user")
+    parser.add_argument("--follows", type=int, default=10, help="connections per user")
+    parser.add_argument("--remote-actors", type=int, default=30)
+    parser.add_argument("--remote-posts", type=int, default=10, help="posts per remote actor")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--create-tables", action="store_true", help="create_all first (SQLite scratch databases)")
+    args = parser.parse_args()
+
+    if args.create_tables:
+        Base.metadata.create_all(engine)
+    data = seed(args.users, args.posts, args.follows, args.remote_actors, args.remote_posts, args.seed)
+    print(
+        f"{len(data.usernames)} users, {data.posts} local posts, {data.remote_posts} remote posts, "
+        f"{len(data.remote_actors)} remote actors, {data.connections} connections; "
+        f"password {PASSWORD!r}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Time to serialize a page of posts: the old path (ORM instances through
+jsonable_encoder + json) against the response-model path (column rows
+validated and dumped by pydantic-core). No database needed.
+
+    python benchmarks/serialization.py --posts 1000
+"""
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.models import Post
+from app.schemas import Page, PostOut, POST_COLUMNS
+
+PostRow = namedtuple("PostRow", [column.key for column in POST_COLUMNS])
+
+
+def make_posts(count: int):
+    now = datetime.now(timezone.utc)
+    fields = [
+        dict(
+            id=str(uuid.uuid4()), content="x" * 140, author="benchmark", user_id=str(uuid.uuid4()),
+            origin_instance="benchmark", is_remote=False, created_at=now
+        )
+        for _ in range(count)
+    ]
+    return [Post(**f) for f in fields], [PostRow(**f) for f in fields]
+
+
+def main(args):
+    orm_posts, rows = make_posts(args.posts)
+    page = TypeAdapter(Page[PostOut])
+
+    def orm_path():
+        json.dumps(jsonable_encoder({"items": orm_posts, "next_cursor": None})).encode()
+
+    def model_path():
+        page.dump_json(page.validate_python({"items": rows, "next_cursor": None}))
+
+    for name, fn in (("jsonable_encoder", orm_path), ("response model", model_path)):
+        best = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        print(f"{name:<17} {best * 1000:8.2f} ms per {args.posts} posts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,36 @@
+"""
+Test and benchmark environment.
+
+Loaded by pytest before tests/ and benchmarks/ import the app: points the
+app at a throwaway SQLite database (or TEST_DATABASE_URL, e.g. a local
+PostgreSQL) so no test ever touches the DATABASE_URL of a real deployment.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+SQLITE_PATH = Path(tempfile.gettempdir()) / "fsn-backend-test.db"
+
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", f"sqlite:///{SQLITE_PATH}")
+for name, value in {
+    "INSTANCE_NAME": "test",
+    "SECRET_KEY": "test-secret-key",
+    "BASE_URL": "http://testserver",
+    "EMAIL_PROVIDER": "memory",
+    "PASSWORD_HASH_WORKERS": "0",
+    "QUERY_INSPECTOR": "true",  # query budgets (benchmarks/conftest.py turns it off)
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def pytest_configure(config):
+    # SQLAlchemy warnings (cartesian products, ...) point at real query bugs
+    config.addinivalue_line("filterwarnings", "error::sqlalchemy.exc.SAWarning")
+
+    if "TEST_DATABASE_URL" not in os.environ:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{SQLITE_PATH}{suffix}").unlink(missing_ok=True)
+
+    import app.models  # noqa: F401  (registers the tables)
+    from app.database import Base, engine
+    Base.metadata.create_all(engine)
@@ -0,0 +1,208 @@
+"""
+Maintenance commands.
+
+    python manage.py timelines backfill
+    python manage.py timelines rebuild [--user USERNAME]
+    python manage.py counters reconcile [--user USERNAME]
+    python manage.py deliver
+    python manage.py inbox [--workers N]
+    python manage.py export USERNAME [--output FILE]
+    python manage.py migrate
+    python manage.py explain
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import User
+from app.services import delivery, inbox
+from app.services.federation import start_client, stop_client
+from app.services import timeline as home_timeline
+from app.services import counters
+
+RECONCILE_BATCH = 1000
+
+
+def timelines_backfill(args):
+    db = SessionLocal()
+    try:
+        user_ids = [row.id for row in db.query(User.id).all()]
+        for user_id in user_ids:
+            home_timeline.backfill_user(db, user_id)
+            db.commit()
+        print(f"Backfilled home timelines for {len(user_ids)} users")
+    finally:
+        db.close()
+
+
+def timelines_rebuild(args):
+    db = SessionLocal()
+    try:
+        query = db.query(User.id)
+        if args.user:
+            query = query.filter(User.username == args.user)
+        user_ids = [row.id for row in query.all()]
+        if args.user and not user_ids:
+            raise SystemExit(f"User not found: {args.user}")
+        for user_id in user_ids:
+            home_timeline.rebuild_user(db, user_id)
+            db.commit()
+        print(f"Rebuilt home timelines for {len(user_ids)} users")
+    finally:
+        db.close()
+
+
+def counters_reconcile(args):
+    """Recompute user counters in batches, one transaction per batch"""
+    db = SessionLocal()
+    try:
+        query = db.query(User.id).order_by(User.id)
+        if args.user:
+            query = query.filter(User.username == args.user)
+        checked = drifted = 0
+        last_id = None
+        while True:
+            batch = query.filter(User.id > last_id) if last_id else query
+            user_ids = [row.id for row in batch.limit(RECONCILE_BATCH).all()]
+            if not user_ids:
+                break
+            drifted += counters.reconcile(db, user_ids)
+            db.commit()
+            checked += len(user_ids)
+            last_id = user_ids[-1]
+        if args.user and not checked:
+            raise SystemExit(f"User not found: {args.user}")
+        print(f"Checked counters of {checked} users, repaired {drifted}")
+    finally:
+        db.close()
+
+
+def deliver(args):
+    """Run the outbox delivery worker in the foreground until interrupted"""
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await start_client()
+        try:
+            await delivery.run_worker(stop)
+        finally:
+            await stop_client()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
+
+
+def inbox_workers(args):
+    """Run inbox queue workers in the foreground until interrupted"""
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await asyncio.gather(*(inbox.run_worker(stop) for _ in range(args.workers)))
+
+    logging.basicConfig(level=logging.INFO)
+    if not settings.CACHE_REDIS_URL:
+        logging.warning(
+            "CACHE_REDIS_URL is not set: the web workers will not see this process's "
+            "feed cache invalidations and serve stale feeds for up to %ss", settings.FEED_CACHE_TTL
+        )
+    asyncio.run(run())
+
+
+def export(args):
+    """Write an account as NDJSON, streaming it from the database"""
+    from app.services.export import account_lines
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+    finally:
+        db.close()
+    if not user:
+        raise SystemExit(f"No user {args.username!r}")
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        out.writelines(account_lines(user.id))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def migrate(args):
+    """Upgrade the database schema to the latest migration"""
+    from alembic import command
+    from alembic.config import Config
+    command.upgrade(Config("alembic.ini"), args.revision)
+
+
+def explain(args):
+    """Fail if a hot query is not served by its index"""
+    from app.services.query_plans import check_plans
+    failures = 0
+    for description, plan, ok in check_plans(engine):
+        print(f"[{'ok' if ok else 'FAIL'}] {description}")
+        if args.verbose or not ok:
+            print("    " + plan.replace("\n", "\n    "))
+        failures += not ok
+    if failures:
+        raise SystemExit(f"{failures} hot queries do not use their index")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FSN backend maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    timelines = commands.add_parser("timelines", help="Materialized home timelines")
+    timeline_commands = timelines.add_subparsers(dest="action", required=True)
+    timeline_commands.add_parser(
+        "backfill", help="Add missing entries for every user"
+    ).set_defaults(func=timelines_backfill)
+    rebuild = timeline_commands.add_parser(
+        "rebuild", help="Recompute timelines from scratch"
+    )
+    rebuild.add_argument("--user", help="Only rebuild this username")
+    rebuild.set_defaults(func=timelines_rebuild)
+
+    counter_parser = commands.add_parser("counters", help="Denormalized user counters")
+    counter_commands = counter_parser.add_subparsers(dest="action", required=True)
+    reconcile = counter_commands.add_parser(
+        "reconcile", help="Recompute counters and repair drift"
+    )
+    reconcile.add_argument("--user", help="Only reconcile this username")
+    reconcile.set_defaults(func=counters_reconcile)
+
+    commands.add_parser(
+        "deliver", help="Run the outbox delivery worker"
+    ).set_defaults(func=deliver)
+
+    inbox_parser = commands.add_parser("inbox", help="Run inbox queue workers")
+    inbox_parser.add_argument(
+        "--workers", type=int, default=max(settings.INBOX_WORKERS, 1), help="Concurrent batches"
+    )
+    inbox_parser.set_defaults(func=inbox_workers)
+
+    export_parser = commands.add_parser("export", help="Export an account as NDJSON")
+    export_parser.add_argument("username")
+    export_parser.add_argument("--output", help="File to write (default: stdout)")
+    export_parser.set_defaults(func=export)
+
+    upgrade = commands.add_parser("migrate", help="Apply database migrations")
+    upgrade.add_argument("revision", nargs="?", default="head")
+    upgrade.set_defaults(func=migrate)
+
+    plans = commands.add_parser("explain", help="Check hot query plans use their indexes")
+    plans.add_argument("-v", "--verbose", action="store_true", help="Print every plan")
+    plans.set_defaults(func=explain)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Baseline schema, as created by create_all before migrations existed
+
+Databases that were created by the app at startup should be marked with
+`alembic stamp 0001` before running `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False, unique=True),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "posts",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("author", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("origin_instance", sa.String(), nullable=False),
+        sa.Column("is_remote", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "activities",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("actor", sa.String(), nullable=False),
+        sa.Column("object", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("is_local", sa.Boolean(), nullable=True),
+        sa.Column("is_delivered", sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        "connections",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("requester_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("target_actor", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "password_resets",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("otp", sa.String(), nullable=False),
+        sa.Column("otp_expires_at", sa.DateTime(), nullable=False),
+        sa.Column("is_used", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("password_resets")
+    op.drop_table("connections")
+    op.drop_table("activities")
+    op.drop_table("posts")
+    op.drop_table("users")
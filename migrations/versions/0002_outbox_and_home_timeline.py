@@ -0,0 +1,75 @@
+"""Outbox delivery columns, remote requesters and the home timeline table
+
+Written to be re-runnable: deployments that started the app after these
+models changed already have some of this from create_all.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    activity_columns = _columns("activities")
+    predates_worker = "attempts" not in activity_columns
+    with op.batch_alter_table("activities") as batch:
+        if "inboxes" not in activity_columns:
+            batch.add_column(sa.Column("inboxes", sa.JSON(), nullable=True))
+        if "attempts" not in activity_columns:
+            batch.add_column(sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+        if "next_attempt_at" not in activity_columns:
+            batch.add_column(sa.Column("next_attempt_at", sa.DateTime(), nullable=True))
+        if "last_error" not in activity_columns:
+            batch.add_column(sa.Column("last_error", sa.String(), nullable=True))
+
+    if predates_worker:
+        # Nothing marked local activities delivered before the outbox worker
+        # existed; without this it would re-send the whole historical outbox
+        op.get_bind().execute(
+            sa.text(
+                "UPDATE activities SET is_delivered = :delivered "
+                "WHERE is_local = :local AND (is_delivered = :undelivered OR is_delivered IS NULL)"
+            ),
+            {"delivered": True, "local": True, "undelivered": False}
+        )
+
+    connection_columns = _columns("connections")
+    with op.batch_alter_table("connections") as batch:
+        if "requester_actor" not in connection_columns:
+            batch.add_column(sa.Column("requester_actor", sa.String(), nullable=True))
+        batch.alter_column("requester_id", existing_type=sa.String(), nullable=True)
+
+    if not sa.inspect(op.get_bind()).has_table("home_timeline"):
+        op.create_table(
+            "home_timeline",
+            sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("post_id", sa.String(), sa.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        )
+        op.create_index(
+            "ix_home_timeline_owner_created", "home_timeline", ["owner_id", "created_at", "post_id"]
+        )
+
+
+def downgrade():
+    op.drop_index("ix_home_timeline_owner_created", table_name="home_timeline")
+    op.drop_table("home_timeline")
+    with op.batch_alter_table("connections") as batch:
+        batch.alter_column("requester_id", existing_type=sa.String(), nullable=False)
+        batch.drop_column("requester_actor")
+    with op.batch_alter_table("activities") as batch:
+        batch.drop_column("last_error")
+        batch.drop_column("next_attempt_at")
+        batch.drop_column("attempts")
+        batch.drop_column("inboxes")
@@ -0,0 +1,49 @@
+"""Secondary indexes for the hot queries
+
+Built CONCURRENTLY on PostgreSQL so large tables stay writable.
+`python manage.py explain` checks that the queries actually use them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# name, table, columns, partial predicate (PostgreSQL, SQLite)
+INDEXES = [
+    ("ix_users_email", "users", ["email"], None),
+    ("ix_posts_created_id", "posts", ["created_at", "id"], None),
+    ("ix_posts_user_created", "posts", ["user_id", "created_at", "id"],
+     ("is_remote = false", "is_remote = 0")),
+    ("ix_posts_author_created", "posts", ["author", "created_at"], None),
+    ("ix_connections_requester_status", "connections", ["requester_id", "status"], None),
+    ("ix_connections_target_status", "connections", ["target_actor", "status"], None),
+    ("ix_activities_undelivered", "activities", ["created_at"],
+     ("is_local = true AND is_delivered = false", "is_local = 1 AND is_delivered = 0")),
+    ("ix_password_resets_user_otp", "password_resets", ["user_id", "otp"], None),
+]
+
+
+def upgrade():
+    existing = sa.inspect(op.get_bind())
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if name in {ix["name"] for ix in existing.get_indexes(table)}:
+                continue
+            kwargs = {}
+            if where:
+                kwargs["postgresql_where"] = sa.text(where[0])
+                kwargs["sqlite_where"] = sa.text(where[1])
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,77 @@
+"""Indexed prefix search on usernames and known remote actors
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from urllib.parse import urlsplit
+from alembic import op
+import sqlalchemy as sa
+from app.config import settings
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _create_lower_index(name, table):
+    # text_pattern_ops lets PostgreSQL answer LIKE 'prefix%' from the index
+    # whatever the database collation is
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} (lower(username) text_pattern_ops)"
+            )
+    else:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} (lower(username))")
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("remote_actors"):
+        op.create_table(
+            "remote_actors",
+            sa.Column("actor_url", sa.String(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("instance", sa.String(), nullable=False),
+            sa.Column("first_seen_at", sa.DateTime(), nullable=True),
+        )
+
+    # Backfill from remote posts and connections
+    local_prefix = f"{settings.BASE_URL}/users/"
+    actors = set(bind.execute(sa.text(
+        "SELECT DISTINCT author FROM posts WHERE is_remote = :remote"
+    ), {"remote": True}).scalars())
+    actors |= set(bind.execute(sa.text(
+        "SELECT DISTINCT requester_actor FROM connections WHERE requester_actor IS NOT NULL"
+    )).scalars())
+    actors |= set(bind.execute(sa.text(
+        "SELECT DISTINCT target_actor FROM connections"
+    )).scalars())
+    known = set(bind.execute(sa.text("SELECT actor_url FROM remote_actors")).scalars())
+
+    rows = [
+        {
+            "actor_url": actor,
+            "username": actor.rstrip("/").split("/")[-1],
+            "instance": urlsplit(actor).netloc
+        }
+        for actor in actors - known
+        if actor and "/users/" in actor and not actor.startswith(local_prefix)
+    ]
+    if rows:
+        bind.execute(sa.text(
+            "INSERT INTO remote_actors (actor_url, username, instance) "
+            "VALUES (:actor_url, :username, :instance)"
+        ), rows)
+
+    _create_lower_index("ix_users_username_lower", "users")
+    _create_lower_index("ix_remote_actors_username_lower", "remote_actors")
+
+
+def downgrade():
+    op.drop_index("ix_remote_actors_username_lower", table_name="remote_actors")
+    op.drop_index("ix_users_username_lower", table_name="users")
+    op.drop_table("remote_actors")
@@ -0,0 +1,38 @@
+"""Extend the connection indexes with (created_at, id) for keyset pages
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# new index, columns, index it supersedes
+INDEXES = [
+    ("ix_connections_requester_status_created", ["requester_id", "status", "created_at", "id"],
+     "ix_connections_requester_status"),
+    ("ix_connections_target_status_created", ["target_actor", "status", "created_at", "id"],
+     "ix_connections_target_status"),
+]
+
+
+def upgrade():
+    existing = {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("connections")}
+    with op.get_context().autocommit_block():
+        for name, columns, superseded in INDEXES:
+            if name not in existing:
+                op.create_index(name, "connections", columns, postgresql_concurrently=True)
+            if superseded in existing:
+                op.drop_index(superseded, table_name="connections", postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns, superseded in INDEXES:
+            op.create_index(superseded, "connections", columns[:2], postgresql_concurrently=True)
+            op.drop_index(name, table_name="connections", postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""Indexed random sort key for /random_users
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "random_key" not in {c["name"] for c in sa.inspect(bind).get_columns("users")}:
+        op.add_column("users", sa.Column("random_key", sa.Float(), nullable=True))
+
+    if bind.dialect.name == "postgresql":
+        op.execute("UPDATE users SET random_key = random() WHERE random_key IS NULL")
+    else:
+        op.execute(
+            "UPDATE users SET random_key = (abs(random()) % 1000000000) / 1000000000.0 "
+            "WHERE random_key IS NULL"
+        )
+
+    if bind.dialect.name == "postgresql":
+        op.alter_column("users", "random_key", existing_type=sa.Float(), nullable=False)
+    else:
+        # SQLite rebuilds the table and drops the expression index it cannot reflect
+        with op.batch_alter_table("users") as batch:
+            batch.alter_column("random_key", existing_type=sa.Float(), nullable=False)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))")
+    op.create_index("ix_users_random_key", "users", ["random_key"])
+
+
+def downgrade():
+    op.drop_index("ix_users_random_key", table_name="users")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("random_key")
@@ -0,0 +1,27 @@
+"""Unique remote activity id for inbox deduplication
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "ap_id" not in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("activities")}:
+        op.add_column("activities", sa.Column("ap_id", sa.String(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ux_activities_ap_id", "activities", ["ap_id"], unique=True, postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    op.drop_index("ux_activities_ap_id", table_name="activities")
+    op.drop_column("activities", "ap_id")
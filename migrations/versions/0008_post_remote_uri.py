@@ -0,0 +1,42 @@
+"""Indexed ActivityPub object URI for remote posts
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "remote_uri" not in {c["name"] for c in sa.inspect(bind).get_columns("posts")}:
+        op.add_column("posts", sa.Column("remote_uri", sa.String(), nullable=True))
+
+    # Remote posts were stored under their object URI, so the id is the URI.
+    # Backfill in batches to keep each transaction and its row locks short.
+    with op.get_context().autocommit_block():
+        while True:
+            updated = bind.execute(sa.text(
+                "UPDATE posts SET remote_uri = id WHERE id IN ("
+                "SELECT id FROM posts WHERE is_remote = :remote AND remote_uri IS NULL LIMIT :batch)"
+            ), {"remote": True, "batch": BACKFILL_BATCH}).rowcount
+            if not updated:
+                break
+
+        op.create_index(
+            "ux_posts_remote_uri", "posts", ["remote_uri"], unique=True,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    op.drop_index("ux_posts_remote_uri", table_name="posts")
+    op.drop_column("posts", "remote_uri")
@@ -0,0 +1,33 @@
+"""Durable queue for incoming activities
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("inbox_queue"):
+        return
+    op.create_table(
+        "inbox_queue",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("ap_id", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("received_at", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String(), nullable=True),
+    )
+    op.create_index("ux_inbox_queue_ap_id", "inbox_queue", ["ap_id"], unique=True)
+    op.create_index("ix_inbox_queue_received", "inbox_queue", ["received_at", "id"])
+
+
+def downgrade():
+    op.drop_table("inbox_queue")
@@ -0,0 +1,46 @@
+"""Denormalized per-user post and connection counters
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.config import settings
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+COUNTERS = ("post_count", "follower_count", "following_count", "pending_count")
+
+
+def upgrade():
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("users")}
+    for name in COUNTERS:
+        if name not in existing:
+            op.add_column(
+                "users", sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+            )
+
+    # Same definitions as services/counters.py; repair later drift with
+    # `python manage.py counters reconcile`
+    actor = ":prefix || users.username"
+    op.get_bind().execute(sa.text(f"""
+        UPDATE users SET
+            post_count = (SELECT count(*) FROM posts
+                          WHERE posts.user_id = users.id AND posts.is_remote = :remote),
+            follower_count = (SELECT count(*) FROM connections
+                              WHERE connections.target_actor = {actor} AND connections.status = 'accepted'),
+            following_count = (SELECT count(*) FROM connections
+                               WHERE connections.requester_id = users.id AND connections.status = 'accepted'),
+            pending_count = (SELECT count(*) FROM connections
+                             WHERE connections.target_actor = {actor} AND connections.status = 'pending')
+    """), {"prefix": f"{settings.BASE_URL}/users/", "remote": False})
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        for name in reversed(COUNTERS):
+            batch.drop_column(name)
@@ -0,0 +1,29 @@
+"""Index local activities by actor for the outbox collection
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_activities_local_actor_created", "activities", ["actor", "created_at", "id"],
+            postgresql_where=sa.text("is_local = true"),
+            sqlite_where=sa.text("is_local = 1"),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_activities_local_actor_created", table_name="activities", postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Feed watermarks validating the public timeline without counting posts
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("feed_watermarks"):
+        op.create_table(
+            "feed_watermarks",
+            sa.Column("scope", sa.String(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        )
+    op.execute(
+        "INSERT INTO feed_watermarks (scope, version) SELECT 'timeline', 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM feed_watermarks WHERE scope = 'timeline')"
+    )
+
+
+def downgrade():
+    op.drop_table("feed_watermarks")
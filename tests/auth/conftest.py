@@ -0,0 +1,16 @@
+import uuid
+import pytest
+
+
+@pytest.fixture
+def registered_user(client):
+    """A fresh account created through /auth/register"""
+    suffix = uuid.uuid4().hex[:8]
+    credentials = {
+        "username": f"newuser-{suffix}",
+        "email": f"example-{suffix}@gmail.com",
+        "password": "newpassword1"
+    }
+    response = client.post('/auth/register', params=credentials)
+    assert response.status_code == 200
+    return credentials
@@ -1,6 +1,6 @@
-def test_forgot_password_valid_mail(client):
+def test_forgot_password_valid_mail(client, registered_user):
     response = client.post('/auth/forgot-password', json={
-        "email": "example12@gmail.com"
+        "email": registered_user["email"]
     })
     print(response.json())
     assert response.status_code == 200
@@ -10,4 +10,22 @@ def test_forgot_password_invalid_mail(client):
         "email": "example1211@gmail.com"
     })
     print(response.json())
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_forgot_password_send_failure_keeps_no_otp(client, monkeypatch, registered_user):
+    from app import auth
+    from app.database import SessionLocal
+    from app.models import PasswordReset, User
+
+    monkeypatch.setattr(auth, "send_otp_email", lambda email, otp, username: False)
+    db = SessionLocal()
+    user = db.query(User).filter(User.email == registered_user["email"]).one()
+    before = db.query(PasswordReset).filter(PasswordReset.user_id == user.id).count()
+
+    response = client.post('/auth/forgot-password', json={
+        "email": registered_user["email"]
+    })
+
+    assert response.status_code == 404
+    assert db.query(PasswordReset).filter(PasswordReset.user_id == user.id).count() == before
+    db.close()
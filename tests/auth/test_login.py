@@ -1,17 +1,16 @@
-def test_user_login(client):
+def test_user_login(client, registered_user):
     response = client.post('/auth/login', params={
-        "username": "newuser13",
-        "password": "newpassword1"
+        "username": registered_user["username"],
+        "password": registered_user["password"]
     })
     print(response.json())
     assert response.status_code == 200
 
-def test_user_login_accessToken(client):
+def test_user_login_accessToken(client, registered_user):
     response = client.post('/auth/login', params={
-        "username": "newuser13",
-        "password": "newpassword1"
+        "username": registered_user["username"],
+        "password": registered_user["password"]
     })
     print(response.json())
     assert "access_token" in response.json()
     assert response.status_code == 200
-
@@ -1,16 +1,20 @@
+import uuid
+
+
 def test_register_success(client):
+    suffix = uuid.uuid4().hex[:8]
     response = client.post('/auth/register', params={
-        "username": "newuser13",
-        "email": "example12@gmail.com",
+        "username": f"newuser-{suffix}",
+        "email": f"example-{suffix}@gmail.com",
         "password": "newpassword1"
     })
     print(response.json())
     assert response.status_code == 200
 
-def test_register_duplicate_username(client):
+def test_register_duplicate_username(client, registered_user):
     response = client.post('/auth/register', params={
-        "username": "newuser13",
+        "username": registered_user["username"],
         "email": "example123@gmail.com",
         "password": "newpassword1"
     })
-    assert response.status_code == 409
\ No newline at end of file
+    assert response.status_code == 409
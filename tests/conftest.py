@@ -1,8 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
-from app.routers.users import get_current_user
-from app.models import User
+from app.dependencies import CurrentUser, get_current_user
 
 @pytest.fixture
 def client():   
@@ -10,7 +9,7 @@ def client():
 
 @pytest.fixture
 def fake_user():
-    return User(
+    return CurrentUser(
         id="user-123",
         username="testuser",
         email="test@test.com"
@@ -20,4 +19,4 @@ def fake_user():
 def override_auth(fake_user):
     app.dependency_overrides[get_current_user] = lambda: fake_user
     yield
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
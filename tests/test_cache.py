@@ -0,0 +1,89 @@
+import time
+import uuid
+from app.main import app
+from app.database import SessionLocal
+from app.dependencies import CurrentUser, get_current_user
+from app.models import User
+from app.services.cache import TTLCache, MISSING
+from app.services.feed_cache import pages
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is MISSING
+    assert cache.stats()["misses"] == 1
+
+
+def test_profile_cache_is_invalidated_by_writes(client):
+    db = SessionLocal()
+    author = User(id=str(uuid.uuid4()), username=f"cached-{uuid.uuid4().hex[:6]}", password_hash="x")
+    db.add(author)
+    db.commit()
+    db.refresh(author)
+    db.expunge(author)
+    db.close()
+    current = CurrentUser(author.id, author.username, author.email)
+    app.dependency_overrides[get_current_user] = lambda: current
+
+    client.post('/posts', params={"content": "cached profile post"})
+    first = client.get(f'/get_user/{author.username}', params={"limit": 5})
+    assert first.status_code == 200
+    hits = pages.stats()["hits"]
+
+    again = client.get(f'/get_user/{author.username}', params={"limit": 5})
+    assert again.json() == first.json()
+    assert pages.stats()["hits"] == hits + 1
+
+    created = client.post('/posts', params={"content": "fresh profile post"}).json()
+    latest = client.get(f'/get_user/{author.username}', params={"limit": 5}).json()
+    assert latest["posts"][0]["id"] == created["id"]
+    assert latest["post_count"] == first.json()["post_count"] + 1
+
+    client.delete(f'/delete/{created["id"]}')
+    after_delete = client.get(f'/get_user/{author.username}', params={"limit": 5}).json()
+    assert created["id"] not in [p["id"] for p in after_delete["posts"]]
+
+
+def test_inbox_create_and_delete_invalidate_cached_feeds(client, fake_user):
+    from tests.test_timeline import _connect, _deliver
+
+    actor = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    note_id = f"https://remote.example/posts/{uuid.uuid4()}"
+    _connect(fake_user.id, actor)
+    feeds = ('/timeline', '/timeline_connected_users')
+
+    def ids(path):
+        return [p["id"] for p in client.get(path, params={"limit": 5}).json()["items"]]
+
+    for path in feeds:
+        ids(path)
+    hits = pages.stats()["hits"]
+    before = {path: ids(path) for path in feeds}
+    assert pages.stats()["hits"] == hits + 2  # both feeds are cached now
+
+    _deliver(client, {
+        "type": "Create",
+        "actor": actor,
+        "object": {"type": "Note", "id": note_id, "content": "cached feeds see this"}
+    })
+    for path in feeds:
+        assert ids(path)[0] == note_id
+
+    _deliver(client, {"type": "Delete", "actor": actor, "object": {"id": note_id}})
+    for path in feeds:
+        assert ids(path) == before[path]
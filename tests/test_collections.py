@@ -0,0 +1,94 @@
+import json
+from app.database import SessionLocal
+from app.models import Connection
+from app.services import counters
+from tests.test_connections import _make_user, _login_as
+
+ACTIVITY_JSON = "application/activity+json"
+
+
+def _follow(db, follower_id, target_actor):
+    connection = Connection(requester_id=follower_id, target_actor=target_actor, status="accepted")
+    db.add(connection)
+    db.flush()
+    counters.edge_added(db, connection)
+
+
+def _walk(client, collection):
+    """Items of every page of a collection, following the next links"""
+    url, items = collection["first"] + "&limit=2", []
+    while url:
+        response = client.get(url.removeprefix("http://testserver"))
+        assert response.headers["content-type"] == ACTIVITY_JSON
+        page = response.json()
+        assert page["type"] == "OrderedCollectionPage"
+        assert page["partOf"] == collection["id"]
+        items += page["orderedItems"]
+        url = page.get("next")
+    return items
+
+
+def test_outbox_collection_pages_newest_first(client):
+    author = _make_user("author")
+    _login_as(author)
+    posted = [client.post('/posts', params={"content": f"post {i}"}).json()["id"] for i in range(5)]
+
+    collection = client.get(f'/users/{author.username}/outbox').json()
+    assert collection["type"] == "OrderedCollection"
+    assert collection["totalItems"] == 5
+
+    items = _walk(client, collection)
+    assert [item["type"] for item in items] == ["Create"] * 5
+    assert [item["object"]["id"].rsplit("/", 1)[-1] for item in items] == posted[::-1]
+
+    # Every activity id dereferences to the same activity
+    response = client.get(items[0]["id"].removeprefix("http://testserver"))
+    assert response.headers["content-type"] == ACTIVITY_JSON
+    assert {key: value for key, value in response.json().items() if key != "@context"} == items[0]
+    assert client.get('/activities/no-such-activity').status_code == 404
+
+
+def test_followers_and_following_collections(client):
+    star = _make_user("star")
+    local_fans = [_make_user("fan") for _ in range(3)]
+    star_actor = f"http://testserver/users/{star.username}"
+    remote_fan = "https://remote.example/users/remote-fan"
+
+    db = SessionLocal()
+    for fan in local_fans:
+        _follow(db, fan.id, star_actor)
+    db.add(Connection(requester_actor=remote_fan, target_actor=star_actor, status="accepted"))
+    counters.adjust_actor(db, star_actor, follower_count=1)
+    _follow(db, star.id, remote_fan)
+    db.commit()
+    db.close()
+
+    followers = client.get(f'/users/{star.username}/followers').json()
+    assert followers["totalItems"] == 4
+    assert set(_walk(client, followers)) == {
+        remote_fan, *(f"http://testserver/users/{fan.username}" for fan in local_fans)
+    }
+
+    following = client.get(f'/users/{star.username}/following').json()
+    assert following["totalItems"] == 1
+    assert _walk(client, following) == [remote_fan]
+
+    assert client.get('/users/nobody-here/followers').status_code == 404
+
+
+def test_account_export_streams_ndjson(client):
+    owner, other = _make_user("owner"), _make_user("other")
+    _login_as(owner)
+    client.post('/posts', params={"content": "exported"})
+    client.post(f'/connect/{other.username}')
+
+    response = client.get(f'/users/{owner.username}/export')
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "account" and lines[0]["data"]["username"] == owner.username
+    assert "password_hash" not in lines[0]["data"]
+    kinds = [line["type"] for line in lines[1:]]
+    assert kinds == ["post", "connection", "activity", "activity"]
+
+    _login_as(other)
+    assert client.get(f'/users/{owner.username}/export').status_code == 403
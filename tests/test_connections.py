@@ -0,0 +1,111 @@
+import uuid
+from app.main import app
+from app.database import SessionLocal
+from app.dependencies import CurrentUser, get_current_user
+from app.models import User
+from app.services import counters
+
+
+def _make_user(prefix):
+    db = SessionLocal()
+    user = User(id=str(uuid.uuid4()), username=f"{prefix}-{uuid.uuid4().hex[:6]}", password_hash="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)
+    db.close()
+    return user
+
+
+def _login_as(user):
+    current = CurrentUser(user.id, user.username, user.email)
+    app.dependency_overrides[get_current_user] = lambda: current
+
+
+def test_connection_request_accept_and_list(client):
+    alice, bob, carol = _make_user("alice"), _make_user("bob"), _make_user("carol")
+
+    for requester in (alice, carol):
+        _login_as(requester)
+        assert client.post(f'/connect/{bob.username}').status_code == 200
+
+    _login_as(bob)
+    pending = client.get('/connections/pending', params={"limit": 1}).json()
+    assert len(pending["items"]) == 1
+    second = client.get('/connections/pending', params={"limit": 1, "cursor": pending["next_cursor"]}).json()
+    requesters = {item["from_username"] for item in pending["items"] + second["items"]}
+    assert requesters == {alice.username, carol.username}
+
+    alice_request = next(i for i in pending["items"] + second["items"] if i["from_username"] == alice.username)
+    assert client.post(f'/connect/accept/{alice_request["connection_id"]}').status_code == 200
+
+    connections = client.get('/list_connections').json()["items"]
+    assert [c["username"] for c in connections] == [alice.username]
+
+    _login_as(alice)
+    following = client.get('/connections/following').json()["items"]
+    assert [(f["username"], f["user_id"]) for f in following] == [(bob.username, bob.id)]
+
+    assert client.post(f'/remove_connection/{bob.username}').status_code == 200
+    assert client.get('/connections/following').json()["items"] == []
+
+
+def test_random_users_excludes_connections(client, monkeypatch):
+    from app.routers import users
+
+    me, friend = _make_user("me"), _make_user("friend")
+    strangers = [_make_user("stranger") for _ in range(5)]
+
+    # Seek to just below friend and the strangers in the random_key index,
+    # whatever users earlier tests left behind, and keep the window's order
+    db = SessionLocal()
+    for i, user in enumerate([friend, *strangers]):
+        db.query(User).filter(User.id == user.id).update({User.random_key: 0.5 + i * 1e-9})
+    db.commit()
+    db.close()
+    monkeypatch.setattr(users.random, "random", lambda: 0.5)
+    monkeypatch.setattr(users.random, "sample", lambda population, k: population[:k])
+
+    _login_as(me)
+    client.post(f'/connect/{friend.username}')
+
+    suggested = [u["id"] for u in client.get('/random_users').json()]
+    assert suggested == [stranger.id for stranger in strangers]
+
+
+def _counters(user):
+    db = SessionLocal()
+    row = db.query(
+        User.post_count, User.follower_count, User.following_count, User.pending_count
+    ).filter(User.id == user.id).one()
+    db.close()
+    return tuple(row)
+
+
+def test_counters_follow_writes_and_reconcile_repairs_drift(client):
+    alice, bob = _make_user("alice"), _make_user("bob")
+
+    _login_as(alice)
+    client.post('/posts', params={"content": "counted"})
+    client.post(f'/connect/{bob.username}')
+    assert _counters(bob) == (0, 0, 0, 1)
+
+    _login_as(bob)
+    request = client.get('/connections/pending').json()["items"][0]
+    client.post(f'/connect/accept/{request["connection_id"]}')
+    # Accepting creates the mirror edge, so both follow each other
+    assert _counters(alice) == (1, 1, 1, 0)
+    assert _counters(bob) == (0, 1, 1, 0)
+    assert client.get('/count_connections').json()["connection_count"] == 1
+    assert client.get(f'/get_user/{alice.username}').json()["post_count"] == 1
+
+    client.post(f'/remove_connection/{alice.username}')
+    assert _counters(alice) == (1, 0, 0, 0)
+
+    db = SessionLocal()
+    db.query(User).filter(User.id == alice.id).update({"post_count": 7, "follower_count": 3})
+    db.commit()
+    assert counters.reconcile(db, [alice.id, bob.id]) == 1
+    db.commit()
+    db.close()
+    assert _counters(alice) == (1, 0, 0, 0)
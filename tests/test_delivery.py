@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from app.database import SessionLocal
+from app.models import Activity, Connection, User
+from app.services import delivery
+from app.services.federation import resolve_inboxes
+
+
+def _queue_activity():
+    db = SessionLocal()
+    activity = Activity(type="Create", actor="http://testserver/users/testuser", object={"id": "x"})
+    db.add(activity)
+    db.commit()
+    activity_id = activity.id
+    db.close()
+    return activity_id
+
+
+def _load(activity_id):
+    db = SessionLocal()
+    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    db.close()
+    return activity
+
+
+def test_failed_delivery_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(delivery.settings, "REMOTE_INBOX_URL", "https://peer.example/inbox")
+    activity_id = _queue_activity()
+
+    async def unavailable(inbox, payload):
+        return "HTTP 503"
+
+    async def accepted(inbox, payload):
+        return None
+
+    monkeypatch.setattr(delivery, "post_activity", unavailable)
+    asyncio.run(delivery.deliver_batch())
+
+    activity = _load(activity_id)
+    assert activity.is_delivered is False
+    assert activity.attempts == 1
+    assert activity.last_error == "https://peer.example/inbox: HTTP 503"
+    assert activity.inboxes == ["https://peer.example/inbox"]
+    assert activity.next_attempt_at > datetime.utcnow()
+
+    # Not due yet: a second pass must not touch it
+    asyncio.run(delivery.deliver_batch())
+    assert _load(activity_id).attempts == 1
+
+    db = SessionLocal()
+    db.query(Activity).filter(Activity.id == activity_id).update(
+        {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(delivery, "post_activity", accepted)
+    asyncio.run(delivery.deliver_batch())
+
+    activity = _load(activity_id)
+    assert activity.is_delivered is True
+    assert activity.attempts == 2
+    assert activity.next_attempt_at is None
+
+
+def test_recipients_share_one_inbox_per_instance():
+    db = SessionLocal()
+    author = User(id=str(uuid.uuid4()), username=f"author-{uuid.uuid4().hex[:8]}", password_hash="x")
+    author_actor = f"http://testserver/users/{author.username}"
+    db.add(author)
+    for follower in ("alice", "bob"):
+        db.add(Connection(
+            requester_actor=f"https://big.example/users/{follower}",
+            target_actor=author_actor,
+            status="accepted"
+        ))
+    db.add(Connection(
+        requester_actor="https://small.example/users/dave",
+        target_actor=author_actor,
+        status="accepted"
+    ))
+    # Followed by the author but not following back: not a recipient
+    db.add(Connection(
+        requester_id=author.id,
+        target_actor="https://other.example/users/carol",
+        status="accepted"
+    ))
+    db.commit()
+
+    activity = Activity(type="Create", actor=author_actor, object={"id": "x"})
+    assert resolve_inboxes(db, activity) == [
+        "https://big.example/inbox",
+        "https://small.example/inbox"
+    ]
+    db.close()
@@ -0,0 +1,152 @@
+import smtplib
+import threading
+from app import email_service
+from app.config import settings
+from app.email_service import (
+    FileTransport, GmailTransport, MailQueue, MemoryTransport, SMTPTransport, _build_message
+)
+
+
+def _message(email="someone@example.com"):
+    return _build_message(email, "Subject", "<p>html</p>", "text")
+
+
+class FakeGmailService:
+    def __init__(self):
+        self.sent = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        self.sent.append(body)
+        return self
+
+    def execute(self):
+        return {"id": str(len(self.sent))}
+
+
+class FakeSMTP:
+    connections = 0
+
+    def __init__(self, host, port):
+        FakeSMTP.connections += 1
+        self.sent = []
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        return (250, b"OK")
+
+    def sendmail(self, sender, email, message):
+        self.sent.append(email)
+
+    def quit(self):
+        pass
+
+
+def test_gmail_transport_sends_from_another_thread(monkeypatch):
+    monkeypatch.setattr(settings, "GMAIL_CLIENT_ID", "id")
+    monkeypatch.setattr(settings, "GMAIL_CLIENT_SECRET", "secret")
+    monkeypatch.setattr(settings, "GMAIL_REFRESH_TOKEN", "token")
+    transport = GmailTransport()
+    service = FakeGmailService()
+    transport._service = service
+    results = []
+
+    thread = threading.Thread(target=lambda: results.append(transport.send("a@example.com", _message())))
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert results == [True]
+    assert len(service.sent) == 1
+
+
+def test_gmail_transport_builds_the_service_once(monkeypatch):
+    monkeypatch.setattr(settings, "GMAIL_CLIENT_ID", "id")
+    monkeypatch.setattr(settings, "GMAIL_CLIENT_SECRET", "secret")
+    monkeypatch.setattr(settings, "GMAIL_REFRESH_TOKEN", "token")
+    built = []
+    service = FakeGmailService()
+
+    def build(*args, **kwargs):
+        built.append(args)
+        return service
+
+    monkeypatch.setattr("googleapiclient.discovery.build", build)
+    transport = GmailTransport()
+
+    assert transport.send("a@example.com", _message())
+    assert transport.send("b@example.com", _message())
+    assert len(built) == 1
+    assert len(service.sent) == 2
+
+
+def test_gmail_transport_without_credentials(monkeypatch):
+    monkeypatch.setattr(settings, "GMAIL_CLIENT_ID", "")
+    assert GmailTransport().send("a@example.com", _message()) is False
+
+
+def test_smtp_transport_reuses_connections(monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_USER", "user")
+    monkeypatch.setattr(settings, "SMTP_PASSWORD", "password")
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    FakeSMTP.connections = 0
+    transport = SMTPTransport()
+
+    assert transport.send("a@example.com", _message())
+    assert transport.send("b@example.com", _message())
+    assert FakeSMTP.connections == 1
+
+
+def test_memory_and_file_transports(monkeypatch, tmp_path):
+    memory = MemoryTransport()
+    assert memory.send("a@example.com", _message())
+    assert [email for email, _ in memory.outbox] == ["a@example.com"]
+
+    monkeypatch.setattr(settings, "EMAIL_FILE_DIR", str(tmp_path))
+    assert FileTransport().send("a@example.com", _message())
+    assert len(list(tmp_path.glob("*.eml"))) == 1
+
+
+def test_mail_queue_sends_and_stops(monkeypatch):
+    transport = MemoryTransport()
+    monkeypatch.setattr(email_service, "get_transport", lambda: transport)
+    mail_queue = MailQueue()
+
+    assert mail_queue.enqueue("a@example.com", _message("a@example.com"))
+    assert mail_queue.enqueue("b@example.com", _message("b@example.com"))
+    mail_queue.stop(timeout=5)
+
+    assert [email for email, _ in transport.outbox] == ["a@example.com", "b@example.com"]
+    assert mail_queue.stats() == {"depth": 0, "sent": 2, "failed": 0, "dropped": 0}
+
+
+def test_mail_queue_counts_failures_and_drops(monkeypatch):
+    class FailingTransport:
+        def send(self, email, message):
+            return False
+
+    monkeypatch.setattr(email_service, "get_transport", FailingTransport)
+    monkeypatch.setattr(settings, "EMAIL_QUEUE_SIZE", 1)
+    mail_queue = MailQueue()
+    blocked = threading.Event()
+    monkeypatch.setattr(mail_queue, "_run", blocked.wait)
+
+    assert mail_queue.enqueue("a@example.com", _message())
+    assert not mail_queue.enqueue("b@example.com", _message())
+    assert mail_queue.stats()["dropped"] == 1
+
+    blocked.set()
+    mail_queue = MailQueue()
+    mail_queue.enqueue("a@example.com", _message())
+    mail_queue.stop(timeout=5)
+    assert mail_queue.stats()["failed"] == 1
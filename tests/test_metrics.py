@@ -0,0 +1,39 @@
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def _samples(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_count_requests_and_statements(client):
+    client.get("/get_posts", params={"limit": 5})
+    client.get("/get_posts", params={"limit": 5})
+
+    samples = _samples(client)
+    requests = samples[(
+        "fsn_http_request_duration_seconds_count",
+        (("method", "GET"), ("route", "/get_posts"), ("status", "200"))
+    )]
+    assert requests >= 2
+    statements = samples[("fsn_http_request_db_statements_sum", (("route", "/get_posts"),))]
+    assert statements >= requests
+
+    assert ("fsn_db_pool_checked_out", (("engine", "sync"),)) in samples
+    assert ("fsn_inbox_activities_total", (("outcome", "queued"),)) in samples
+
+
+def test_metrics_label_routes_by_template(client):
+    client.get("/get_user/nobody-by-this-name")
+
+    samples = _samples(client)
+    assert any(
+        name == "fsn_http_request_duration_seconds_count" and ("route", "/get_user/{username}") in labels
+        for name, labels in samples
+    )
+    assert not any("nobody-by-this-name" in str(labels) for _, labels in samples)
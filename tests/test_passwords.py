@@ -0,0 +1,81 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User
+from app.services import passwords
+from app.services.passwords import HashPool
+
+
+def _user_with_hash(password_hash):
+    db = SessionLocal()
+    user = User(id=str(uuid.uuid4()), username=f"hash-{uuid.uuid4().hex[:6]}", password_hash=password_hash)
+    db.add(user)
+    db.commit()
+    username = user.username
+    db.close()
+    return username
+
+
+def _stored_hash(username):
+    db = SessionLocal()
+    password_hash = db.query(User.password_hash).filter(User.username == username).scalar()
+    db.close()
+    return password_hash
+
+
+def test_process_pool_hashes_and_verifies(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    pool = HashPool()
+    try:
+        password_hash = pool.submit(passwords._hash, "secret").result(timeout=60)
+        assert pool.submit(passwords._verify_and_update, "secret", password_hash).result(timeout=60) == (True, None)
+        assert pool.submit(passwords._verify_and_update, "wrong", password_hash).result(timeout=60)[0] is False
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["workers"] == 1
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["max_seconds"] >= stats["avg_seconds"] > 0
+
+
+def test_full_queue_is_rejected_with_503(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+    pool = HashPool()
+
+    with pytest.raises(HTTPException) as error:
+        pool.submit(passwords._hash, "secret")
+    assert error.value.status_code == 503
+    assert pool.stats()["rejected"] == 1
+
+
+def test_login_is_503_while_the_hash_queue_is_full(client, monkeypatch):
+    username = _user_with_hash(passwords.hash_password("secret"))
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+
+    response = client.post('/auth/login', params={"username": username, "password": "secret"})
+    assert response.status_code == 503
+
+
+def test_default_parameters_keep_existing_hashes():
+    # A hash made the way User.hash_password did before the pool existed
+    old_hash = CryptContext(schemes=["argon2"], deprecated="auto").hash("secret")
+    assert passwords.verify_password("secret", old_hash) == (True, None)
+
+
+def test_login_rehashes_outdated_parameters(client, monkeypatch):
+    weak_hash = CryptContext(schemes=["argon2"], argon2__time_cost=1).hash("secret")
+    username = _user_with_hash(weak_hash)
+    monkeypatch.setattr(settings, "ARGON2_TIME_COST", 2)
+    monkeypatch.setattr(passwords, "_context", None)  # rebuilt with the new parameters
+
+    response = client.post('/auth/login', params={"username": username, "password": "secret"})
+    assert response.status_code == 200
+
+    upgraded = _stored_hash(username)
+    assert "t=2" in upgraded
+    assert passwords.verify_password("secret", upgraded) == (True, None)
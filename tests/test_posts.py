@@ -0,0 +1,94 @@
+def test_timeline_pagination(client):
+    for i in range(3):
+        response = client.post('/posts', params={"content": f"paged post {i}"})
+        assert response.status_code == 200
+
+    first = client.get('/timeline', params={"limit": 2})
+    assert first.status_code == 200
+    page = first.json()
+    assert len(page["items"]) == 2
+    assert page["next_cursor"]
+
+    second = client.get('/timeline', params={"limit": 2, "cursor": page["next_cursor"]})
+    assert second.status_code == 200
+    seen = {p["id"] for p in page["items"]}
+    assert not seen & {p["id"] for p in second.json()["items"]}
+
+
+def test_timeline_invalid_cursor(client):
+    response = client.get('/timeline', params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_timeline_conditional_get(client):
+    client.post('/posts', params={"content": "etag post"})
+    first = client.get('/timeline', params={"limit": 2})
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    unchanged = client.get('/timeline', params={"limit": 2}, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert not unchanged.content
+
+    # Another page of the same feed has its own validator
+    other_page = client.get('/timeline', params={"limit": 3}, headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    # Only the ETag validates: a same-second post would hide behind Last-Modified
+    since = client.get(
+        '/timeline', params={"limit": 2},
+        headers={"If-Modified-Since": first.headers["last-modified"]}
+    )
+    assert since.status_code == 200
+
+    client.post('/posts', params={"content": "newer etag post"})
+    changed = client.get('/timeline', params={"limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_timeline_validator_without_counting_posts(client):
+    from app.services.feed_cache import pages
+    from app.services.query_inspector import query_budget
+
+    older = client.post('/posts', params={"content": "soon deleted"}).json()
+    client.post('/posts', params={"content": "stays newest"})
+    pages.clear()
+    with query_budget() as logs:
+        first = client.get('/timeline', params={"limit": 1})
+    assert not any("count(" in statement.sql.lower() for statement in logs[0].statements)
+
+    # Deleting an older post leaves the newest row alone; the watermark moves
+    client.delete(f'/delete/{older["id"]}')
+    after = client.get('/timeline', params={"limit": 1}, headers={"If-None-Match": first.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != first.headers["etag"]
+
+
+def test_timeline_validator_sees_posts_committed_out_of_order(client):
+    import uuid
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.models import Post
+    from app.services import timeline as home_timeline
+
+    client.post('/posts', params={"content": "newest stamp"})
+    first = client.get('/timeline', params={"limit": 1})
+
+    # Stamped before the newest post but committed after it, like a post from
+    # a long inbox batch or a concurrent create_post
+    db = SessionLocal()
+    late = Post(
+        id=str(uuid.uuid4()), content="older stamp, later commit", author="someone",
+        origin_instance="test", is_remote=False, created_at=datetime.utcnow() - timedelta(minutes=5)
+    )
+    db.add(late)
+    db.flush()
+    home_timeline.fan_out_post(db, late.id, "http://testserver/users/someone")
+    db.commit()
+    db.close()
+
+    after = client.get('/timeline', params={"limit": 1}, headers={"If-None-Match": first.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != first.headers["etag"]
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from app.database import SessionLocal
+from app.models import Connection
+from app.routers.stream import event_stream
+from app.services import push
+from tests.test_connections import _make_user, _login_as
+
+
+def test_slow_subscriber_gets_resync_instead_of_backlog(monkeypatch):
+    monkeypatch.setattr(push.settings, "PUSH_QUEUE_SIZE", 2)
+
+    async def run():
+        async with push.broker.subscribe("test:slow") as subscription:
+            push.broker.deliver([(("test:slow",), {"type": "delete", "id": str(i)}) for i in range(3)])
+            return subscription.queue.qsize(), await subscription.get(timeout=1)
+
+    assert asyncio.run(run()) == (1, push.RESYNC)
+
+
+def test_new_and_deleted_posts_reach_follower_streams(client):
+    author, fan = _make_user("author"), _make_user("fan")
+    db = SessionLocal()
+    db.add(Connection(
+        requester_id=fan.id, target_actor=f"http://testserver/users/{author.username}", status="accepted"
+    ))
+    db.commit()
+    db.close()
+    _login_as(author)
+
+    async def run():
+        async with push.broker.subscribe(push.home(fan.id)) as subscription:
+            # The routes run on the TestClient's own loop, in another thread
+            post = (await asyncio.to_thread(client.post, '/posts', params={"content": "pushed"})).json()
+            created = await subscription.get(timeout=2)
+            await asyncio.to_thread(client.delete, f'/delete/{post["id"]}')
+            deleted = await subscription.get(timeout=2)
+            return post, created, deleted
+
+    post, created, deleted = asyncio.run(run())
+    assert created["type"] == "post"
+    assert created["post"]["id"] == post["id"] and created["post"]["content"] == "pushed"
+    assert deleted == {"type": "delete", "id": post["id"]}
+
+
+def test_events_of_rolled_back_savepoints_are_dropped():
+    async def run():
+        async with push.broker.subscribe("test:tx") as subscription:
+            db = SessionLocal()
+            savepoint = db.begin_nested()
+            push.publish(db, ["test:tx"], {"type": "delete", "id": "rolled-back"})
+            savepoint.rollback()
+            push.publish(db, ["test:tx"], {"type": "delete", "id": "committed"})
+            db.commit()
+            db.close()
+            return await subscription.get(timeout=1), await subscription.get(timeout=0.05)
+
+    assert asyncio.run(run()) == ({"type": "delete", "id": "committed"}, None)
+
+
+class _Request:
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+def test_event_stream_formats_server_sent_events():
+    async def run():
+        stream = event_stream(_Request(polls=1), "test:sse")
+        chunks = [await anext(stream)]
+        push.broker.deliver([(("test:sse",), {"type": "delete", "id": "p1"})])
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks
+
+    assert asyncio.run(run()) == [
+        ": subscribed\n\n",
+        'event: delete\ndata: {"type": "delete", "id": "p1"}\n\n'
+    ]
+
+
+def test_notify_payloads_fit_postgres_limit():
+    channels = [push.home(f"user-{i:05d}-0000-0000-0000-000000000000") for i in range(1000)]
+    event = {"type": "post", "post": {"id": "p", "content": "x" * 2000}}
+
+    payloads = list(push.PostgresBackend._payloads([(channels, event)]))
+    assert all(len(payload) < 8000 for payload in payloads)
+    messages = [json.loads(payload) for payload in payloads]
+    assert [c for m in messages for c in m["channels"]] == channels
+    assert all(m["event"] == event for m in messages)
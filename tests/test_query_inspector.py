@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models import User
+from app.services.query_inspector import shape, record, query_budget, QueryBudgetExceeded
+from tests.test_connections import _make_user, _login_as
+
+
+def test_shape_collapses_literals_and_in_lists():
+    assert shape("SELECT * FROM users WHERE id IN (?, ?, ?) AND age > 3") == \
+        shape("SELECT * FROM users\n WHERE id IN (?, ?) AND age > 40")
+    assert shape("SELECT * FROM users WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "SELECT * FROM users WHERE id IN (...)"
+
+
+def test_repeated_statements_are_flagged():
+    db = SessionLocal()
+    with record("loop") as log:
+        for i in range(5):
+            db.execute(select(User.username).where(User.id == str(i)))
+    db.close()
+
+    assert [count for _, count in log.repeated(5)] == [5]
+    assert "N+1" in "\n".join(log.problems(repeat_threshold=5))
+
+
+def test_query_budget_fails_over_budget(client):
+    with pytest.raises(QueryBudgetExceeded, match="budget 0"):
+        with query_budget(statements=0):
+            client.get('/list_connections')
+
+
+def test_connection_routes_stay_within_query_budget(client):
+    bob = _make_user("bob")
+    fans = [_make_user("fan") for _ in range(6)]
+    for fan in fans:
+        _login_as(fan)
+        client.post(f'/connect/{bob.username}')
+
+    _login_as(bob)
+    pending = client.get('/connections/pending').json()["items"]
+    for request in pending[:3]:
+        with query_budget(statements=12):
+            client.post(f'/connect/accept/{request["connection_id"]}')
+
+    # One statement per listing, however many rows it returns
+    with query_budget(statements=1):
+        client.get('/connections/pending')
+        client.get('/connections/sent')
+        client.get('/list_connections')
+        client.get('/count_connections')
+    with query_budget(statements=2):
+        client.get('/connections/following')
+    with query_budget(statements=3):
+        client.get('/timeline_connected_users')
+        client.get('/search_users', params={"q": "fan"})
+        client.get(f'/get_user/{bob.username}')
@@ -0,0 +1,7 @@
+from app.database import engine
+from app.services.query_plans import check_plans
+
+
+def test_hot_queries_use_indexes():
+    missing = [(description, plan) for description, plan, ok in check_plans(engine) if not ok]
+    assert not missing
@@ -0,0 +1,92 @@
+from app.config import settings
+from tests.test_connections import _make_user, _login_as
+
+POST_KEYS = {"id", "content", "author", "user_id", "origin_instance", "is_remote", "created_at"}
+FEED_POST_KEYS = {"id", "content", "author", "created_at"}
+PROFILE_KEYS = {"id", "username", "email", "post_count", "follower_count", "following_count", "posts", "next_cursor"}
+PROFILE_POST_KEYS = {"id", "content", "created_at"}
+USER_KEYS = {"id", "username", "email"}
+SEARCH_KEYS = USER_KEYS | {"actor", "instance", "is_remote", "status"}
+CONNECTION_KEYS = {"user_id", "username", "actor"}
+PENDING_KEYS = {"connection_id", "from_user_id", "from_username", "from_actor"}
+SENT_KEYS = {"connection_id", "to_user_id", "to_username", "to_actor"}
+PAGE_KEYS = {"items", "next_cursor"}
+
+
+def _setup(client):
+    """alice and bob follow each other, carol has asked bob, bob has asked dave"""
+    alice, bob, carol, dave = (_make_user(name) for name in ("alice", "bob", "carol", "dave"))
+    _login_as(alice)
+    client.post(f'/connect/{bob.username}')
+    _login_as(carol)
+    client.post(f'/connect/{bob.username}')
+    _login_as(bob)
+    pending = client.get('/connections/pending').json()["items"]
+    alice_request = next(p for p in pending if p["from_username"] == alice.username)
+    client.post(f'/connect/accept/{alice_request["connection_id"]}')
+    client.post(f'/connect/{dave.username}')
+    _login_as(alice)
+    client.post('/posts', params={"content": "shaped post"})
+    _login_as(bob)
+    return alice
+
+
+def _assert_page(response, item_keys):
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == PAGE_KEYS
+    assert body["items"]
+    for item in body["items"]:
+        assert set(item) == item_keys
+
+
+def _assert_list(response, item_keys):
+    assert response.status_code == 200
+    body = response.json()
+    assert isinstance(body, list) and body
+    for item in body:
+        assert set(item) == item_keys
+
+
+def test_response_shapes(client):
+    alice = _setup(client)
+
+    created = client.post('/posts', params={"content": "another shaped post"})
+    assert set(created.json()) == POST_KEYS
+
+    _assert_page(client.get('/get_posts', params={"limit": 2}), POST_KEYS)
+    _assert_page(client.get('/timeline', params={"limit": 2}), POST_KEYS)
+    _assert_page(client.get('/timeline_connected_users'), FEED_POST_KEYS)
+    _assert_page(client.get('/connections/pending'), PENDING_KEYS)
+    _assert_page(client.get('/connections/sent'), SENT_KEYS)
+    _assert_page(client.get('/list_connections'), CONNECTION_KEYS)
+    _assert_page(client.get('/connections/following'), CONNECTION_KEYS)
+
+    profile = client.get(f'/get_user/{alice.username}').json()
+    assert set(profile) == PROFILE_KEYS
+    assert [set(post) for post in profile["posts"]] == [PROFILE_POST_KEYS]
+
+    assert set(client.get('/get_current_user').json()) == USER_KEYS
+    _make_user("stranger")  # someone bob has no connection with
+    _assert_list(client.get('/search_users', params={"q": alice.username}), SEARCH_KEYS)
+    _assert_list(client.get('/random_users'), USER_KEYS)
+
+
+def test_legacy_response_shapes(client, monkeypatch):
+    alice = _setup(client)
+    monkeypatch.setattr(settings, "LEGACY_UNPAGINATED_FEEDS", True)
+
+    _assert_list(client.get('/get_posts'), POST_KEYS)
+    _assert_list(client.get('/timeline'), POST_KEYS)
+    _assert_list(client.get('/timeline_connected_users'), FEED_POST_KEYS)
+    _assert_list(client.get('/connections/pending'), PENDING_KEYS)
+    _assert_list(client.get('/connections/sent'), SENT_KEYS)
+    _assert_list(client.get('/list_connections'), CONNECTION_KEYS)
+    _assert_list(client.get('/connections/following'), CONNECTION_KEYS)
+
+    profile = client.get(f'/get_user/{alice.username}').json()
+    assert set(profile) == PROFILE_KEYS
+    assert profile["next_cursor"] is None
+
+    # An explicit limit still gets a page
+    _assert_page(client.get('/timeline', params={"limit": 2}), POST_KEYS)
@@ -0,0 +1,23 @@
+from app.services.inbox import process_batch
+
+
+def test_search_finds_known_remote_actor(client):
+    client.post('/inbox', json={
+        "type": "Create",
+        "actor": "https://remote.example/users/Zelda_Remote",
+        "object": {"type": "Note", "id": "https://remote.example/posts/zelda-1", "content": "hi"}
+    })
+    process_batch()
+
+    response = client.get('/search_users', params={"q": "zELDA"})
+    assert response.status_code == 200
+    [match] = response.json()
+    assert match["actor"] == "https://remote.example/users/Zelda_Remote"
+    assert match["is_remote"] is True
+    assert match["status"] == "none"
+
+
+def test_search_escapes_like_wildcards(client):
+    response = client.get('/search_users', params={"q": "%"})
+    assert response.status_code == 200
+    assert response.json() == []
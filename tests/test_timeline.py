@@ -0,0 +1,176 @@
+import uuid
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Activity, Connection, InboxItem, Post
+from app.services.inbox import seen_ids, process_batch
+
+
+def _connect(requester_id, target_actor):
+    db = SessionLocal()
+    db.add(Connection(requester_id=requester_id, target_actor=target_actor, status="accepted"))
+    db.commit()
+    db.close()
+
+
+def _deliver(client, activity):
+    """POST to the shared inbox and let a worker process the queue"""
+    response = client.post('/inbox', json=activity)
+    process_batch()
+    return response
+
+
+def test_remote_post_fans_out_to_home_timeline(client, fake_user):
+    actor = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    note_id = f"https://remote.example/posts/{uuid.uuid4()}"
+    _connect(fake_user.id, actor)
+
+    response = _deliver(client, {
+        "type": "Create",
+        "actor": actor,
+        "object": {"type": "Note", "id": note_id, "content": "hello from afar"}
+    })
+    assert response.status_code == 202
+
+    items = client.get('/timeline_connected_users').json()["items"]
+    assert note_id in [p["id"] for p in items]
+
+    _deliver(client, {"type": "Delete", "actor": actor, "object": {"id": note_id}})
+    items = client.get('/timeline_connected_users').json()["items"]
+    assert note_id not in [p["id"] for p in items]
+
+
+def test_replayed_activity_is_processed_once(client, fake_user):
+    actor = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    activity = {
+        "id": f"https://remote.example/activities/{uuid.uuid4()}",
+        "type": "Follow",
+        "actor": actor,
+        "object": f"https://testserver/users/{fake_user.username}"
+    }
+    assert client.post('/inbox', json=activity).json()["status"] == "queued"
+    assert client.post('/inbox', json=activity).json()["status"] == "duplicate"
+
+    # Without the front cache the unique ids still reject it, queued or processed
+    seen_ids.clear()
+    assert client.post('/inbox', json=activity).json()["status"] == "duplicate"
+    process_batch()
+    seen_ids.clear()
+    assert client.post('/inbox', json=activity).json()["status"] == "duplicate"
+
+    db = SessionLocal()
+    assert db.query(Activity).filter(Activity.ap_id == activity["id"]).count() == 1
+    assert db.query(Connection).filter(Connection.requester_actor == actor).count() == 1
+    db.close()
+
+
+def test_remote_post_update_and_delete_resolve_by_object_uri(client):
+    actor = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    note_id = f"https://remote.example/posts/{uuid.uuid4()}"
+    _deliver(client, {
+        "type": "Create",
+        "actor": actor,
+        "object": {"type": "Note", "id": note_id, "content": "first draft"}
+    })
+    _deliver(client, {
+        "type": "Update",
+        "actor": actor,
+        "object": {"type": "Note", "id": note_id, "content": "edited"}
+    })
+
+    # Another actor cannot delete it, even with a matching URI suffix
+    _deliver(client, {
+        "type": "Delete",
+        "actor": "https://elsewhere.example/users/mallory",
+        "object": "https://elsewhere.example/posts/" + note_id.split("/")[-1]
+    })
+    db = SessionLocal()
+    post = db.query(Post).filter(Post.remote_uri == note_id).one()
+    assert post.content == "edited"
+    db.close()
+
+    _deliver(client, {"type": "Delete", "actor": actor, "object": note_id})
+    db = SessionLocal()
+    assert db.query(Post).filter(Post.remote_uri == note_id).count() == 0
+    db.close()
+
+
+def test_failing_activity_does_not_roll_back_its_batch(client):
+    actor = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    note_id = f"https://remote.example/posts/{uuid.uuid4()}"
+    # An Accept without a Follow object cannot be processed
+    client.post('/inbox', json={"type": "Accept", "actor": actor, "object": "not-a-follow"})
+    client.post('/inbox', json={
+        "type": "Create",
+        "actor": actor,
+        "object": {"type": "Note", "id": note_id, "content": "still delivered"}
+    })
+    process_batch()
+
+    db = SessionLocal()
+    assert db.query(Post).filter(Post.remote_uri == note_id).count() == 1
+    failed = db.query(InboxItem).filter(InboxItem.payload["actor"].as_string() == actor).one()
+    assert failed.attempts == 1 and failed.last_error == "Accept object must be the embedded Follow"
+    db.close()
+
+
+def test_accept_only_matches_local_followers(client):
+    from tests.test_connections import _make_user
+
+    follower = _make_user("follower")
+    target = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    db.add(Connection(requester_id=follower.id, target_actor=target, status="pending"))
+    db.commit()
+    db.close()
+
+    def status():
+        db = SessionLocal()
+        value = db.query(Connection.status).filter(
+            Connection.requester_id == follower.id, Connection.target_actor == target
+        ).scalar()
+        db.close()
+        return value
+
+    # A remote actor that merely shares the local username accepts nothing
+    _deliver(client, {"type": "Accept", "actor": target, "object": {
+        "type": "Follow", "actor": f"https://elsewhere.example/users/{follower.username}", "object": target
+    }})
+    assert status() == "pending"
+
+    # Nor can anyone but the followed actor accept the Follow
+    _deliver(client, {"type": "Accept", "actor": "https://elsewhere.example/users/mallory", "object": {
+        "type": "Follow", "actor": f"http://testserver/users/{follower.username}", "object": target
+    }})
+    assert status() == "pending"
+
+    _deliver(client, {"type": "Accept", "actor": target, "object": {
+        "type": "Follow", "actor": f"http://testserver/users/{follower.username}", "object": target
+    }})
+    assert status() == "accepted"
+
+
+def test_failed_activity_is_retried_then_accepted_again(client, monkeypatch):
+    monkeypatch.setattr(settings, "INBOX_MAX_ATTEMPTS", 2)
+    actor = f"https://remote.example/users/{uuid.uuid4().hex[:8]}"
+    activity = {
+        "id": f"https://remote.example/activities/{uuid.uuid4()}",
+        "type": "Accept",
+        "actor": actor,
+        "object": "not-a-follow"
+    }
+
+    def attempts():
+        db = SessionLocal()
+        value = db.query(InboxItem.attempts).filter(InboxItem.ap_id == activity["id"]).scalar()
+        db.close()
+        return value
+
+    assert _deliver(client, activity).json()["status"] == "queued"
+    assert attempts() == 1
+    assert client.post('/inbox', json=activity).json()["status"] == "duplicate"
+    process_batch()
+    assert attempts() == 2
+
+    # Given up on: a redelivery replaces the dead row instead of being dropped
+    assert client.post('/inbox', json=activity).json()["status"] == "queued"
+    assert attempts() == 0
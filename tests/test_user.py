@@ -5,4 +5,35 @@ def test_get_current_user(client):
     data = response.json()
 
     assert data["username"] == "testuser"
-    assert data["email"] == "test@test.com"
\ No newline at end of file
+    assert data["email"] == "test@test.com"
+
+def test_get_current_user_from_token(client):
+    import uuid
+    from app.auth import create_access_token
+    from app.database import SessionLocal
+    from app.dependencies import CurrentUser, get_current_user, user_cache
+    from app.main import app
+    from app.models import User
+
+    db = SessionLocal()
+    user = User(id=str(uuid.uuid4()), username=f"token-{uuid.uuid4().hex[:6]}", email="token@test.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    user_id, username = user.id, user.username
+    db.close()
+    app.dependency_overrides.pop(get_current_user)
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user_id})}"}
+
+    # First request loads the row, the second one is served from the user cache
+    for _ in range(2):
+        response = client.get("/get_current_user", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"id": user_id, "username": username, "email": "token@test.com"}
+    assert user_cache.get(user_id)["username"] == username
+
+    assert client.get("/get_current_user", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    # A cache hit gives routes a read-only value, not a half-loaded ORM object
+    import asyncio
+    current = asyncio.run(get_current_user(headers["Authorization"]))
+    assert current == CurrentUser(user_id, username, "token@test.com")